@@ -1,26 +1,16 @@
-import os
-from typing import Optional
-
-import pandas as pd
 import requests
 import streamlit as st
 
-from config import get_default_models, get_provider, load_env_if_present
+from config import get_default_models, get_env, get_provider, load_env_if_present
 from models import ExtractedInfo
 from services.submissions import find_submission
-from services.summarize import extract_caller_info, summarize_transcript
+from services.matching import rank_submissions
+from services.cache import get_cache
+from services.pipeline import run_transcript_stages
+from services.summarize import extract_caller_info, stream_summary
 from services.transcribe import transcribe_audio
 
 
-def set_api_key_from_ui(provider: str, user_key: Optional[str]) -> None:
-    if not user_key:
-        return
-    if provider == "openai":
-        os.environ["OPENAI_API_KEY"] = user_key
-    elif provider == "gemini":
-        os.environ["GOOGLE_API_KEY"] = user_key
-
-
 def main() -> None:
     load_env_if_present()
     st.set_page_config(page_title="Insurance Call Assistant", page_icon="🎧", layout="wide")
@@ -35,9 +25,8 @@ def main() -> None:
             key_label,
             type="password",
             help="If not set in environment, paste your key here.",
-            value=os.getenv("OPENAI_API_KEY" if provider == "openai" else "GOOGLE_API_KEY", ""),
+            value=get_env("OPENAI_API_KEY" if provider == "openai" else "GOOGLE_API_KEY", ""),
         )
-        set_api_key_from_ui(provider, ui_key or None)
 
         models = get_default_models(provider)
         st.write("Models")
@@ -46,6 +35,20 @@ def main() -> None:
             language="text",
         )
 
+        single_pass = st.checkbox(
+            "Single-pass analysis",
+            value=False,
+            help="Run All summarizes and extracts details with one model call instead of two.",
+        )
+
+        cache = get_cache()
+        if cache is not None:
+            stats = cache.stats()
+            st.caption(
+                f"Result cache: {stats['memory_hits'] + stats['disk_hits']} hits, "
+                f"{stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)"
+            )
+
         st.markdown("---")
         st.markdown(
             "Need help? Ensure your API key is set. Audio formats like WAV/MP3/M4A work best."
@@ -57,6 +60,8 @@ def main() -> None:
         st.session_state["summary_text"] = ""
     if "extracted_info" not in st.session_state:
         st.session_state["extracted_info"] = ExtractedInfo()
+    if "submission_match" not in st.session_state:
+        st.session_state["submission_match"] = None
 
     left, right = st.columns([2, 1], gap="large")
 
@@ -94,12 +99,13 @@ def main() -> None:
                 if not text:
                     st.warning("Provide transcript text or transcribe from audio first.")
                 else:
-                    with st.spinner("Summarizing..."):
-                        try:
-                            st.session_state["summary_text"] = summarize_transcript(text, provider=provider, api_key=ui_key or None)
-                            st.success("Summary generated.")
-                        except Exception as e:
-                            st.error(f"Summarization failed: {e}")
+                    try:
+                        # Render pieces as they arrive instead of waiting for the whole summary
+                        streamed = st.write_stream(stream_summary(text, provider=provider, api_key=ui_key or None))
+                        st.session_state["summary_text"] = (streamed or "").strip()
+                        st.success("Summary generated.")
+                    except Exception as e:
+                        st.error(f"Summarization failed: {e}")
 
         with col_c:
             if st.button("Extract Details"):
@@ -125,11 +131,18 @@ def main() -> None:
                 if not text:
                     st.warning("No audio or transcript provided.")
                 else:
-                    with st.spinner("Summarizing..."):
-                        st.session_state["summary_text"] = summarize_transcript(text, provider=provider, api_key=ui_key or None)
-                    with st.spinner("Extracting details..."):
-                        st.session_state["extracted_info"] = extract_caller_info(text, provider=provider, api_key=ui_key or None)
-                    st.success("Completed all steps.")
+                    with st.spinner("Summarizing and extracting details..."):
+                        stages = run_transcript_stages(
+                            text, provider=provider, api_key=ui_key or None, single_pass=single_pass
+                        )
+                    st.session_state["summary_text"] = stages["summary"]
+                    st.session_state["extracted_info"] = stages["extracted"]
+                    st.session_state["submission_match"] = stages["submission"]
+                    if stages["errors"]:
+                        for stage, error in stages["errors"].items():
+                            st.warning(f"{stage.capitalize()} step failed: {error}")
+                    else:
+                        st.success("Completed all steps.")
             except Exception as e:
                 st.error(f"Pipeline failed: {e}")
 
@@ -145,6 +158,10 @@ def main() -> None:
             st.subheader("Summary")
             st.write(st.session_state["summary_text"])
 
+        if st.session_state["submission_match"]:
+            st.markdown("**Matched Submission:**")
+            st.dataframe([st.session_state["submission_match"]])
+
     with right:
         st.subheader("2) Caller Details")
         extracted: ExtractedInfo = st.session_state["extracted_info"]
@@ -160,9 +177,14 @@ def main() -> None:
                 match = find_submission(confirmed)
             if match:
                 st.success("Submission found.")
-                st.dataframe(pd.DataFrame([match]))
+                st.dataframe([match])
             else:
-                st.warning("No matching submission found. Adjust details and try again.")
+                candidates = rank_submissions(confirmed, k=5)
+                if candidates:
+                    st.warning("No confident match. Closest submissions:")
+                    st.dataframe([{"score": c["score"], **c["submission"]} for c in candidates])
+                else:
+                    st.warning("No matching submission found. Adjust details and try again.")
 
         st.markdown("---")
         st.caption(
@@ -170,7 +192,7 @@ def main() -> None:
         )
 
         st.subheader("3) Outbound Call (Twilio demo)")
-        backend_url = os.getenv("CALL_BACKEND_URL", "https://sppech-text.onrender.com")
+        backend_url = get_env("CALL_BACKEND_URL", "https://sppech-text.onrender.com")
         st.code(f"Backend URL: {backend_url}", language="text")
         to_number = st.text_input("Customer Phone (E.164 format)", value="")
         if st.button("Start Outbound Call via Twilio"):
@@ -196,7 +218,8 @@ def main() -> None:
             else:
                 try:
                     with st.spinner("Fetching call result..."):
-                        resp = requests.get(f"{backend_url}/call/result/{call_sid_lookup}", timeout=15)
+                        # The backend holds the request until the result is ready (or 25s pass)
+                        resp = requests.get(f"{backend_url}/call/result/{call_sid_lookup}", params={"wait": 25}, timeout=40)
                     if resp.status_code == 200:
                         data = resp.json()
                         st.success("Call result ready.")
@@ -207,7 +230,7 @@ def main() -> None:
                         submission = data.get("submission")
                         if submission:
                             st.markdown("**Matched Submission from Call:**")
-                            st.dataframe(pd.DataFrame([submission]))
+                            st.dataframe([submission])
                     else:
                         st.warning(f"Result not ready or not found: {resp.text}")
                 except Exception as e:
@@ -0,0 +1,284 @@
+"""ASGI variant of flask_app: the same routes on an asyncio event loop.
+
+Recording jobs run as tasks on the loop (services.jobs.AsyncJobQueue) using
+the async pipeline, so one process overlaps many calls that are waiting on
+Twilio downloads or Gemini responses instead of holding a worker per call.
+Serve it with uvicorn:
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5001
+
+Both backends share the result store, cache and env configuration.
+"""
+
+import asyncio
+import contextlib
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Optional
+
+from pydantic import ValidationError
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from config import get_env, get_provider
+from models import SubmissionLookupRequest
+from services.cache import get_cache
+from services.jobs import JOB_DONE, JOB_FAILED, AsyncJobQueue
+from services.metrics import render as render_metrics
+from services.results import result_payload, sse_message
+from services.startup import start_warm_up
+from services.telephony import get_twilio_client, pipeline_api_key, voice_twiml
+
+# As in flask_app, the pipeline and the Twilio SDK are imported on first use
+
+JOBS = AsyncJobQueue.from_env()
+
+
+def _finished(record: Optional[dict]) -> bool:
+    return record is not None and record["state"] in (JOB_DONE, JOB_FAILED)
+
+
+async def health(request: Request) -> Response:
+    return JSONResponse({"status": "ok"})
+
+
+async def index(request: Request) -> Response:
+    return JSONResponse({"status": "ok", "message": "Insurance Gemini backend is running."})
+
+
+async def cache_stats(request: Request) -> Response:
+    """Hit/miss counters of this worker's transcription and LLM result cache."""
+    cache = get_cache()
+    if cache is None:
+        return JSONResponse({"enabled": False})
+    return JSONResponse({"enabled": True, **cache.stats()})
+
+
+async def metrics(request: Request) -> Response:
+    """Prometheus metrics for this worker (stage latencies, bytes, tokens, cache and queue)."""
+    return PlainTextResponse(await asyncio.to_thread(render_metrics), media_type="text/plain; version=0.0.4")
+
+
+async def start_call(request: Request) -> Response:
+    """Start an outbound call via Twilio and record it.
+
+    Expects JSON: {"to": "+91..."}
+    """
+    try:
+        data = await request.json()
+    except ValueError:
+        data = {}
+    to_number = (data or {}).get("to")
+    if not to_number:
+        return JSONResponse({"error": "Missing 'to' phone number"}, 400)
+
+    from_number = get_env("TWILIO_CALLER_ID")
+    public_base_url = get_env("PUBLIC_BASE_URL")
+    if not from_number or not public_base_url:
+        return JSONResponse(
+            {
+                "error": "TWILIO_CALLER_ID or PUBLIC_BASE_URL not set in environment.",
+                "hint": "Set your Twilio phone number as TWILIO_CALLER_ID and your public URL as PUBLIC_BASE_URL.",
+            },
+            500,
+        )
+
+    # The Twilio SDK is blocking
+    call = await asyncio.to_thread(
+        lambda: get_twilio_client().calls.create(to=to_number, from_=from_number, url=f"{public_base_url}/twilio/voice")
+    )
+    return JSONResponse({"call_sid": call.sid})
+
+
+async def twilio_voice(request: Request) -> Response:
+    """TwiML that records the call (see services.telephony.voice_twiml)."""
+    return Response(voice_twiml(), media_type="text/xml")
+
+
+async def twilio_recording(request: Request) -> Response:
+    """Handles Twilio recording status callback by queueing the pipeline for the call.
+
+    Returns immediately; repeated deliveries for the same CallSid reuse the existing job.
+    """
+    form = await request.form()
+    recording_url = form.get("RecordingUrl")
+    call_sid = form.get("CallSid")
+
+    if not recording_url or not call_sid:
+        return PlainTextResponse("Missing RecordingUrl or CallSid", 400)
+
+    from services.pipeline import aprocess_recording
+
+    await JOBS.submit(
+        call_sid,
+        aprocess_recording,
+        recording_url,
+        provider=get_provider(),
+        api_key=pipeline_api_key(),
+        call_sid=call_sid,
+        http_client=request.app.state.http,
+    )
+    return Response(status_code=204)
+
+
+async def twilio_media(websocket: WebSocket) -> None:
+    """Twilio Media Streams WebSocket: transcribe the call incrementally while it is in progress.
+
+    The live session is thread-based, so the message loop runs in a thread
+    of its own pool (LIVE_MAX_SESSIONS) for the whole call and pulls frames
+    from the socket through the event loop; the default executor stays free
+    for the short blocking calls. Streams beyond the limit are closed with
+    1013 (try again later) and the call is still processed from its recording.
+    """
+    from services.live import handle_media_stream
+
+    state = websocket.app.state
+    if state.live_active >= state.live_limit:
+        await websocket.close(code=1013)
+        return
+    await websocket.accept()
+    loop = asyncio.get_running_loop()
+
+    def receive() -> Optional[str]:
+        try:
+            return asyncio.run_coroutine_threadsafe(websocket.receive_text(), loop).result()
+        except (WebSocketDisconnect, RuntimeError):
+            return None
+
+    session = functools.partial(handle_media_stream, receive, provider=get_provider(), api_key=pipeline_api_key())
+    state.live_active += 1
+    try:
+        await loop.run_in_executor(state.live_sessions, session)
+    finally:
+        state.live_active -= 1
+
+
+async def call_result(request: Request) -> Response:
+    """Return processed call results (if available) along with the job state.
+
+    With ?wait=<seconds> (capped by CALL_RESULT_MAX_WAIT_SECONDS) the request is
+    held until the job finishes or the wait runs out; waiting costs no thread.
+    """
+    call_sid = request.path_params["call_sid"]
+    try:
+        wait = float(request.query_params.get("wait") or 0)
+    except ValueError:
+        return JSONResponse({"error": "wait must be a number of seconds"}, 400)
+    wait = min(max(wait, 0.0), float(get_env("CALL_RESULT_MAX_WAIT_SECONDS", "30")))
+    poll_seconds = float(get_env("CALL_EVENTS_POLL_SECONDS", "0.25"))
+    deadline = time.monotonic() + wait
+    record = await JOBS.get(call_sid)
+    while not _finished(record) and time.monotonic() < deadline:
+        await asyncio.sleep(min(poll_seconds, max(0.0, deadline - time.monotonic())))
+        record = await JOBS.get(call_sid)
+    body, status = result_payload(call_sid, record)
+    return JSONResponse(body, status)
+
+
+async def call_events(request: Request) -> Response:
+    """Server-Sent Events stream of pipeline progress for a call (same events as flask_app).
+
+    Open streams are coroutines, so they do not tie up worker threads.
+    """
+    call_sid = request.path_params["call_sid"]
+    store = JOBS.store
+    try:
+        after = int(request.headers.get("Last-Event-ID") or request.query_params.get("after") or 0)
+    except ValueError:
+        after = 0
+    poll_seconds = float(get_env("CALL_EVENTS_POLL_SECONDS", "0.25"))
+    max_seconds = float(get_env("CALL_EVENTS_MAX_SECONDS", "900"))
+    keepalive_seconds = 15.0
+
+    async def generate(last: int) -> AsyncIterator[str]:
+        deadline = time.monotonic() + max_seconds
+        quiet_since = time.monotonic()
+        while time.monotonic() < deadline:
+            events = await asyncio.to_thread(store.events_since, call_sid, last)
+            if not events:
+                record = await asyncio.to_thread(store.get, call_sid)
+                if _finished(record):
+                    # The job writes its events before it is marked finished, so drain once more
+                    for item in await asyncio.to_thread(store.events_since, call_sid, last):
+                        yield sse_message(item["event"], item["data"], item["id"])
+                    yield sse_message("end", result_payload(call_sid, record)[0])
+                    return
+                if time.monotonic() - quiet_since >= keepalive_seconds:
+                    quiet_since = time.monotonic()
+                    yield ": keep-alive\n\n"
+                await asyncio.sleep(poll_seconds)
+                continue
+            for item in events:
+                yield sse_message(item["event"], item["data"], item["id"])
+                last = item["id"]
+            quiet_since = time.monotonic()
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(generate(after), media_type="text/event-stream", headers=headers)
+
+
+async def submissions_lookup(request: Request) -> Response:
+    """Resolve a batch of extracted caller details against the submissions data (see flask_app)."""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    try:
+        body = SubmissionLookupRequest.model_validate(data)
+    except ValidationError as exc:
+        return JSONResponse({"error": "Invalid lookup request", "details": exc.errors(include_url=False)}, 400)
+
+    from services.matching import lookup_batch
+
+    # Scoring is NumPy work; keep it off the event loop
+    results = await asyncio.to_thread(lookup_batch, body.records, body.top_k, body.min_score)
+    return JSONResponse({"results": results})
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: Starlette) -> AsyncIterator[None]:
+    import httpx
+
+    # One connection pool for all recording downloads in this process
+    app.state.http = httpx.AsyncClient(timeout=60, follow_redirects=True)
+    # Live media streams each hold a thread for the length of the call
+    app.state.live_limit = int(get_env("LIVE_MAX_SESSIONS", "32") or "32")
+    app.state.live_active = 0
+    app.state.live_sessions = ThreadPoolExecutor(max_workers=max(1, app.state.live_limit), thread_name_prefix="live-session")
+    # The port is bound once startup completes; warm-up continues in the background
+    start_warm_up()
+    try:
+        yield
+    finally:
+        await JOBS.shutdown()
+        await app.state.http.aclose()
+        app.state.live_sessions.shutdown(wait=False)
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health, methods=["GET"]),
+        Route("/cache/stats", cache_stats, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"]),
+        Route("/", index, methods=["GET"]),
+        Route("/call/start", start_call, methods=["POST"]),
+        Route("/twilio/voice", twilio_voice, methods=["POST"]),
+        Route("/twilio/recording", twilio_recording, methods=["POST"]),
+        WebSocketRoute("/twilio/media", twilio_media),
+        Route("/call/result/{call_sid}", call_result, methods=["GET"]),
+        Route("/call/events/{call_sid}", call_events, methods=["GET"]),
+        Route("/submissions/lookup", submissions_lookup, methods=["POST"]),
+    ],
+    lifespan=lifespan,
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("FLASK_PORT", "5001")))
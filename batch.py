@@ -0,0 +1,147 @@
+"""Batch-process archived call recordings or transcripts into a JSONL results file.
+
+Examples:
+    python batch.py recordings/ --output results.jsonl --concurrency 4 --rpm 60
+    python batch.py transcripts.jsonl --output results.jsonl --single-pass
+
+The output file doubles as the checkpoint: items already written with status
+"ok" are skipped when the same command is run again, so an interrupted run
+resumes where it stopped. Failed items are retried on the next run.
+"""
+
+import argparse
+import csv
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Set
+
+from config import get_env, get_provider
+from services.gateway import PRIORITY_BACKGROUND, configure_gateway, request_priority
+from services.pipeline import run_transcript_stages
+from services.transcribe import transcribe_audio
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a")
+
+
+def iter_items(source: Path) -> Iterator[Dict[str, Any]]:
+    """Yield {"id", "audio_path"} or {"id", "transcript"} items from a directory, JSONL or CSV."""
+    if source.is_dir():
+        for path in sorted(p for p in source.rglob("*") if p.suffix.lower() in AUDIO_EXTENSIONS):
+            yield {"id": str(path.relative_to(source)), "audio_path": path}
+    elif source.suffix.lower() == ".jsonl":
+        with open(source, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, start=1):
+                if line.strip():
+                    record = json.loads(line)
+                    yield {"id": str(record.get("id") or line_no), "transcript": record.get("transcript") or ""}
+    elif source.suffix.lower() == ".csv":
+        with open(source, newline="", encoding="utf-8") as f:
+            for row_no, row in enumerate(csv.DictReader(f), start=1):
+                yield {"id": str(row.get("id") or row_no), "transcript": row.get("transcript") or ""}
+    else:
+        raise SystemExit(f"Unsupported input '{source}': use a directory of audio files, a .jsonl or a .csv file.")
+
+
+def load_completed(output: Path) -> Set[str]:
+    completed: Set[str] = set()
+    if not output.exists():
+        return completed
+    with open(output, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interrupted run; that item is simply redone
+                continue
+            if record.get("status") == "ok":
+                completed.add(record["id"])
+    return completed
+
+
+def process_item(
+    item: Dict[str, Any],
+    *,
+    provider: str,
+    api_key: Optional[str],
+    single_pass: bool,
+) -> Dict[str, Any]:
+    started = time.monotonic()
+    record: Dict[str, Any] = {"id": item["id"]}
+    try:
+        transcript = item.get("transcript", "")
+        with request_priority(PRIORITY_BACKGROUND):
+            if "audio_path" in item:
+                transcript = transcribe_audio(item["audio_path"], provider=provider, api_key=api_key)
+            stages = run_transcript_stages(transcript, provider=provider, api_key=api_key, single_pass=single_pass)
+        record.update(
+            status="failed" if stages["errors"] else "ok",
+            transcript=transcript,
+            summary=stages["summary"],
+            extracted=stages["extracted"].model_dump(),
+            submission=stages["submission"],
+            errors=stages["errors"],
+        )
+    except Exception as exc:
+        record.update(status="failed", error=f"{type(exc).__name__}: {exc}")
+    record["elapsed_seconds"] = round(time.monotonic() - started, 3)
+    return record
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Batch-process call recordings or transcripts.")
+    parser.add_argument("input", type=Path, help="Directory of audio files, or a .jsonl/.csv with id,transcript")
+    parser.add_argument("--output", type=Path, default=Path("batch_results.jsonl"), help="Results JSONL (also the checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Items processed at the same time")
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        default=None,
+        help="Model requests per minute (default: GEMINI_RPM, or 60 when unset; 0 = unlimited)",
+    )
+    parser.add_argument("--single-pass", action="store_true", help="Summarize and extract with one model call")
+    args = parser.parse_args()
+
+    provider = get_provider()
+    api_key = get_env("GOOGLE_API_KEY")
+    # Every model call goes through the gateway, whose budget is shared with the backends on this host
+    configure_gateway(rpm=args.rpm if args.rpm is not None else float(get_env("GEMINI_RPM", "60")))
+    completed = load_completed(args.output)
+    write_lock = threading.Lock()
+    # Bound the number of submitted-but-unfinished items so huge inputs are streamed, not queued whole
+    slots = threading.BoundedSemaphore(args.concurrency * 2)
+    counts = {"ok": 0, "failed": 0, "skipped": 0}
+
+    with open(args.output, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+
+        def _write(future) -> None:
+            record = future.result()
+            with write_lock:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                counts[record["status"]] += 1
+            slots.release()
+            print(f"[{record['status']}] {record['id']} ({record['elapsed_seconds']}s)", file=sys.stderr)
+
+        for item in iter_items(args.input):
+            if item["id"] in completed:
+                counts["skipped"] += 1
+                continue
+            slots.acquire()
+            future = pool.submit(
+                process_item,
+                item,
+                provider=provider,
+                api_key=api_key,
+                single_pass=args.single_pass,
+            )
+            future.add_done_callback(_write)
+
+    print(f"Done: {counts['ok']} ok, {counts['failed']} failed, {counts['skipped']} already completed.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Local stand-in for the parts of google.genai.Client the services use.
+
+install() swaps genai.Client for FakeClient and empties the client pool in
+config and the model handles in services.gemini, so every transcribe/summarize/extract call in this process (sync or
+through client.aio) is answered locally with a configurable delay and failure
+rate.
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from typing import Any, Optional
+
+import google.genai as genai
+
+import config
+from services import gemini
+
+FAKE_TRANSCRIPT = (
+    "Agent: Thank you for calling, how can I help? "
+    "Caller: Hi, this is Anita Sharma. I'm calling about my auto policy, submission SUB-1001. "
+    "My mobile number is 9876543210. I wanted to check the status of my claim. "
+    "Agent: Let me look that up for you. It is active and the renewal is due next month. "
+    "Caller: Great, thank you."
+)
+
+FAKE_SUMMARY = (
+    "Purpose: Status check on an auto policy.\n"
+    "Key details:\n- Submission SUB-1001\n- Policy is active\n"
+    "Customer sentiment: Positive\n"
+    "Next steps:\n- Remind caller about renewal"
+)
+
+FAKE_CALLER = {"name": "Anita Sharma", "mobile_number": "9876543210", "submission_number": "SUB-1001"}
+
+
+class FakeAPIError(Exception):
+    """Raised for injected failures; carries an HTTP-like status code (429 by default)."""
+
+    def __init__(self, code: int = 429, message: str = "Resource exhausted (injected)") -> None:
+        super().__init__(message)
+        self.code = code
+
+
+class FakeResponse:
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.usage_metadata = None
+
+
+class FakeFile:
+    def __init__(self, name: str, mime_type: str) -> None:
+        self.name = name
+        self.mime_type = mime_type
+
+
+class FakeBehaviour:
+    """Latency and failure settings shared by every fake client."""
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.05, per_kb: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = None) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.per_kb = per_kb
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _draw(self, payload_bytes: int):
+        with self._lock:
+            self.calls += 1
+            fail = self.random.random() < self.failure_rate
+            delay = self.latency + self.random.uniform(-self.jitter, self.jitter) + self.per_kb * payload_bytes / 1024.0
+        return max(0.0, delay), fail
+
+    def wait(self, payload_bytes: int) -> None:
+        delay, fail = self._draw(payload_bytes)
+        time.sleep(delay)
+        if fail:
+            raise FakeAPIError()
+
+    async def async_wait(self, payload_bytes: int) -> None:
+        delay, fail = self._draw(payload_bytes)
+        await asyncio.sleep(delay)
+        if fail:
+            raise FakeAPIError()
+
+
+def _payload_size(contents: Any) -> int:
+    total = 0
+    for item in contents if isinstance(contents, list) else [contents]:
+        if isinstance(item, str):
+            total += len(item)
+        elif getattr(item, "inline_data", None) is not None:
+            total += len(item.inline_data.data or b"")
+    return total
+
+
+def _has_audio(contents: Any) -> bool:
+    items = contents if isinstance(contents, list) else [contents]
+    return any(getattr(item, "inline_data", None) is not None or isinstance(item, FakeFile) for item in items)
+
+
+def _answer(contents: Any, config: Any) -> FakeResponse:
+    prompt = " ".join(item for item in (contents if isinstance(contents, list) else [contents]) if isinstance(item, str))
+    if _has_audio(contents):
+        return FakeResponse(FAKE_TRANSCRIPT)
+    if config is not None and getattr(config, "response_schema", None):
+        summary = {
+            "purpose": "Status check on an auto policy.",
+            "key_details": ["Submission SUB-1001", "Policy is active"],
+            "customer_sentiment": "Positive",
+            "next_steps": ["Remind caller about renewal"],
+        }
+        return FakeResponse(json.dumps({"summary": summary, "caller": FAKE_CALLER}))
+    if "Extract caller details" in prompt:
+        return FakeResponse(json.dumps(FAKE_CALLER))
+    return FakeResponse(FAKE_SUMMARY)
+
+
+class _FakeModels:
+    def __init__(self, behaviour: FakeBehaviour) -> None:
+        self.behaviour = behaviour
+
+    def generate_content(self, *, model: str, contents: Any, config: Any = None) -> FakeResponse:
+        self.behaviour.wait(_payload_size(contents))
+        return _answer(contents, config)
+
+    def generate_content_stream(self, *, model: str, contents: Any, config: Any = None):
+        text = self.generate_content(model=model, contents=contents, config=config).text
+        for start in range(0, len(text), 16):
+            yield FakeResponse(text[start:start + 16])
+
+
+class _FakeFiles:
+    def __init__(self, behaviour: FakeBehaviour) -> None:
+        self.behaviour = behaviour
+        self._counter = 0
+
+    def upload(self, *, file: Any, config: Any = None) -> FakeFile:
+        self.behaviour.wait(0)
+        return self.upload_done(config)
+
+    def upload_done(self, config: Any) -> FakeFile:
+        self._counter += 1
+        mime_type = (config or {}).get("mime_type", "audio/wav") if isinstance(config, dict) else "audio/wav"
+        return FakeFile(f"files/fake-{self._counter}", mime_type)
+
+    def delete(self, *, name: str, config: Any = None) -> None:
+        return None
+
+
+class _FakeAsyncModels:
+    def __init__(self, behaviour: FakeBehaviour) -> None:
+        self.behaviour = behaviour
+
+    async def generate_content(self, *, model: str, contents: Any, config: Any = None) -> FakeResponse:
+        await self.behaviour.async_wait(_payload_size(contents))
+        return _answer(contents, config)
+
+    async def generate_content_stream(self, *, model: str, contents: Any, config: Any = None):
+        text = (await self.generate_content(model=model, contents=contents, config=config)).text
+
+        async def chunks():
+            for start in range(0, len(text), 16):
+                yield FakeResponse(text[start:start + 16])
+
+        return chunks()
+
+
+class _FakeAsyncFiles:
+    def __init__(self, files: _FakeFiles) -> None:
+        self._files = files
+
+    async def upload(self, *, file: Any, config: Any = None) -> FakeFile:
+        await self._files.behaviour.async_wait(0)
+        return self._files.upload_done(config)
+
+    async def delete(self, *, name: str, config: Any = None) -> None:
+        return None
+
+
+class _FakeAio:
+    def __init__(self, behaviour: FakeBehaviour, files: _FakeFiles) -> None:
+        self.models = _FakeAsyncModels(behaviour)
+        self.files = _FakeAsyncFiles(files)
+
+
+class FakeClient:
+    behaviour = FakeBehaviour()
+
+    def __init__(self, *, api_key: Optional[str] = None, **_: Any) -> None:
+        self.api_key = api_key
+        self.models = _FakeModels(self.behaviour)
+        self.files = _FakeFiles(self.behaviour)
+        self.aio = _FakeAio(self.behaviour, self.files)
+
+
+def install(latency: float = 0.2, jitter: float = 0.05, per_kb: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = None) -> FakeBehaviour:
+    """Route all Gemini calls in this process to FakeClient and return its behaviour settings."""
+    FakeClient.behaviour = FakeBehaviour(latency, jitter, per_kb, failure_rate, seed)
+    genai.Client = FakeClient
+    config._clients.clear()
+    gemini._models.clear()
+    return FakeClient.behaviour
@@ -0,0 +1,277 @@
+"""Benchmarks for the call pipeline and submission lookups, runnable without an API key.
+
+    python -m benchmarks.run --output bench_results.json
+    python -m benchmarks.run --only lookup --lookup-sizes 1000,100000,10000000
+
+Gemini is replaced by benchmarks.fake_genai (see --latency / --failure-rate),
+Twilio downloads are served from a synthetic WAV, and every run writes one JSON
+document so results from two revisions can be diffed or compared by script.
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from benchmarks import fake_genai
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    return {
+        "count": len(ordered),
+        "mean": statistics.fmean(ordered),
+        "p50": pick(0.5),
+        "p90": pick(0.9),
+        "p99": pick(0.99),
+        "max": ordered[-1],
+    }
+
+
+def synthetic_wav(seconds: float, sample_rate: int = 8000) -> bytes:
+    """Tone bursts separated by short pauses, shaped like a Twilio 8 kHz mono recording."""
+    from services.audio import encode_wav
+
+    t = np.arange(int(seconds * sample_rate), dtype=np.float32) / sample_rate
+    signal = 0.3 * np.sin(2 * np.pi * 220 * t).astype(np.float32)
+    gate = (np.floor(t / 1.5) % 3 == 2)
+    signal[gate] *= 0.001
+    return encode_wav(signal, sample_rate)
+
+
+class _FakeDownload:
+    def __init__(self, body: bytes) -> None:
+        self.body = body
+
+    def __enter__(self) -> "_FakeDownload":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+    def raise_for_status(self) -> None:
+        return None
+
+    def iter_content(self, chunk_size: int = 65536):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+
+def _patch_downloads(body: bytes) -> None:
+    # services.pipeline imports requests inside download_recording, so patch the module itself
+    import requests
+
+    requests.get = lambda url, **kwargs: _FakeDownload(body)
+
+
+def bench_pipeline(jobs: int, recording_seconds: float, poll_interval: float) -> Dict[str, Any]:
+    """Drive /twilio/recording and /call/result through Flask's test client."""
+    import flask_app
+
+    _patch_downloads(synthetic_wav(recording_seconds))
+    client = flask_app.app.test_client()
+    run_id = f"bench-{int(time.time() * 1000)}"
+    submitted: Dict[str, float] = {}
+    webhook_latency: List[float] = []
+    started = time.perf_counter()
+    for i in range(jobs):
+        call_sid = f"{run_id}-{i}"
+        t0 = time.perf_counter()
+        resp = client.post("/twilio/recording", data={"RecordingUrl": f"https://example.invalid/{call_sid}", "CallSid": call_sid})
+        webhook_latency.append(time.perf_counter() - t0)
+        if resp.status_code >= 300:
+            raise RuntimeError(f"/twilio/recording returned {resp.status_code}")
+        submitted[call_sid] = t0
+
+    end_to_end: List[float] = []
+    failed = 0
+    pending = dict(submitted)
+    while pending:
+        for call_sid in list(pending):
+            resp = client.get(f"/call/result/{call_sid}")
+            if resp.status_code == 200 or resp.status_code == 500:
+                end_to_end.append(time.perf_counter() - pending.pop(call_sid))
+                failed += resp.status_code == 500
+        if pending:
+            time.sleep(poll_interval)
+    wall = time.perf_counter() - started
+    return {
+        "jobs": jobs,
+        "recording_seconds": recording_seconds,
+        "failed": failed,
+        "wall_seconds": wall,
+        "throughput_jobs_per_second": jobs / wall if wall else 0.0,
+        "webhook_latency_seconds": _percentiles(webhook_latency),
+        "end_to_end_latency_seconds": _percentiles(end_to_end),
+    }
+
+
+def bench_job_memory(recording_seconds: List[float]) -> List[Dict[str, Any]]:
+    """Peak traced Python allocation of one process_recording call per recording length."""
+    from services.pipeline import process_recording
+
+    results = []
+    for seconds in recording_seconds:
+        _patch_downloads(synthetic_wav(seconds))
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        process_recording("https://example.invalid/memory", provider="gemini", api_key="bench")
+        elapsed = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results.append({"recording_seconds": seconds, "peak_bytes": peak, "elapsed_seconds": elapsed})
+    return results
+
+
+def _write_synthetic_submissions(path: Path, rows: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    first = ["Anita", "Rohit", "Sunita", "Vikram", "Priya", "Arjun", "Meera", "Kiran", "Deepak", "Lakshmi"]
+    last = ["Sharma", "Kumar", "Rao", "Singh", "Iyer", "Patel", "Nair", "Reddy", "Das", "Gupta"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["submission_number", "name", "mobile_number", "policy_type", "status", "premium", "created_at"])
+        for i in range(rows):
+            writer.writerow([
+                f"SUB-{100000 + i}",
+                f"{rng.choice(first)} {rng.choice(last)} {i}",
+                f"9{i:09d}",
+                rng.choice(["Auto", "Health", "Property"]),
+                rng.choice(["Active", "Pending", "Closed"]),
+                rng.randrange(5000, 50000),
+                "2025-11-20",
+            ])
+
+
+def _lookups_per_second(fn: Callable[[Any], Any], queries: List[Any]) -> float:
+    t0 = time.perf_counter()
+    for query in queries:
+        fn(query)
+    elapsed = time.perf_counter() - t0
+    return len(queries) / elapsed if elapsed else float("inf")
+
+
+def bench_lookup(sizes: List[int], queries: int) -> List[Dict[str, Any]]:
+    import services.submissions as submissions
+    from models import ExtractedInfo
+
+    results = []
+    original_data_path = submissions.DATA_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            csv_path = Path(tmp) / f"submissions_{rows}.csv"
+            _write_synthetic_submissions(csv_path, rows)
+            rng = random.Random(rows)
+            picks = [rng.randrange(rows) for _ in range(queries)]
+            by_submission = [ExtractedInfo(submission_number=f"SUB-{100000 + i}") for i in picks]
+            by_mobile = [ExtractedInfo(mobile_number=f"+91 9{i:09d}") for i in picks]
+            by_name = [ExtractedInfo(name=f"{i} ") for i in picks[: max(1, queries // 10)]]
+            entry: Dict[str, Any] = {"rows": rows}
+
+            submissions.DATA_PATH = csv_path
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            submissions.get_index()
+            entry["csv_index_build_seconds"] = time.perf_counter() - t0
+            entry["csv_index_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            index = submissions.get_index()
+            entry["csv"] = {
+                "submission_lookups_per_second": _lookups_per_second(lambda q: index.by_submission_number(q.submission_number), by_submission),
+                "mobile_lookups_per_second": _lookups_per_second(lambda q: index.by_mobile_digits(q.normalized_mobile()), by_mobile),
+                "name_lookups_per_second": _lookups_per_second(lambda q: index.by_name_contains(q.name), by_name),
+            }
+            # Drop the in-memory index before measuring the out-of-core backend
+            submissions._index = submissions._EMPTY_INDEX
+
+            db_path = Path(tmp) / f"submissions_{rows}.db"
+            t0 = time.perf_counter()
+            submissions.convert_csv_to_sqlite(csv_path, db_path)
+            entry["sqlite_convert_seconds"] = time.perf_counter() - t0
+            entry["sqlite_bytes"] = db_path.stat().st_size
+            store = submissions.SqliteSubmissionStore(db_path)
+            entry["sqlite"] = {
+                "submission_lookups_per_second": _lookups_per_second(lambda q: store.by_submission_number(q.submission_number), by_submission),
+                "mobile_lookups_per_second": _lookups_per_second(lambda q: store.by_mobile_digits(q.normalized_mobile()), by_mobile),
+                "name_lookups_per_second": _lookups_per_second(lambda q: store.by_name_contains(q.name), by_name),
+            }
+            results.append(entry)
+            print(f"lookup rows={rows}: {json.dumps(entry)}", file=sys.stderr)
+    submissions.DATA_PATH = original_data_path
+    return results
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run pipeline and lookup benchmarks against a local Gemini stand-in.")
+    parser.add_argument("--output", type=Path, default=Path("bench_results.json"))
+    parser.add_argument("--only", choices=["pipeline", "memory", "lookup"], action="append", help="Run only these benchmarks")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake model latency in seconds per call")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of fake model calls that raise a 429-style error")
+    parser.add_argument("--jobs", type=int, default=20, help="Recording callbacks sent in the pipeline benchmark")
+    parser.add_argument("--recording-seconds", type=float, default=60.0)
+    parser.add_argument("--memory-seconds", default="60,300,600", help="Recording lengths for the per-job memory benchmark")
+    parser.add_argument("--lookup-sizes", default="1000,10000,100000,1000000", help="Dataset sizes (add 10000000 for the full sweep)")
+    parser.add_argument("--lookup-queries", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    selected = set(args.only or ["pipeline", "memory", "lookup"])
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench-"))
+    os.environ.update({
+        "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY", "bench"),
+        "CACHE_ENABLED": "false",
+        "CALL_RESULTS_DB": str(workdir / "call_results.db"),
+    })
+    from config import reload_settings
+
+    reload_settings()
+    behaviour = fake_genai.install(latency=args.latency, failure_rate=args.failure_rate, seed=args.seed)
+
+    report: Dict[str, Any] = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "fake_genai": {"latency": args.latency, "failure_rate": args.failure_rate},
+        "results": {},
+    }
+    if "pipeline" in selected:
+        report["results"]["pipeline"] = bench_pipeline(args.jobs, args.recording_seconds, poll_interval=0.01)
+    if "memory" in selected:
+        lengths = [float(value) for value in args.memory_seconds.split(",") if value]
+        report["results"]["job_memory"] = bench_job_memory(lengths)
+    if "lookup" in selected:
+        sizes = [int(value) for value in args.lookup_sizes.split(",") if value]
+        report["results"]["lookup"] = bench_lookup(sizes, args.lookup_queries)
+    report["fake_genai"]["calls"] = behaviour.calls
+
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"Wrote {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
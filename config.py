@@ -1,39 +1,125 @@
 import os
-from typing import Optional
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, Mapping, Optional
 from dotenv import load_dotenv
-import google.genai as genai
+
+if TYPE_CHECKING:
+    import google.genai as genai
 
 SUPPORTED_PROVIDERS = ("gemini",)
 
+
+@dataclass(frozen=True)
+class Settings:
+    """Snapshot of the environment (after .env is applied), taken once and reused.
+
+    Call reload_settings() to pick up changes to .env or os.environ.
+    """
+
+    env: Mapping[str, str]
+    provider: str
+    google_api_key: Optional[str]
+    transcription_model: str
+    chat_model: str
+
+    @classmethod
+    def load(cls) -> "Settings":
+        load_dotenv(override=False)
+        env = MappingProxyType(dict(os.environ))
+        return cls(
+            env=env,
+            provider=env.get("PROVIDER", "gemini").strip().lower(),
+            google_api_key=env.get("GOOGLE_API_KEY") or None,
+            transcription_model=env.get("GEMINI_TRANSCRIPTION_MODEL", "models/gemini-1.5-flash"),
+            chat_model=env.get("GEMINI_CHAT_MODEL", "models/gemini-1.5-flash"),
+        )
+
+
+_settings: Optional[Settings] = None
+_settings_lock = threading.Lock()
+
+
+def get_settings() -> Settings:
+    global _settings
+    if _settings is None:
+        with _settings_lock:
+            if _settings is None:
+                _settings = Settings.load()
+    return _settings
+
+
+def reload_settings() -> Settings:
+    global _settings
+    with _settings_lock:
+        _settings = Settings.load()
+    return _settings
+
+
 def load_env_if_present() -> None:
-    load_dotenv(override=False)
+    get_settings()
 
 def get_env(key: str, default: Optional[str] = None) -> Optional[str]:
-    load_env_if_present()
-    return os.getenv(key, default)
+    return get_settings().env.get(key, default)
 
-def configure_gemini_client(explicit_api_key: Optional[str] = None) -> None:
-    load_env_if_present()
-    api_key = explicit_api_key or os.getenv("GOOGLE_API_KEY")
+def get_bool_env(key: str, default: bool = False) -> bool:
+    value = get_env(key)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def genai_types():
+    """google.genai.types, imported on first use rather than when config is imported."""
+    from google.genai import types
+
+    return types
+
+
+_clients: Dict[str, "genai.Client"] = {}
+_clients_lock = threading.Lock()
+
+
+def resolve_api_key(explicit_api_key: Optional[str]) -> str:
+    api_key = explicit_api_key or get_settings().google_api_key
     if not api_key:
         raise RuntimeError("GOOGLE_API_KEY is not set. Provide it via env or UI.")
-    genai.configure(api_key=api_key)
+    return api_key
+
+def get_gemini_client(explicit_api_key: Optional[str] = None) -> "genai.Client":
+    """Return the pooled client for this API key, creating it on first use.
+
+    Clients are keyed by API key, so sessions using different keys never share
+    or overwrite each other's client.
+    """
+    api_key = resolve_api_key(explicit_api_key)
+    client = _clients.get(api_key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(api_key)
+            if client is None:
+                # The SDK takes about half a second to import, so it loads with the first client
+                import google.genai as genai
+
+                client = genai.Client(api_key=api_key)
+                _clients[api_key] = client
+    return client
+
+def configure_gemini_client(explicit_api_key: Optional[str] = None) -> "genai.Client":
+    return get_gemini_client(explicit_api_key)
 
 def get_provider() -> str:
-    load_env_if_present()
-    provider = os.getenv("PROVIDER", "gemini").strip().lower()
+    provider = get_settings().provider
     if provider not in SUPPORTED_PROVIDERS:
         raise RuntimeError(f"Unsupported PROVIDER '{provider}'. Use one of {SUPPORTED_PROVIDERS}.")
     return provider
 
 def get_default_models(provider: Optional[str] = None) -> dict:
-    load_env_if_present()
     selected = provider or get_provider()
     if selected == "gemini":
+        settings = get_settings()
         return {
-            "transcription_model": os.getenv("GEMINI_TRANSCRIPTION_MODEL", "models/gemini-1.5-flash"),
-            "chat_model": os.getenv("GEMINI_CHAT_MODEL", "models/gemini-1.5-flash"),
+            "transcription_model": settings.transcription_model,
+            "chat_model": settings.chat_model,
         }
     raise RuntimeError(f"Unsupported provider '{selected}'")
-
-
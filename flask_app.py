@@ -1,30 +1,33 @@
 import os
-from io import BytesIO
-from typing import Any, Dict
+import time
 
-import requests
-from flask import Flask, jsonify, request, Response
-from twilio.rest import Client
-from twilio.twiml.voice_response import VoiceResponse
+# Reported as startup_phase_seconds{phase="import_app"} once the module has loaded
+_import_started = time.perf_counter()
 
-from config import get_env, get_provider
-from models import ExtractedInfo
-from services.submissions import find_submission
-from services.summarize import extract_caller_info, summarize_transcript
-from services.transcribe import transcribe_audio
+from typing import Dict, Iterator
 
-app = Flask(__name__)
+from flask import Flask, jsonify, request, Response, stream_with_context
+from flask_sock import Sock
+from pydantic import ValidationError
+from simple_websocket import ConnectionClosed
 
+from config import get_env, get_provider
+from models import SubmissionLookupRequest
+from services.cache import get_cache
+from services.jobs import JOB_DONE, JOB_FAILED, JobQueue
+from services.metrics import render as render_metrics
+from services.results import result_payload, sse_message
+from services.startup import STARTUP_SECONDS
+from services.telephony import get_twilio_client, pipeline_api_key, voice_twiml
 
-CALL_RESULTS: Dict[str, Dict[str, Any]] = {}
+# The pipeline (numpy, google.genai) and the Twilio SDK are imported by the routes
+# that need them, so a cold worker answers /health without loading them.
 
+app = Flask(__name__)
+sock = Sock(app)
 
-def get_twilio_client() -> Client:
-    account_sid = get_env("TWILIO_ACCOUNT_SID")
-    auth_token = get_env("TWILIO_AUTH_TOKEN")
-    if not account_sid or not auth_token:
-        raise RuntimeError("TWILIO_ACCOUNT_SID or TWILIO_AUTH_TOKEN not set")
-    return Client(account_sid, auth_token)
+
+JOBS = JobQueue.from_env()
 
 
 @app.get("/health")
@@ -32,6 +35,21 @@ def health() -> Dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/cache/stats")
+def cache_stats() -> Response:
+    """Hit/miss counters of this worker's transcription and LLM result cache."""
+    cache = get_cache()
+    if cache is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **cache.stats()})
+
+
+@app.get("/metrics")
+def metrics() -> Response:
+    """Prometheus metrics for this worker (stage latencies, bytes, tokens, cache and queue)."""
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
 @app.get("/")
 def index():
     return {"status": "ok", "message": "Insurance Gemini backend is running."}
@@ -73,70 +91,134 @@ def start_call() -> Response:
 
 @app.post("/twilio/voice")
 def twilio_voice() -> Response:
-    """TwiML for inbound/outbound calls.
-
-    For simplicity, this plays a short message and records the call.
-    After hangup, Twilio will POST to /twilio/recording with the recording URL.
-    """
-    public_base_url = get_env("PUBLIC_BASE_URL") or ""
-    recording_callback = f"{public_base_url}/twilio/recording" if public_base_url else ""
-
-    vr = VoiceResponse()
-    vr.say("Thank you for calling. This call will be recorded for quality and training purposes.")
-    vr.record(
-        max_length="600",
-        play_beep=True,
-        recording_status_callback=recording_callback or None,
-        recording_status_callback_method="POST",
-    )
-    vr.say("Goodbye.")
-
-    return Response(str(vr), mimetype="text/xml")
+    """TwiML that records the call (see services.telephony.voice_twiml)."""
+    return Response(voice_twiml(), mimetype="text/xml")
 
 
 @app.post("/twilio/recording")
 def twilio_recording() -> Response:
-    """Handles Twilio recording status callback, downloads audio, and runs the pipeline."""
+    """Handles Twilio recording status callback by queueing the pipeline for the call.
+
+    Returns immediately; repeated deliveries for the same CallSid reuse the existing job.
+    """
     recording_url = request.form.get("RecordingUrl")
     call_sid = request.form.get("CallSid")
 
     if not recording_url or not call_sid:
         return ("Missing RecordingUrl or CallSid", 400)
 
-    # Twilio RecordingUrl does not include extension; append .wav for a WAV file
-    audio_url = f"{recording_url}.wav"
-    resp = requests.get(audio_url, stream=True, timeout=60)
-    resp.raise_for_status()
+    from services.pipeline import process_recording
 
-    audio_bytes = BytesIO(resp.content)
+    JOBS.submit(
+        call_sid, process_recording, recording_url, provider=get_provider(), api_key=pipeline_api_key(), call_sid=call_sid
+    )
 
-    provider = get_provider()
-    api_key_env = "OPENAI_API_KEY" if provider == "openai" else "GOOGLE_API_KEY"
-    api_key = os.getenv(api_key_env)
+    return ("", 204)
 
-    # Run existing pipeline
-    transcript = transcribe_audio(audio_bytes, provider=provider, api_key=api_key)
-    summary = summarize_transcript(transcript, provider=provider, api_key=api_key)
-    extracted: ExtractedInfo = extract_caller_info(transcript, provider=provider, api_key=api_key)
-    submission = find_submission(extracted)
 
-    CALL_RESULTS[call_sid] = {
-        "transcript": transcript,
-        "summary": summary,
-        "extracted": extracted.model_dump(),
-        "submission": submission,
-    }
+@sock.route("/twilio/media")
+def twilio_media(ws) -> None:
+    """Twilio Media Streams WebSocket: transcribe the call incrementally while it is in progress."""
+    from services.live import handle_media_stream
 
-    return ("", 204)
+    def receive():
+        try:
+            return ws.receive()
+        except ConnectionClosed:
+            return None
+
+    handle_media_stream(receive, provider=get_provider(), api_key=pipeline_api_key())
 
 
 @app.get("/call/result/<call_sid>")
 def call_result(call_sid: str) -> Response:
-    """Return processed call results (if available)."""
-    result = CALL_RESULTS.get(call_sid)
-    if not result:
-        return jsonify({"status": "pending", "call_sid": call_sid}), 404
-    return jsonify({"status": "ready", "call_sid": call_sid, **result})
+    """Return processed call results (if available) along with the job state.
+
+    With ?wait=<seconds> (capped by CALL_RESULT_MAX_WAIT_SECONDS) the request is
+    held until the job finishes or the wait runs out, instead of returning
+    "pending" straight away.
+    """
+    try:
+        wait = float(request.args.get("wait") or 0)
+    except ValueError:
+        return jsonify({"error": "wait must be a number of seconds"}), 400
+    wait = min(max(wait, 0.0), float(get_env("CALL_RESULT_MAX_WAIT_SECONDS", "30")))
+    if wait > 0:
+        poll_seconds = float(get_env("CALL_EVENTS_POLL_SECONDS", "0.25"))
+        record = JOBS.store.wait_until_finished(call_sid, wait, poll_seconds)
+    else:
+        record = JOBS.get(call_sid)
+    body, status = result_payload(call_sid, record)
+    return jsonify(body), status
+
+
+@app.get("/call/events/<call_sid>")
+def call_events(call_sid: str) -> Response:
+    """Server-Sent Events stream of pipeline progress for a call.
+
+    Sends "stage", "transcript", "summary_delta" and "summary" events as the job
+    writes them (from any worker), then a final "end" event with the job state
+    and, when ready, the full result (the same body as /call/result). Reconnecting clients resume after the
+    Last-Event-ID header (or ?after=). Needs a threaded or async gunicorn
+    worker class, since each open stream holds a worker thread.
+    """
+    store = JOBS.store
+    try:
+        after = int(request.headers.get("Last-Event-ID") or request.args.get("after") or 0)
+    except ValueError:
+        after = 0
+    poll_seconds = float(get_env("CALL_EVENTS_POLL_SECONDS", "0.25"))
+    max_seconds = float(get_env("CALL_EVENTS_MAX_SECONDS", "900"))
+    keepalive_seconds = 15.0
+
+    def generate(last: int) -> Iterator[str]:
+        deadline = time.monotonic() + max_seconds
+        quiet_since = time.monotonic()
+        while time.monotonic() < deadline:
+            events = store.events_since(call_sid, last)
+            if not events:
+                record = store.get(call_sid)
+                if record is not None and record["state"] in (JOB_DONE, JOB_FAILED):
+                    # The job writes its events before it is marked finished, so drain once more
+                    events = store.events_since(call_sid, last)
+                    for item in events:
+                        yield sse_message(item["event"], item["data"], item["id"])
+                    yield sse_message("end", result_payload(call_sid, record)[0])
+                    return
+                if time.monotonic() - quiet_since >= keepalive_seconds:
+                    quiet_since = time.monotonic()
+                    yield ": keep-alive\n\n"
+                store.wait_for_events(poll_seconds)
+                continue
+            for item in events:
+                yield sse_message(item["event"], item["data"], item["id"])
+                last = item["id"]
+            quiet_since = time.monotonic()
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream_with_context(generate(after)), mimetype="text/event-stream", headers=headers)
+
+
+@app.post("/submissions/lookup")
+def submissions_lookup() -> Response:
+    """Resolve a batch of extracted caller details against the submissions data.
+
+    Expects JSON: {"records": [{"name": ..., "mobile_number": ..., "submission_number": ...}, ...],
+    "top_k": 3, "min_score": 0.5} (top_k and min_score optional). Each result
+    has the ranked "candidates" (score and per-field similarities) and the
+    accepted "match", or null when no candidate is confident and unambiguous.
+    """
+    try:
+        body = SubmissionLookupRequest.model_validate(request.get_json(force=True, silent=True))
+    except ValidationError as exc:
+        return jsonify({"error": "Invalid lookup request", "details": exc.errors(include_url=False)}), 400
+
+    from services.matching import lookup_batch
+
+    return jsonify({"results": lookup_batch(body.records, body.top_k, body.min_score)})
+
+
+STARTUP_SECONDS.set(time.perf_counter() - _import_started, phase="import_app")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,34 @@
+"""Gunicorn settings for the Flask backend (used by render.yaml).
+
+Each worker starts answering requests, /health included, as soon as
+flask_app is imported; the heavy SDKs load on first use. post_worker_init
+then warms the worker up in the background (services.startup): it imports
+the pipeline, creates the Gemini and Twilio clients and builds the
+submissions index, so the first call does not pay for them. Set
+WARMUP_ON_START=false to skip the warm-up.
+
+Workers are threaded (gthread): SSE streams on /call/events, long-polls on
+/call/result?wait= and /twilio/media websockets each hold a thread for their
+whole length, so with sync workers one of them would block the worker.
+GUNICORN_THREADS sets the threads per worker (WEB_CONCURRENCY the workers).
+The gthread heartbeat runs on the worker's main loop, so timeout only has to
+cover a stalled worker, not the longest request.
+"""
+
+import os
+
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+
+def post_worker_init(worker):
+    from services.startup import start_warm_up
+
+    def _log(timings):
+        summary = ", ".join(f"{step} {seconds * 1000:.0f} ms" for step, seconds in timings.items())
+        worker.log.info("Warm-up done: %s", summary)
+
+    start_warm_up(on_done=_log)
@@ -1,6 +1,6 @@
-from typing import Optional
+from typing import List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class ExtractedInfo(BaseModel):
@@ -15,3 +15,34 @@ class ExtractedInfo(BaseModel):
         return digits or None
 
 
+class SubmissionLookupRequest(BaseModel):
+    """Body of POST /submissions/lookup."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    records: List[ExtractedInfo] = Field(min_length=1, max_length=1000)
+    top_k: int = Field(default=3, ge=1, le=50)
+    min_score: Optional[float] = Field(default=None, ge=0.0, le=1.0)
+
+
+class CallSummary(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    purpose: str
+    key_details: List[str] = Field(default_factory=list)
+    customer_sentiment: str
+    next_steps: List[str] = Field(default_factory=list)
+
+    def to_text(self) -> str:
+        lines = [f"Purpose: {self.purpose}", "Key details:"]
+        lines.extend(f"- {detail}" for detail in self.key_details)
+        lines.append(f"Customer sentiment: {self.customer_sentiment}")
+        lines.append("Next steps:")
+        lines.extend(f"- {step}" for step in self.next_steps)
+        return "\n".join(lines)
+
+
+class CallAnalysis(BaseModel):
+    summary: str
+    extracted: ExtractedInfo = Field(default_factory=ExtractedInfo)
+    structured_summary: Optional[CallSummary] = Field(default=None)
@@ -0,0 +1,621 @@
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import wave
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+FRAME_SECONDS = 0.02
+SILENCE_FLOOR_DBFS = -45.0
+# Trimming that would keep less than this share of the frames is taken for a misjudged quiet recording
+MIN_KEPT_FRACTION = 0.05
+# Changes which frames trimming keeps; part of the transcript cache key
+TRIM_VERSION = "2"
+TARGET_SAMPLE_RATE = 16000
+HEADER_BYTES = 16
+# Audio handled at once when streaming a recording, so memory does not grow with its length
+BLOCK_SECONDS = 10.0
+
+
+class WavAudio:
+    """Decoded PCM audio as float32 samples in [-1, 1], shaped (frames, channels)."""
+
+    def __init__(self, samples: np.ndarray, sample_rate: int) -> None:
+        self.samples = samples
+        self.sample_rate = sample_rate
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / float(self.sample_rate) if self.sample_rate else 0.0
+
+    @property
+    def frames(self) -> int:
+        return len(self.samples)
+
+    def mono(self) -> np.ndarray:
+        if self.samples.ndim == 1:
+            return self.samples
+        return self.samples.mean(axis=1, dtype=np.float32)
+
+    def read(self, start: int, end: int) -> np.ndarray:
+        return self.samples[start:end]
+
+    def frame_rms(self) -> np.ndarray:
+        return frame_rms(self.mono(), self.sample_rate)
+
+
+def _open_wav(source: Any) -> wave.Wave_read:
+    if isinstance(source, (str, os.PathLike)):
+        return wave.open(os.fspath(source), "rb")
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return wave.open(io.BytesIO(source), "rb")
+    source.seek(0)
+    return wave.open(source, "rb")
+
+
+def _pcm_to_float(raw: bytes, width: int) -> Optional[np.ndarray]:
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        packed = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        ints = (packed[:, 0].astype(np.int32) | (packed[:, 1].astype(np.int32) << 8) | (packed[:, 2].astype(np.int32) << 16))
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        samples = ints.astype(np.float32) / 8388608.0
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        return None
+    return samples
+
+
+def read_wav(source: Any) -> Optional[WavAudio]:
+    """Decode a PCM WAV from a path, bytes-like buffer or binary file; None if it is not PCM WAV."""
+    try:
+        with _open_wav(source) as wav:
+            channels = wav.getnchannels()
+            width = wav.getsampwidth()
+            rate = wav.getframerate()
+            raw = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    finally:
+        if hasattr(source, "seek"):
+            source.seek(0)
+
+    samples = _pcm_to_float(raw, width)
+    if samples is None:
+        return None
+    return WavAudio(samples.reshape(-1, channels), rate)
+
+
+class WavFile:
+    """A PCM WAV read in ranges from a path, bytes-like buffer or binary file, never decoded whole.
+
+    Offers the same reading interface as WavAudio (frames, duration, read,
+    frame_rms), so long recordings can be chunked without holding them in memory.
+    """
+
+    def __init__(self, source: Any, sample_rate: int, channels: int, width: int, frames: int) -> None:
+        self.source = source
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.width = width
+        self.frames = frames
+        # Chunks are read from several threads; a shared file object has one position
+        self._lock = threading.Lock()
+
+    @property
+    def duration(self) -> float:
+        return self.frames / float(self.sample_rate) if self.sample_rate else 0.0
+
+    def read(self, start: int, end: int) -> np.ndarray:
+        """Samples [start, end) as float32, shaped (frames, channels)."""
+        with self._lock, _open_wav(self.source) as wav:
+            wav.setpos(min(start, self.frames))
+            raw = wav.readframes(max(0, min(end, self.frames) - start))
+        return _pcm_to_float(raw, self.width).reshape(-1, self.channels)
+
+    def iter_mono(self, block_frames: int) -> Iterator[np.ndarray]:
+        """Consecutive mono blocks of block_frames samples (the last may be shorter)."""
+        with _open_wav(self.source) as wav:
+            while True:
+                raw = wav.readframes(block_frames)
+                if not raw:
+                    return
+                block = _pcm_to_float(raw, self.width).reshape(-1, self.channels)
+                yield block[:, 0] if self.channels == 1 else block.mean(axis=1, dtype=np.float32)
+
+    def frame_rms(self) -> np.ndarray:
+        levels = [frame_rms(block, self.sample_rate) for block in self.iter_mono(_block_frames(self.sample_rate))]
+        return np.concatenate(levels) if levels else np.zeros(0, dtype=np.float32)
+
+
+# In-memory or file-backed PCM audio with the shared reading interface
+PcmAudio = Union[WavAudio, WavFile]
+
+
+def open_wav(source: Any) -> Optional[WavFile]:
+    """Read only the header of a PCM WAV source; None if it is not PCM WAV."""
+    try:
+        with _open_wav(source) as wav:
+            params = (wav.getframerate(), wav.getnchannels(), wav.getsampwidth(), wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    finally:
+        if hasattr(source, "seek"):
+            source.seek(0)
+    if params[2] not in (1, 2, 3, 4):
+        return None
+    return WavFile(source, *params)
+
+
+def _to_pcm16(samples: np.ndarray) -> bytes:
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2").tobytes()
+
+
+def encode_wav(samples: np.ndarray, sample_rate: int) -> bytes:
+    """Encode mono or (frames, channels) float samples as 16-bit PCM WAV bytes."""
+    if samples.ndim == 1:
+        samples = samples.reshape(-1, 1)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(samples.shape[1])
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(_to_pcm16(samples))
+    return buf.getvalue()
+
+
+def _temp_path(suffix: str) -> Path:
+    fd, name = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    return Path(name)
+
+
+def _open_mono_writer(path: Path, sample_rate: int) -> wave.Wave_write:
+    wav = wave.open(str(path), "wb")
+    wav.setnchannels(1)
+    wav.setsampwidth(2)
+    wav.setframerate(sample_rate)
+    return wav
+
+
+def _mulaw_table() -> np.ndarray:
+    codes = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (codes >> 4) & 0x07
+    magnitude = ((((codes & 0x0F) << 3) + 0x84) << exponent) - 0x84
+    return (np.where(codes & 0x80, -magnitude, magnitude) / 32768.0).astype(np.float32)
+
+
+_MULAW_TO_FLOAT = _mulaw_table()
+
+
+def decode_mulaw(payload: bytes) -> np.ndarray:
+    """Decode G.711 mu-law bytes (Twilio Media Streams audio) to float32 samples."""
+    return _MULAW_TO_FLOAT[np.frombuffer(payload, dtype=np.uint8)]
+
+
+def encode_mulaw(samples: np.ndarray) -> bytes:
+    """Encode float samples in [-1, 1] as G.711 mu-law bytes."""
+    pcm = np.clip(samples * 32768.0, -32635, 32635).astype(np.int32)
+    sign = (pcm < 0).astype(np.int32) << 7
+    biased = np.abs(pcm) + 0x84
+    exponent = np.clip(np.floor(np.log2(biased)).astype(np.int32) - 7, 0, 7)
+    mantissa = (biased >> (exponent + 3)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8).tobytes()
+
+
+def read_header(source: Any, size: int = HEADER_BYTES) -> bytes:
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read(size)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source[:size])
+    source.seek(0)
+    header = source.read(size)
+    source.seek(0)
+    return header
+
+
+def sniff_mime_type(header: bytes) -> str:
+    """Identify the audio container from its first bytes (falls back to audio/wav)."""
+    if header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        return "audio/wav"
+    if header[:3] == b"ID3" or (len(header) > 1 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0 and header[1] & 0x06):
+        return "audio/mpeg"
+    if header[4:8] == b"ftyp":
+        return "audio/mp4"
+    if header[:4] == b"OggS":
+        return "audio/ogg"
+    if header[:4] == b"fLaC":
+        return "audio/flac"
+    if header[:4] == b"FORM" and header[8:12] in (b"AIFF", b"AIFC"):
+        return "audio/aiff"
+    if len(header) > 1 and header[0] == 0xFF and header[1] & 0xF6 == 0xF0:
+        return "audio/aac"
+    if header[:4] == b"\x1a\x45\xdf\xa3":
+        return "audio/webm"
+    return "audio/wav"
+
+
+def convert_with_ffmpeg(source: Any, sample_rate: int = TARGET_SAMPLE_RATE) -> Optional[Path]:
+    """Decode any container ffmpeg understands into a temporary mono 16-bit WAV file.
+
+    Returns None when ffmpeg is not installed or cannot decode the source. The
+    input is piped in blocks and the output goes to disk, so neither is held
+    in memory; the caller deletes the returned file.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return None
+    path = _temp_path(".wav")
+    command = [ffmpeg, "-nostdin", "-loglevel", "error", "-y", "-i"]
+    command.append(os.fspath(source) if isinstance(source, (str, os.PathLike)) else "pipe:0")
+    command += ["-ac", "1", "-ar", str(sample_rate), "-f", "wav", str(path)]
+    if isinstance(source, (str, os.PathLike)):
+        returncode = subprocess.run(command, stdin=subprocess.DEVNULL, capture_output=True).returncode
+    else:
+        proc = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if isinstance(source, (bytes, bytearray, memoryview)):
+                proc.stdin.write(source)
+            else:
+                source.seek(0)
+                shutil.copyfileobj(source, proc.stdin, 64 * 1024)
+                source.seek(0)
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = proc.wait()
+    if returncode != 0 or path.stat().st_size <= 44:
+        path.unlink(missing_ok=True)
+        return None
+    return path
+
+
+def _lowpass_kernel(source_rate: int, target_rate: int) -> np.ndarray:
+    # Cut everything above the new Nyquist frequency to avoid aliasing
+    cutoff = 0.5 * target_rate / source_rate
+    taps = np.arange(-32, 33, dtype=np.float32)
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * taps) * np.hamming(len(taps)).astype(np.float32)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+class StreamResampler:
+    """Resample audio fed in consecutive blocks (see resample).
+
+    The low-pass filter keeps its last input samples and the interpolation
+    keeps its position between blocks, so the output matches resampling the
+    whole signal at once while only one block is ever held.
+    """
+
+    def __init__(self, source_rate: int, target_rate: int) -> None:
+        self.step = source_rate / float(target_rate)
+        self._kernel = _lowpass_kernel(source_rate, target_rate) if target_rate < source_rate else None
+        half = len(self._kernel) // 2 if self._kernel is not None else 0
+        self._half = half
+        self._history = np.zeros(2 * half, dtype=np.float32)
+        self._buffer = np.zeros(0, dtype=np.float32)
+        # Input index of _buffer[0]; the filter output runs half a kernel behind its input
+        self._buffer_start = -half
+        self._emitted = 0
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        if self._kernel is not None:
+            padded = np.concatenate((self._history, block))
+            self._history = padded[len(padded) - 2 * self._half:]
+            block = np.convolve(padded, self._kernel, mode="valid").astype(np.float32)
+        self._buffer = np.concatenate((self._buffer, block))
+        # Outputs whose position has both interpolation neighbours in the buffer
+        last = self._buffer_start + len(self._buffer) - 1
+        return self._emit(int(np.floor(last / self.step)) + 1 if last >= 0 else 0)
+
+    def flush(self, total_frames: int) -> np.ndarray:
+        """The remaining output, given the number of input samples fed in total."""
+        tail = self.process(np.zeros(self._half, dtype=np.float32)) if self._kernel is not None else self._emit(0)
+        return np.concatenate((tail, self._emit(int(round(total_frames / self.step)))))
+
+    def _emit(self, end: int) -> np.ndarray:
+        if end <= self._emitted or not len(self._buffer):
+            return np.zeros(0, dtype=np.float32)
+        # Positions are relative to the buffer, so they stay small whatever the recording's length
+        positions = np.arange(self._emitted, end) * self.step - self._buffer_start
+        out = np.interp(positions, np.arange(len(self._buffer)), self._buffer).astype(np.float32)
+        self._emitted = end
+        drop = min(len(self._buffer), max(0, int(np.floor(end * self.step)) - self._buffer_start))
+        self._buffer = self._buffer[drop:]
+        self._buffer_start += drop
+        return out
+
+
+def resample(mono: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    """Downsample with a windowed-sinc low-pass followed by linear interpolation."""
+    if source_rate == target_rate or len(mono) == 0:
+        return mono
+    resampler = StreamResampler(source_rate, target_rate)
+    block = _block_frames(source_rate)
+    parts = [resampler.process(mono[start:start + block]) for start in range(0, len(mono), block)]
+    parts.append(resampler.flush(len(mono)))
+    return np.concatenate(parts)
+
+
+def _frame_size(sample_rate: int) -> int:
+    return max(1, int(sample_rate * FRAME_SECONDS))
+
+
+def _block_frames(sample_rate: int) -> int:
+    """Samples per streaming block: about BLOCK_SECONDS, a whole number of RMS frames."""
+    frame = _frame_size(sample_rate)
+    return frame * max(1, int(BLOCK_SECONDS / FRAME_SECONDS))
+
+
+def frame_rms(mono: np.ndarray, sample_rate: int, frame_seconds: float = FRAME_SECONDS) -> np.ndarray:
+    """RMS level of consecutive fixed-size frames (the tail shorter than one frame is dropped)."""
+    frame = max(1, int(sample_rate * frame_seconds))
+    count = len(mono) // frame
+    if count == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = mono[: count * frame].reshape(count, frame)
+    return np.sqrt(np.mean(frames * frames, axis=1, dtype=np.float32))
+
+
+def silence_threshold(rms: np.ndarray) -> float:
+    """Level below which a frame counts as silence, adapted to the recording's noise floor."""
+    floor = 10 ** (SILENCE_FLOOR_DBFS / 20.0)
+    if len(rms) == 0:
+        return floor
+    noise_floor, loud = np.percentile(rms, [10, 95])
+    # Twice the noise floor, but never so high that steady speech would count as silence
+    return max(floor, min(float(noise_floor) * 2.0, float(loud) * 0.25))
+
+
+def keep_frames(rms: np.ndarray, max_gap_seconds: float = 0.6) -> np.ndarray:
+    """Frames to keep when trimming: no leading/trailing silence, silent runs cut to max_gap_seconds.
+
+    A recording whose speech sits below the silence floor (a low-gain line)
+    would be trimmed to nothing, so when less than MIN_KEPT_FRACTION survives
+    every frame is kept instead. Only digital silence is dropped entirely.
+    """
+    if not rms.any():
+        return np.zeros(len(rms), dtype=bool)
+    voiced = rms > silence_threshold(rms)
+    if voiced.sum() < MIN_KEPT_FRACTION * len(rms):
+        return np.ones(len(rms), dtype=bool)
+
+    # Position of every frame inside its run of identical voiced/silent flags
+    starts = np.flatnonzero(np.concatenate(([True], voiced[1:] != voiced[:-1])))
+    run_index = np.cumsum(np.concatenate(([False], voiced[1:] != voiced[:-1])))
+    offset = np.arange(len(voiced)) - starts[run_index]
+    keep = voiced | (offset < int(max_gap_seconds / FRAME_SECONDS))
+
+    first, last = np.flatnonzero(voiced)[[0, -1]]
+    keep[:first] = False
+    keep[last + 1:] = False
+    return keep
+
+
+def trim_silence(mono: np.ndarray, sample_rate: int, *, max_gap_seconds: float = 0.6) -> np.ndarray:
+    """Drop leading/trailing silence and shorten internal silent runs to max_gap_seconds."""
+    frame = _frame_size(sample_rate)
+    rms = frame_rms(mono, sample_rate)
+    if len(rms) == 0:
+        return mono
+    keep = keep_frames(rms, max_gap_seconds)
+    return mono[: len(keep) * frame].reshape(-1, frame)[keep].ravel()
+
+
+def split_on_silence(
+    audio: PcmAudio,
+    *,
+    target_seconds: float,
+    overlap_seconds: float,
+    search_seconds: Optional[float] = None,
+) -> List[Tuple[int, int]]:
+    """Plan (start, end) sample ranges of about target_seconds each.
+
+    Each cut is placed at the quietest point within search_seconds before the
+    nominal boundary, so words are rarely split. Every chunk except the last
+    extends overlap_seconds past its cut; the stitcher removes the repeated words.
+    """
+    rate = audio.sample_rate
+    total = audio.frames
+    target = int(target_seconds * rate)
+    if total <= target:
+        return [(0, total)]
+
+    frame = _frame_size(rate)
+    rms = audio.frame_rms()
+    # Smooth over ~200 ms so a single quiet frame between syllables is not chosen
+    window = max(1, int(0.2 / FRAME_SECONDS))
+    smoothed = np.convolve(rms, np.ones(window, dtype=np.float32) / window, mode="same") if len(rms) else rms
+    search = int((search_seconds if search_seconds is not None else target_seconds * 0.25) * rate)
+    overlap = int(overlap_seconds * rate)
+
+    cuts = []
+    start = 0
+    while total - start > target:
+        nominal = start + target
+        lo = max(start + target - search, start + 1) // frame
+        hi = min(nominal, total) // frame
+        if hi > lo and hi <= len(smoothed):
+            # Prefer the quiet spot closest to the nominal boundary to keep chunks even
+            cut = (hi - 1 - int(np.argmin(smoothed[lo:hi][::-1]))) * frame
+        else:
+            cut = nominal
+        cuts.append(cut)
+        start = cut
+
+    ranges = []
+    start = 0
+    for cut in cuts:
+        ranges.append((start, min(total, cut + overlap)))
+        start = cut
+    ranges.append((start, total))
+    return ranges
+
+
+class PreparedAudio:
+    """Preprocessed audio in temporary files: a mono 16-bit WAV (audio) and the file to upload.
+
+    The upload file is the WAV itself unless FLAC was requested and could be
+    written. The caller owns both files and must close() the object.
+    """
+
+    def __init__(self, audio: WavFile, path: Path, mime_type: str, original_bytes: int) -> None:
+        self.audio = audio
+        self.path = path
+        self.mime_type = mime_type
+        self.original_bytes = original_bytes
+
+    def close(self) -> None:
+        for path in {Path(self.audio.source), self.path}:
+            path.unlink(missing_ok=True)
+
+
+def source_size(source: Any) -> int:
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return len(source)
+    source.seek(0, os.SEEK_END)
+    size = source.tell()
+    source.seek(0)
+    return size
+
+
+def _whole_frames(blocks: Iterator[np.ndarray], frame: int) -> Iterator[np.ndarray]:
+    """Regroup sample blocks into (n, frame) arrays; a final partial frame is dropped."""
+    carry = np.zeros(0, dtype=np.float32)
+    for block in blocks:
+        samples = np.concatenate((carry, block))
+        whole = len(samples) // frame * frame
+        if whole:
+            yield samples[:whole].reshape(-1, frame)
+        carry = samples[whole:]
+
+
+def _resampled_blocks(audio: WavFile, rate: int) -> Iterator[np.ndarray]:
+    """Mono blocks of audio at rate (which must not exceed its own)."""
+    if rate == audio.sample_rate:
+        yield from audio.iter_mono(_block_frames(rate))
+        return
+    resampler = StreamResampler(audio.sample_rate, rate)
+    for block in audio.iter_mono(_block_frames(audio.sample_rate)):
+        yield resampler.process(block)
+    yield resampler.flush(audio.frames)
+
+
+def _written(blocks: Iterator[np.ndarray], writer: wave.Wave_write) -> Iterator[np.ndarray]:
+    for block in blocks:
+        writer.writeframes(_to_pcm16(block))
+        yield block
+
+
+def _resample_to_file(audio: WavFile, sample_rate: int, path: Path) -> Tuple[WavFile, np.ndarray]:
+    """Write audio as mono 16-bit WAV at min(its rate, sample_rate); also return its frame RMS levels."""
+    rate = min(audio.sample_rate, sample_rate)
+    levels = []
+    with _open_mono_writer(path, rate) as writer:
+        for frames in _whole_frames(_written(_resampled_blocks(audio, rate), writer), _frame_size(rate)):
+            levels.append(np.sqrt(np.mean(frames * frames, axis=1, dtype=np.float32)))
+    rms = np.concatenate(levels) if levels else np.zeros(0, dtype=np.float32)
+    return open_wav(path), rms
+
+
+def _write_kept_frames(audio: WavFile, keep: np.ndarray, path: Path) -> WavFile:
+    """Copy the frames flagged in keep from a mono 16-bit WAV to a new one, as raw PCM."""
+    frame = _frame_size(audio.sample_rate)
+    block = _block_frames(audio.sample_rate)
+    position = 0
+    with _open_wav(audio.source) as source, _open_mono_writer(path, audio.sample_rate) as writer:
+        while position < len(keep):
+            pcm = np.frombuffer(source.readframes(block), dtype="<i2")
+            count = min(len(pcm) // frame, len(keep) - position)
+            if not count:
+                break
+            frames = pcm[: count * frame].reshape(count, frame)
+            writer.writeframes(frames[keep[position:position + count]].tobytes())
+            position += count
+    return open_wav(path)
+
+
+def _encode_flac(audio: WavFile, path: Path) -> bool:
+    """Write audio as FLAC in blocks; False when the optional soundfile package is missing."""
+    try:
+        import soundfile
+    except ImportError:
+        return False
+    with soundfile.SoundFile(
+        str(path), "w", samplerate=audio.sample_rate, channels=1, format="FLAC", subtype="PCM_16"
+    ) as out:
+        for block in audio.iter_mono(_block_frames(audio.sample_rate)):
+            out.write(block)
+    return True
+
+
+def preprocess_audio(
+    source: Any,
+    *,
+    sample_rate: int = TARGET_SAMPLE_RATE,
+    max_gap_seconds: float = 0.6,
+    encoding: str = "wav",
+) -> Optional[PreparedAudio]:
+    """Shrink a recording before upload: mono, at most sample_rate Hz, silence trimmed.
+
+    PCM WAV is read directly; other containers are converted by ffmpeg (on
+    PATH) into a temporary WAV first. Returns None when the audio cannot be
+    decoded, in which case the caller should send the original bytes labelled
+    with sniff_mime_type. encoding "flac" is used when the optional soundfile
+    package is installed, otherwise 16-bit WAV.
+
+    Everything streams through temporary files in BLOCK_SECONDS blocks: one
+    pass resamples while collecting frame levels, a second copies the frames
+    kept after trimming. Peak memory does not depend on the recording's length.
+    """
+    converted = None
+    if sniff_mime_type(read_header(source)) == "audio/wav":
+        audio = open_wav(source)
+    else:
+        converted = convert_with_ffmpeg(source, sample_rate)
+        audio = open_wav(converted) if converted is not None else None
+    if audio is None:
+        return None
+
+    resampled_path = _temp_path(".wav")
+    try:
+        resampled, rms = _resample_to_file(audio, sample_rate, resampled_path)
+    except BaseException:
+        resampled_path.unlink(missing_ok=True)
+        raise
+    finally:
+        if converted is not None:
+            converted.unlink(missing_ok=True)
+    keep = keep_frames(rms, max_gap_seconds)
+    if keep.all():
+        # Shorter than one frame, or nothing to trim
+        prepared = resampled
+    else:
+        trimmed_path = _temp_path(".wav")
+        try:
+            prepared = _write_kept_frames(resampled, keep, trimmed_path)
+        except BaseException:
+            trimmed_path.unlink(missing_ok=True)
+            raise
+        finally:
+            resampled_path.unlink(missing_ok=True)
+
+    upload_path, mime_type = Path(prepared.source), "audio/wav"
+    if encoding == "flac":
+        flac_path = _temp_path(".flac")
+        if _encode_flac(prepared, flac_path):
+            upload_path, mime_type = flac_path, "audio/flac"
+        else:
+            flac_path.unlink(missing_ok=True)
+    return PreparedAudio(prepared, upload_path, mime_type, source_size(source))
@@ -0,0 +1,262 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+
+from config import get_bool_env, get_env
+from services.metrics import REGISTRY, Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(".cache") / "pipeline"
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def cache_key(*parts: Union[str, bytes]) -> str:
+    """Hash the parts (length-prefixed so boundaries cannot collide) into a hex key."""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part.encode("utf-8") if isinstance(part, str) else part
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def hash_audio(source: Any) -> str:
+    """Content hash of an audio source (path, bytes-like or binary file) without loading files whole."""
+    digest = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    elif hasattr(source, "getvalue"):
+        digest.update(source.getvalue())
+    else:
+        source.seek(0)
+        for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+        source.seek(0)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Two-tier cache for JSON-serializable results: an in-process LRU over a shared directory.
+
+    The disk tier is plain files named by key, written atomically, so the Flask
+    backend and the Streamlit app can share one directory. When the directory
+    grows past max_disk_bytes the least recently used files are removed.
+    Disk errors (full or read-only volume) are counted as write_errors and
+    otherwise ignored: the value stays in memory and callers get their result.
+    """
+
+    def __init__(self, directory: Path = CACHE_DIR, *, memory_items: int = 512, max_disk_bytes: int = 256 * 1024 * 1024) -> None:
+        self.directory = Path(directory)
+        self.memory_items = memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "write_errors": 0, "evictions": 0}
+        self._disk_bytes: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "ResultCache":
+        return cls(
+            Path(get_env("CACHE_DIR") or CACHE_DIR),
+            memory_items=int(get_env("CACHE_MEMORY_ITEMS", "512")),
+            max_disk_bytes=int(get_env("CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+        )
+
+    def _path(self, namespace: str, key: str) -> Path:
+        return self.directory / namespace / key[:2] / f"{key}.json"
+
+    def _count(self, stat: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[stat] += amount
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        memory_key = f"{namespace}/{key}"
+        with self._lock:
+            if memory_key in self._memory:
+                self._memory.move_to_end(memory_key)
+                self._stats["memory_hits"] += 1
+                return self._memory[memory_key]
+
+        path = self._path(namespace, key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self._count("misses")
+            return None
+        try:
+            # Touch so eviction treats the entry as recently used
+            os.utime(path)
+        except OSError:
+            pass
+        self._remember(memory_key, value)
+        self._count("disk_hits")
+        return value
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        self._remember(f"{namespace}/{key}", value)
+        path = self._path(namespace, key)
+        tmp_name = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(tmp_name, path)
+            self._count("writes")
+            self._account(path.stat().st_size)
+        except OSError as exc:
+            if tmp_name is not None:
+                Path(tmp_name).unlink(missing_ok=True)
+            self._write_failed(path, exc)
+
+    def _write_failed(self, path: Path, exc: OSError) -> None:
+        with self._lock:
+            first = self._stats["write_errors"] == 0
+            self._stats["write_errors"] += 1
+        # Once per process at warning level; a full disk would otherwise log on every model call
+        logger.log(logging.WARNING if first else logging.DEBUG, "Result cache write to %s failed: %s", path, exc)
+
+    def _remember(self, memory_key: str, value: Any) -> None:
+        if self.memory_items <= 0:
+            return
+        with self._lock:
+            self._memory[memory_key] = value
+            self._memory.move_to_end(memory_key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _account(self, added: int) -> None:
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(p.stat().st_size for p in self.directory.rglob("*.json"))
+            else:
+                self._disk_bytes += added
+            over_budget = self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._evict()
+
+    def _evict(self) -> None:
+        # Other processes write to the same directory, so rescan instead of trusting the running total
+        entries = []
+        for path in self.directory.rglob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_disk_bytes * 0.9)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        with self._lock:
+            self._disk_bytes = total
+            self._stats["evictions"] += removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_items"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[ResultCache]:
+    """Return the shared cache, or None when disabled with CACHE_ENABLED=false."""
+    global _cache
+    if not get_bool_env("CACHE_ENABLED", True):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache.from_env()
+    return _cache
+
+
+def memoize(
+    namespace: str,
+    key: str,
+    compute: Callable[[], Any],
+    *,
+    dump: Callable[[Any], Any] = lambda value: value,
+    load: Callable[[Any], Any] = lambda value: value,
+) -> Any:
+    """Return the cached value for key or compute, store and return it.
+
+    Exceptions from compute propagate and nothing is stored, so failures are
+    never cached.
+    """
+    cache = get_cache()
+    if cache is None:
+        return compute()
+    cached = cache.get(namespace, key)
+    if cached is not None:
+        return load(cached)
+    value = compute()
+    cache.set(namespace, key, dump(value))
+    return value
+
+
+async def amemoize(
+    namespace: str,
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    *,
+    dump: Callable[[Any], Any] = lambda value: value,
+    load: Callable[[Any], Any] = lambda value: value,
+) -> Any:
+    """Async memoize(): the disk tier is read and written off the event loop."""
+    cache = get_cache()
+    if cache is None:
+        return await compute()
+    cached = await asyncio.to_thread(cache.get, namespace, key)
+    if cached is not None:
+        return load(cached)
+    value = await compute()
+    await asyncio.to_thread(cache.set, namespace, key, dump(value))
+    return value
+
+
+def _cache_metrics() -> list:
+    if _cache is None:
+        return []
+    stats = _cache.stats()
+    lookups = Counter("result_cache_lookups_total", "Result cache lookups by outcome.", ["outcome"])
+    for outcome in ("memory_hits", "disk_hits", "misses"):
+        lookups.inc(stats[outcome], outcome=outcome)
+    evictions = Counter("result_cache_evictions_total", "Files removed from the disk tier.")
+    evictions.inc(stats["evictions"])
+    write_errors = Counter("result_cache_write_errors_total", "Disk tier writes that failed (value kept in memory only).")
+    write_errors.inc(stats["write_errors"])
+    items = Gauge("result_cache_memory_items", "Entries in the in-memory tier.")
+    items.set(stats["memory_items"])
+    return [lookups, evictions, write_errors, items]
+
+
+REGISTRY.add_collector(_cache_metrics)
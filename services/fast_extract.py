@@ -0,0 +1,149 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from models import ExtractedInfo
+from services.metrics import REGISTRY, Counter
+from services.submissions import get_store
+
+FASTPATH_EXTRACTIONS = REGISTRY.register(
+    Counter("extract_fastpath_total", "Caller extractions answered by pattern matching (hit) or sent to the model (miss).", ["outcome"])
+)
+
+_DIGIT_WORDS = {
+    "zero": "0", "oh": "0", "o": "0", "one": "1", "two": "2", "three": "3", "four": "4",
+    "five": "5", "six": "6", "seven": "7", "eight": "8", "nine": "9",
+}
+_REPEAT_WORDS = {"double": 2, "triple": 3}
+
+# Patterns run on lower-cased text; case-insensitive matching is several times slower in re
+_DIGIT_TOKEN = r"(?:zero|oh|o|one|two|three|four|five|six|seven|eight|nine|double|triple|\d+)"
+# Two or more digit tokens separated only by spaces, commas or hyphens
+_SPOKEN_RUN_RE = re.compile(rf"\b{_DIGIT_TOKEN}(?:[\s,-]+{_DIGIT_TOKEN})+\b")
+_RUN_PART_RE = re.compile(r"([a-z]+|\d+)([\s,-]*)")
+
+_SUBMISSION_RE = re.compile(r"\bs\W?u\W?b\b\W?\s*(?:-|dash|hyphen|number|no\.?)?\s*(\d{3,})\b")
+_MOBILE_RE = re.compile(r"(?<!\d)\d{10,13}(?!\d)")
+
+MOBILE_DIGITS = 10
+# Digits a spoken country code may take ahead of a mobile number
+COUNTRY_CODE_DIGITS = 3
+
+
+def _joins(left: str, separator: str, right: str) -> bool:
+    """Whether two neighbouring tokens of a run are one number: digit words, but never two numerals.
+
+    Numerals are already grouped the way the speaker said them ("1001, 98765"),
+    so they are only joined by _mobile_end. A comma also ends a number unless
+    both sides are spelled out ("triple five, oh one").
+    """
+    if left.isdigit() and right.isdigit():
+        return False
+    return "," not in separator or not (left.isdigit() or right.isdigit())
+
+
+def _mobile_end(groups: List[str], linked: List[bool], start: int) -> Optional[int]:
+    """Last group of a mobile number starting at groups[start], if numeral groups there add up to one.
+
+    linked[i] says groups i and i+1 are numerals separated by a space or a
+    hyphen. The groups must make exactly MOBILE_DIGITS digits, optionally
+    after a short country code ("91 98765 43210").
+    """
+    for skip in (0, 1):
+        if skip and len(groups[start]) > COUNTRY_CODE_DIGITS:
+            break
+        total = 0
+        for end in range(start, len(groups)):
+            if end > start and not linked[end - 1]:
+                break
+            if end >= start + skip:
+                total += len(groups[end])
+            if total == MOBILE_DIGITS and end > start:
+                return end
+            if total > MOBILE_DIGITS:
+                break
+    return None
+
+
+def _spoken_run_to_digits(match: "re.Match") -> str:
+    groups: List[str] = []
+    separators: List[str] = []
+    linked: List[bool] = []
+    repeat = 1
+    previous = None
+    for token, separator in _RUN_PART_RE.findall(match.group(0)):
+        if token in _REPEAT_WORDS:
+            repeat, value = _REPEAT_WORDS[token], ""
+        else:
+            value = (token if token.isdigit() else _DIGIT_WORDS[token]) * repeat
+            repeat = 1
+        if previous is not None and _joins(previous, separators[-1], token):
+            groups[-1] += value
+            separators[-1] = separator
+        else:
+            if previous is not None:
+                linked.append(previous.isdigit() and token.isdigit() and "," not in separators[-1])
+            groups.append(value)
+            separators.append(separator)
+        previous = token
+
+    pieces = []
+    start = 0
+    while start < len(groups):
+        end = _mobile_end(groups, linked, start)
+        end = start if end is None else end
+        pieces.append("".join(groups[start:end + 1]) + separators[end])
+        start = end + 1
+    return "".join(pieces)
+def normalize_spoken_digits(text: str) -> str:
+    """Lower-case text and turn digit-by-digit speech ("nine eight double seven") into digit runs.
+
+    Numerals are joined only when their groups spell out a mobile number
+    ("98765 43210"); otherwise separate numbers stay separate.
+    """
+    return _SPOKEN_RUN_RE.sub(_spoken_run_to_digits, text.lower())
+
+
+def find_submission_numbers(text: str) -> List[str]:
+    """Submission numbers in canonical "SUB-<digits>" form, in order of appearance (text lower-cased)."""
+    return [f"SUB-{digits}" for digits in _SUBMISSION_RE.findall(text)]
+
+
+def find_mobile_numbers(text: str) -> List[str]:
+    """Digit strings of 10-13 digits (country code allowed) in normalize_spoken_digits output, in order of appearance."""
+    return _MOBILE_RE.findall(text)
+
+
+def extract_known_fields(transcript_text: str) -> Tuple[ExtractedInfo, Optional[Dict[str, str]]]:
+    """Pattern-match identifiers in a transcript and keep those that exist in the submissions store.
+
+    Returns the verified fields, with the name taken from the submission they
+    matched, and that submission; or an empty ExtractedInfo and None when
+    nothing could be verified. A mobile number with a country code matches on
+    its last ten digits.
+    """
+    text = normalize_spoken_digits(transcript_text)
+    store = get_store()
+    if store.is_empty():
+        return ExtractedInfo(), None
+
+    submission_number = None
+    row = None
+    for candidate in find_submission_numbers(text):
+        row = store.by_submission_number(candidate)
+        if row is not None:
+            submission_number = candidate
+            break
+
+    mobile_number = None
+    for candidate in find_mobile_numbers(text):
+        for digits in dict.fromkeys((candidate, candidate[-MOBILE_DIGITS:])):
+            match = store.by_mobile_digits(digits)
+            if match is not None:
+                mobile_number = digits
+                row = row or match
+                break
+        if mobile_number:
+            break
+
+    name = ((row or {}).get("name") or "").strip() or None
+    return ExtractedInfo(name=name, submission_number=submission_number, mobile_number=mobile_number), row
@@ -0,0 +1,713 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from config import get_bool_env, get_env
+from services.metrics import REGISTRY, Counter, Gauge, Histogram
+
+T = TypeVar("T")
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+_PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BACKGROUND: "background"}
+
+# HTTP-style codes worth retrying: quota, transient server errors, gateway timeouts
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+THROTTLE_CODES = {429}
+
+BUDGET_DB_PATH = Path("data") / "gemini_budget.db"
+
+GATEWAY_LIMIT = REGISTRY.register(Gauge("gemini_gateway_concurrency_limit", "Current adaptive limit on concurrent model requests."))
+GATEWAY_IN_FLIGHT = REGISTRY.register(Gauge("gemini_gateway_in_flight", "Model requests currently running."))
+GATEWAY_WAIT_SECONDS = REGISTRY.register(
+    Histogram("gemini_gateway_wait_seconds", "Time spent waiting for a slot and rate budget.", ["priority"])
+)
+GATEWAY_RETRIES = REGISTRY.register(Counter("gemini_gateway_retries_total", "Model requests retried, by reason.", ["reason"]))
+GATEWAY_REJECTED = REGISTRY.register(
+    Counter("gemini_gateway_deadline_exceeded_total", "Model requests abandoned at their deadline.", ["priority"])
+)
+GATEWAY_TIMEOUTS = REGISTRY.register(Counter("gemini_gateway_timeouts_total", "Model request attempts that timed out."))
+
+_priority: contextvars.ContextVar = contextvars.ContextVar("gemini_priority", default=PRIORITY_INTERACTIVE)
+_attempt_timeout: contextvars.ContextVar = contextvars.ContextVar("gemini_attempt_timeout", default=None)
+_deadline: contextvars.ContextVar = contextvars.ContextVar("gemini_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request cannot be admitted, or retried, before its deadline."""
+
+
+@contextmanager
+def request_priority(priority: int) -> Iterator[None]:
+    """Run model calls made in this context (and contexts copied from it) at the given priority."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+@contextmanager
+def request_deadline(seconds: float) -> Iterator[None]:
+    """Cap the deadline of model calls made in this context at `seconds` from now.
+
+    Calls in the context are admitted, retried and timed out (see
+    attempt_timeout()) only until then, so the caller can stop waiting at the
+    same moment the underlying requests stop. Nested contexts keep the sooner
+    deadline.
+    """
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def attempt_timeout() -> Optional[float]:
+    """Seconds the current gateway attempt may take, for the request's own HTTP timeout; None outside one."""
+    return _attempt_timeout.get()
+
+
+def error_code(exc: BaseException) -> Optional[int]:
+    """HTTP-like status of an API error (google.genai errors carry it as .code), if any."""
+    code = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (ConnectionError, TimeoutError)) and not isinstance(exc, DeadlineExceeded):
+        return True
+    return error_code(exc) in RETRYABLE_CODES
+
+
+class TokenBucket:
+    """Budget of `per_minute` units refilled continuously; a rate of 0 disables it."""
+
+    shared = False
+
+    def __init__(self, per_minute: float, burst_seconds: float = 5.0) -> None:
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, cost: float) -> float:
+        """Take cost from the bucket and return how long to wait before it is covered.
+
+        The balance may go negative, which queues later callers behind this one
+        instead of letting a large request starve forever.
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= min(cost, self.capacity)
+            return max(0.0, -self.tokens / self.rate)
+
+    def adjust(self, delta: float) -> None:
+        """Refund (positive) or charge (negative) units once the real cost is known."""
+        if self.rate <= 0 or not delta:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens + delta)
+
+    def _take_above(self, tokens: float, cost: float, floor: float) -> Tuple[float, float]:
+        """(new balance, wait) for take(): the cost comes out only if the balance stays at or above floor."""
+        cost = min(cost, self.capacity - floor)
+        if tokens - cost >= floor:
+            return tokens - cost, 0.0
+        return tokens, max(1e-3, (floor + cost - tokens) / self.rate)
+
+    def take(self, cost: float, floor: float) -> float:
+        """Take cost only if at least floor units are left afterwards; return 0.0 if taken.
+
+        Otherwise nothing is taken and the result is how long until the bucket
+        could cover it, so the caller can try again. Unlike reserve(), this
+        never queues ahead of other callers, which keeps the units below floor
+        for them.
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens, wait = self._take_above(self.tokens, cost, floor)
+            return wait
+
+
+class SharedTokenBucket(TokenBucket):
+    """TokenBucket whose balance lives in a SQLite file.
+
+    Every process on the host that opens the same file and bucket name draws
+    from one balance (gunicorn workers, the Streamlit app, batch.py). Each
+    change is one short IMMEDIATE transaction, refilled by wall-clock time.
+    If the file cannot be used the bucket falls back to this process's
+    in-memory balance rather than failing the request.
+    """
+
+    shared = True
+
+    def __init__(self, name: str, per_minute: float, db_path: Path, burst_seconds: float = 5.0) -> None:
+        super().__init__(per_minute, burst_seconds)
+        self.name = name
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # Connections must not cross a fork (see ResultStore._connection)
+        if conn is None or self._local.pid != os.getpid():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _update(self, change: Callable[[float], float]) -> float:
+        """Apply change to the refilled shared balance and return the new balance."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (self.name,)).fetchone()
+            now = time.time()
+            tokens = self.capacity if row is None else min(self.capacity, row[0] + max(0.0, now - row[1]) * self.rate)
+            tokens = change(tokens)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)", (self.name, tokens, now)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return tokens
+
+    def reserve(self, cost: float) -> float:
+        if self.rate <= 0:
+            return 0.0
+        try:
+            tokens = self._update(lambda tokens: tokens - min(cost, self.capacity))
+        except (sqlite3.Error, OSError):
+            return super().reserve(cost)
+        return max(0.0, -tokens / self.rate)
+
+    def adjust(self, delta: float) -> None:
+        if self.rate <= 0 or not delta:
+            return
+        try:
+            self._update(lambda tokens: min(self.capacity, tokens + delta))
+        except (sqlite3.Error, OSError):
+            super().adjust(delta)
+
+    def take(self, cost: float, floor: float) -> float:
+        if self.rate <= 0:
+            return 0.0
+        waits = []
+
+        def change(tokens: float) -> float:
+            tokens, wait = self._take_above(tokens, cost, floor)
+            waits.append(wait)
+            return tokens
+
+        try:
+            self._update(change)
+        except (sqlite3.Error, OSError):
+            return super().take(cost, floor)
+        return waits[-1]
+
+
+class GeminiGateway:
+    """Admission control shared by every model request in the process.
+
+    - Requests-per-minute and tokens-per-minute buckets keep traffic under the
+      quota; token costs are estimated up front and corrected from the
+      response's usage metadata.
+    - Concurrency follows AIMD: each fast success adds 1/limit to the limit,
+      a 429 halves it (at most once per cooldown), and slow responses shrink it
+      by 10%, so the gateway settles just under the provider's ceiling.
+    - Each attempt is bounded by request_timeout and the time left before
+      the deadline. The async entry points cancel an attempt at that bound;
+      sync callers cannot be interrupted, so they read attempt_timeout() and
+      pass it to the request as its HTTP timeout. A timeout is a failed,
+      retryable attempt.
+    - Retryable failures are retried with full-jitter exponential backoff, and
+      each retry waits for admission again, so throttling cannot snowball into
+      a retry storm. Nothing is retried or admitted past the request deadline.
+    - Waiting interactive requests are admitted before background ones, and
+      background requests never take the last interactive_reserve of either
+      rate budget's burst. The reserve lives in the buckets, so with budget_db
+      it also holds interactive headroom against background work (batch.py,
+      queued jobs) in other processes.
+
+    call()/stream() serve threads; acall()/astream() serve coroutines and share
+    the same limits, so sync and async callers in one process see one budget.
+
+    With budget_db the RPM/TPM buckets are SharedTokenBucket files, so the
+    processes of one host (gunicorn workers, Streamlit, batch.py) share one
+    budget; processes on other hosts have their own, so divide the quota
+    between hosts. Concurrency limits, slot priority and retries stay per
+    process.
+    """
+
+    def __init__(
+        self,
+        *,
+        rpm: float = 0.0,
+        tpm: float = 0.0,
+        max_concurrency: int = 16,
+        min_concurrency: int = 1,
+        initial_concurrency: Optional[int] = None,
+        target_latency: float = 30.0,
+        max_attempts: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        deadline_seconds: float = 300.0,
+        request_timeout: float = 120.0,
+        throttle_cooldown: float = 2.0,
+        interactive_reserve: float = 0.2,
+        budget_db: Optional[Path] = None,
+    ) -> None:
+        if budget_db is not None:
+            self.requests: TokenBucket = SharedTokenBucket("requests", rpm, budget_db)
+            self.tokens: TokenBucket = SharedTokenBucket("tokens", tpm, budget_db)
+        else:
+            self.requests = TokenBucket(rpm)
+            self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        start = initial_concurrency if initial_concurrency is not None else max(self.min_concurrency, self.max_concurrency // 2)
+        self.limit = float(min(self.max_concurrency, max(self.min_concurrency, start)))
+        self.target_latency = target_latency
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline_seconds = deadline_seconds
+        self.request_timeout = request_timeout
+        self.throttle_cooldown = throttle_cooldown
+        self.interactive_reserve = min(0.9, max(0.0, interactive_reserve))
+        self.in_flight = 0
+        self._waiting = {PRIORITY_INTERACTIVE: 0, PRIORITY_BACKGROUND: 0}
+        self._last_throttle = 0.0
+        self._cond = threading.Condition()
+        # Coroutines cannot block on _cond: each parks a future on its own loop, woken in priority order
+        self._async_waiters: List[Tuple[int, int, asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._waiter_seq = itertools.count()
+        self._random = random.Random()
+        GATEWAY_LIMIT.set(self.limit)
+
+    @classmethod
+    def from_env(cls, **overrides: Any) -> "GeminiGateway":
+        """Gateway configured from GEMINI_* settings; keyword arguments take precedence."""
+        settings: Dict[str, Any] = dict(
+            rpm=float(get_env("GEMINI_RPM", "0")),
+            tpm=float(get_env("GEMINI_TPM", "0")),
+            max_concurrency=int(get_env("GEMINI_MAX_CONCURRENCY", "16")),
+            min_concurrency=int(get_env("GEMINI_MIN_CONCURRENCY", "1")),
+            target_latency=float(get_env("GEMINI_TARGET_LATENCY_SECONDS", "30")),
+            max_attempts=int(get_env("GEMINI_MAX_ATTEMPTS", "5")),
+            deadline_seconds=float(get_env("GEMINI_DEADLINE_SECONDS", "300")),
+            request_timeout=float(get_env("GEMINI_REQUEST_TIMEOUT_SECONDS", "120")),
+            interactive_reserve=float(get_env("GEMINI_INTERACTIVE_RESERVE", "0.2")),
+        )
+        if get_bool_env("GEMINI_BUDGET_SHARED", True):
+            settings["budget_db"] = Path(get_env("GEMINI_BUDGET_DB") or BUDGET_DB_PATH)
+        settings.update(overrides)
+        return cls(**settings)
+
+    # Admission
+
+    def _higher_priority_waiting(self, priority: int) -> bool:
+        return any(count for level, count in self._waiting.items() if level < priority)
+
+    def _slot_free(self, priority: int) -> bool:
+        return self.in_flight < int(self.limit) and not self._higher_priority_waiting(priority)
+
+    def _take_slot(self) -> None:
+        self.in_flight += 1
+        GATEWAY_IN_FLIGHT.set(self.in_flight)
+
+    def _notify(self) -> None:
+        """Wake every waiter to re-check for a slot; call with _cond held."""
+        self._cond.notify_all()
+        # Interactive coroutines first, then FIFO: a loop runs its wakeups in the order they were scheduled
+        while self._async_waiters:
+            _, _, loop, waiter = heapq.heappop(self._async_waiters)
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                pass  # the waiter's loop is closed
+
+    def _stop_waiting(self, priority: int) -> None:
+        self._waiting[priority] -= 1
+        # Lower-priority waiters may have been held back only by this one
+        self._notify()
+
+    def _acquire_slot(self, priority: int, deadline: float) -> None:
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while not self._slot_free(priority):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise DeadlineExceeded("no model request slot before the deadline")
+                    self._cond.wait(remaining)
+            finally:
+                self._stop_waiting(priority)
+            self._take_slot()
+
+    async def _acquire_slot_async(self, priority: int, deadline: float) -> None:
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            self._waiting[priority] += 1
+        try:
+            while True:
+                with self._cond:
+                    if self._slot_free(priority):
+                        self._take_slot()
+                        return
+                    entry = (priority, next(self._waiter_seq), loop, loop.create_future())
+                    heapq.heappush(self._async_waiters, entry)
+                try:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise DeadlineExceeded("no model request slot before the deadline")
+                    try:
+                        await asyncio.wait_for(entry[3], remaining)
+                    except asyncio.TimeoutError:
+                        pass
+                finally:
+                    with self._cond:
+                        if entry in self._async_waiters:
+                            self._async_waiters.remove(entry)
+                            heapq.heapify(self._async_waiters)
+        finally:
+            with self._cond:
+                self._stop_waiting(priority)
+
+    def _release_slot(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            GATEWAY_IN_FLIGHT.set(self.in_flight)
+            self._notify()
+
+    def _reserve_budget(self, estimated_tokens: int, deadline: float, priority: int) -> Tuple[float, bool]:
+        """Reserve rate budget for one request: (seconds to wait, whether the budget is now held).
+
+        Interactive requests always get a reservation and wait for it to be
+        covered. Background requests only take budget above the interactive
+        reserve; when there is none they hold nothing and retry after the wait.
+        """
+        if priority == PRIORITY_INTERACTIVE or self.interactive_reserve <= 0:
+            wait = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+            if time.monotonic() + wait > deadline:
+                self.requests.adjust(1)
+                self.tokens.adjust(estimated_tokens)
+                raise DeadlineExceeded("rate budget not available before the deadline")
+            return wait, True
+        wait = self.requests.take(1, self.requests.capacity * self.interactive_reserve)
+        if not wait:
+            wait = self.tokens.take(estimated_tokens, self.tokens.capacity * self.interactive_reserve)
+            if wait:
+                self.requests.adjust(1)
+        if time.monotonic() + wait > deadline:
+            raise DeadlineExceeded("rate budget not available before the deadline")
+        return wait, not wait
+
+    @contextmanager
+    def _admitted(self, estimated_tokens: int, deadline: float) -> Iterator[None]:
+        priority = current_priority()
+        started = time.monotonic()
+        try:
+            if started >= deadline:
+                raise DeadlineExceeded("deadline passed before the request was admitted")
+            self._acquire_slot(priority, deadline)
+            try:
+                held = False
+                while not held:
+                    wait, held = self._reserve_budget(estimated_tokens, deadline, priority)
+                    if wait > 0:
+                        time.sleep(wait)
+            except BaseException:
+                self._release_slot()
+                raise
+        except DeadlineExceeded:
+            GATEWAY_REJECTED.inc(priority=_PRIORITY_NAMES[priority])
+            raise
+        GATEWAY_WAIT_SECONDS.observe(time.monotonic() - started, priority=_PRIORITY_NAMES[priority])
+        try:
+            yield
+        finally:
+            self._release_slot()
+
+    @asynccontextmanager
+    async def _admitted_async(self, estimated_tokens: int, deadline: float) -> AsyncIterator[None]:
+        priority = current_priority()
+        started = time.monotonic()
+        try:
+            if started >= deadline:
+                raise DeadlineExceeded("deadline passed before the request was admitted")
+            await self._acquire_slot_async(priority, deadline)
+            try:
+                held = False
+                while not held:
+                    wait, held = await self._off_loop(self._reserve_budget, estimated_tokens, deadline, priority)
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+            except BaseException:
+                self._release_slot()
+                raise
+        except DeadlineExceeded:
+            GATEWAY_REJECTED.inc(priority=_PRIORITY_NAMES[priority])
+            raise
+        GATEWAY_WAIT_SECONDS.observe(time.monotonic() - started, priority=_PRIORITY_NAMES[priority])
+        try:
+            yield
+        finally:
+            self._release_slot()
+
+    async def _off_loop(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run a budget operation from a coroutine; shared buckets do SQLite I/O, so in a thread."""
+        if self.requests.shared or self.tokens.shared:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    # AIMD
+
+    def _on_success(self, latency: float) -> None:
+        with self._cond:
+            if latency > self.target_latency:
+                self.limit = max(self.min_concurrency, self.limit * 0.9)
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+            GATEWAY_LIMIT.set(self.limit)
+            self._notify()
+
+    def _on_throttle(self) -> None:
+        now = time.monotonic()
+        with self._cond:
+            # A burst of 429s from one window of requests counts as a single signal
+            if now - self._last_throttle >= self.throttle_cooldown:
+                self._last_throttle = now
+                self.limit = max(self.min_concurrency, self.limit / 2.0)
+                GATEWAY_LIMIT.set(self.limit)
+
+    def _backoff(self, attempt: int) -> float:
+        return self._random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _record_usage(self, response: Any, estimated_tokens: int) -> None:
+        usage = getattr(response, "usage_metadata", None)
+        total = getattr(usage, "total_token_count", None) if usage is not None else None
+        if total:
+            self.tokens.adjust(estimated_tokens - total)
+
+    def _retry_delay(self, exc: Exception, attempt: int, deadline: float) -> float:
+        """Backoff before retrying after exc, or re-raise it when it should not be retried."""
+        code = error_code(exc)
+        if code in THROTTLE_CODES:
+            self._on_throttle()
+        if not is_retryable(exc) or attempt + 1 >= self.max_attempts:
+            raise exc
+        delay = self._backoff(attempt)
+        if time.monotonic() + delay >= deadline:
+            raise exc
+        GATEWAY_RETRIES.inc(reason=str(code) if code else type(exc).__name__)
+        return delay
+
+    def _deadline_at(self, deadline: Optional[float]) -> float:
+        deadline_at = time.monotonic() + (deadline if deadline is not None else self.deadline_seconds)
+        context_deadline = _deadline.get()
+        return deadline_at if context_deadline is None else min(deadline_at, context_deadline)
+
+    def _timeout_for(self, deadline: float) -> float:
+        """Time the next attempt may take: request_timeout (0 = unbounded), but never past the deadline."""
+        remaining = max(0.0, deadline - time.monotonic())
+        return min(self.request_timeout, remaining) if self.request_timeout > 0 else remaining
+
+    @contextmanager
+    def _attempt(self, deadline: float) -> Iterator[float]:
+        timeout = self._timeout_for(deadline)
+        token = _attempt_timeout.set(timeout)
+        try:
+            yield timeout
+        except TimeoutError as exc:
+            if not isinstance(exc, DeadlineExceeded):
+                GATEWAY_TIMEOUTS.inc()
+            raise
+        finally:
+            _attempt_timeout.reset(token)
+
+    async def _bounded(self, awaitable: Awaitable[T], timeout: float) -> T:
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            # asyncio.TimeoutError is only the builtin TimeoutError from Python 3.11
+            raise TimeoutError(f"model request attempt timed out after {timeout:.1f}s") from None
+
+    # Entry points
+
+    def call(self, fn: Callable[[], T], *, estimated_tokens: int = 0, deadline: Optional[float] = None) -> T:
+        """Run fn() under the budgets, retrying retryable errors until deadline (seconds from now)."""
+        deadline_at = self._deadline_at(deadline)
+        attempt = 0
+        while True:
+            with self._admitted(estimated_tokens, deadline_at):
+                started = time.monotonic()
+                try:
+                    with self._attempt(deadline_at):
+                        response = fn()
+                except Exception as exc:
+                    failure = exc
+                else:
+                    self._on_success(time.monotonic() - started)
+                    self._record_usage(response, estimated_tokens)
+                    return response
+            time.sleep(self._retry_delay(failure, attempt, deadline_at))
+            attempt += 1
+
+    def stream(self, open_stream: Callable[[], Iterator[T]], *, estimated_tokens: int = 0, deadline: Optional[float] = None) -> Iterator[T]:
+        """Like call() for streaming responses; retried only until the first chunk arrives."""
+        deadline_at = self._deadline_at(deadline)
+        attempt = 0
+        while True:
+            with self._admitted(estimated_tokens, deadline_at):
+                started = time.monotonic()
+                try:
+                    with self._attempt(deadline_at):
+                        chunks = iter(open_stream())
+                        first = next(chunks)
+                except StopIteration:
+                    return
+                except Exception as exc:
+                    failure = exc
+                else:
+                    last = first
+                    yield first
+                    for chunk in chunks:
+                        last = chunk
+                        yield chunk
+                    self._on_success(time.monotonic() - started)
+                    self._record_usage(last, estimated_tokens)
+                    return
+            time.sleep(self._retry_delay(failure, attempt, deadline_at))
+            attempt += 1
+
+    async def acall(
+        self, fn: Callable[[], Awaitable[T]], *, estimated_tokens: int = 0, deadline: Optional[float] = None
+    ) -> T:
+        """Async call(): await fn() under the same budgets and retry policy."""
+        deadline_at = self._deadline_at(deadline)
+        attempt = 0
+        while True:
+            async with self._admitted_async(estimated_tokens, deadline_at):
+                started = time.monotonic()
+                try:
+                    with self._attempt(deadline_at) as timeout:
+                        response = await self._bounded(fn(), timeout)
+                except Exception as exc:
+                    failure = exc
+                else:
+                    self._on_success(time.monotonic() - started)
+                    await self._off_loop(self._record_usage, response, estimated_tokens)
+                    return response
+            await asyncio.sleep(self._retry_delay(failure, attempt, deadline_at))
+            attempt += 1
+
+    async def astream(
+        self,
+        open_stream: Callable[[], Awaitable[AsyncIterator[T]]],
+        *,
+        estimated_tokens: int = 0,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[T]:
+        """Async stream(): open_stream() resolves to an async iterator of chunks."""
+        deadline_at = self._deadline_at(deadline)
+        attempt = 0
+        while True:
+            async with self._admitted_async(estimated_tokens, deadline_at):
+                started = time.monotonic()
+                try:
+                    with self._attempt(deadline_at) as timeout:
+                        ends = time.monotonic() + timeout
+                        chunks = (await self._bounded(open_stream(), timeout)).__aiter__()
+                        first = await self._bounded(chunks.__anext__(), ends - time.monotonic())
+                except StopAsyncIteration:
+                    return
+                except Exception as exc:
+                    failure = exc
+                else:
+                    last = first
+                    yield first
+                    async for chunk in chunks:
+                        last = chunk
+                        yield chunk
+                    self._on_success(time.monotonic() - started)
+                    await self._off_loop(self._record_usage, last, estimated_tokens)
+                    return
+            await asyncio.sleep(self._retry_delay(failure, attempt, deadline_at))
+            attempt += 1
+
+
+def _wake(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def estimate_request_tokens(contents: Any) -> int:
+    """Rough input token count: ~4 characters per text token, ~32 tokens per second of 16 kHz audio."""
+    total = 0
+    for item in contents if isinstance(contents, list) else [contents]:
+        if isinstance(item, str):
+            total += len(item) // 4 + 1
+            continue
+        inline = getattr(item, "inline_data", None)
+        if inline is not None:
+            total += len(inline.data or b"") // 1000
+            continue
+        size = getattr(item, "size_bytes", None)
+        if size:
+            total += int(size) // 1000
+    return total
+
+
+_gateway: Optional[GeminiGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> GeminiGateway:
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = GeminiGateway.from_env()
+    return _gateway
+
+
+def configure_gateway(**overrides: Any) -> GeminiGateway:
+    """Replace the process gateway with GeminiGateway.from_env(**overrides), e.g. batch.py --rpm."""
+    global _gateway
+    with _gateway_lock:
+        _gateway = GeminiGateway.from_env(**overrides)
+    return _gateway
@@ -0,0 +1,169 @@
+"""Model handles for Gemini: every request goes through the process gateway (services.gateway)."""
+
+import threading
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+from config import genai_types, get_gemini_client, resolve_api_key
+from services.gateway import attempt_timeout, estimate_request_tokens, get_gateway
+from services.metrics import LLM_REQUESTS, record_llm_response
+
+if TYPE_CHECKING:
+    import google.genai as genai
+
+
+class GeminiModel:
+    """Reusable handle for one (API key, model) pair backed by a pooled genai.Client.
+
+    Requests go through the process-wide gateway (services.gateway), which
+    applies the rate budgets, adaptive concurrency, retries and priorities.
+    """
+
+    def __init__(self, client: "genai.Client", model: str) -> None:
+        self.client = client
+        self.model = model
+
+    def _attempt(self, contents: Any, config: Optional["genai.types.GenerateContentConfig"]):
+        try:
+            return self.client.models.generate_content(model=self.model, contents=contents, config=_with_timeout(config))
+        except Exception as exc:
+            LLM_REQUESTS.inc(model=self.model, outcome="error")
+            _raise_timeout(exc)
+            raise
+
+    def generate_content(self, contents: Any, config: Optional["genai.types.GenerateContentConfig"] = None):
+        response = get_gateway().call(
+            lambda: self._attempt(contents, config), estimated_tokens=estimate_request_tokens(contents)
+        )
+        record_llm_response(self.model, response)
+        return response
+
+    def _open_stream(self, contents: Any, config: Optional["genai.types.GenerateContentConfig"]):
+        try:
+            return self.client.models.generate_content_stream(model=self.model, contents=contents, config=_with_timeout(config))
+        except Exception as exc:
+            _raise_timeout(exc)
+            raise
+
+    def generate_content_stream(
+        self, contents: Any, config: Optional["genai.types.GenerateContentConfig"] = None
+    ) -> Iterator["genai.types.GenerateContentResponse"]:
+        """Yield response chunks as the model produces them; usage is recorded from the last chunk."""
+        last = None
+        try:
+            for chunk in get_gateway().stream(
+                lambda: self._open_stream(contents, config), estimated_tokens=estimate_request_tokens(contents)
+            ):
+                last = chunk
+                yield chunk
+        except Exception as exc:
+            LLM_REQUESTS.inc(model=self.model, outcome="error")
+            _raise_timeout(exc)
+            raise
+        record_llm_response(self.model, last)
+
+    def _upload(self, path: str, mime_type: str) -> "genai.types.File":
+        try:
+            return self.client.files.upload(file=path, config=_upload_config(mime_type))
+        except Exception as exc:
+            _raise_timeout(exc)
+            raise
+
+    def upload_file(self, path: str, mime_type: str) -> "genai.types.File":
+        return get_gateway().call(lambda: self._upload(path, mime_type))
+
+    def delete_file(self, name: str) -> None:
+        self.client.files.delete(name=name)
+
+    # Async variants on client.aio, for the ASGI backend; they share the gateway budgets
+
+    async def _aattempt(self, contents: Any, config: Optional["genai.types.GenerateContentConfig"]):
+        try:
+            return await self.client.aio.models.generate_content(
+                model=self.model, contents=contents, config=_with_timeout(config)
+            )
+        except Exception as exc:
+            LLM_REQUESTS.inc(model=self.model, outcome="error")
+            _raise_timeout(exc)
+            raise
+
+    async def agenerate_content(self, contents: Any, config: Optional["genai.types.GenerateContentConfig"] = None):
+        response = await get_gateway().acall(
+            lambda: self._aattempt(contents, config), estimated_tokens=estimate_request_tokens(contents)
+        )
+        record_llm_response(self.model, response)
+        return response
+
+    async def agenerate_content_stream(
+        self, contents: Any, config: Optional["genai.types.GenerateContentConfig"] = None
+    ) -> AsyncIterator["genai.types.GenerateContentResponse"]:
+        last = None
+        try:
+            async for chunk in get_gateway().astream(
+                lambda: self.client.aio.models.generate_content_stream(
+                    model=self.model, contents=contents, config=_with_timeout(config)
+                ),
+                estimated_tokens=estimate_request_tokens(contents),
+            ):
+                last = chunk
+                yield chunk
+        except Exception as exc:
+            LLM_REQUESTS.inc(model=self.model, outcome="error")
+            _raise_timeout(exc)
+            raise
+        record_llm_response(self.model, last)
+
+    async def aupload_file(self, path: str, mime_type: str) -> "genai.types.File":
+        return await get_gateway().acall(
+            lambda: self.client.aio.files.upload(file=path, config=_upload_config(mime_type))
+        )
+
+    async def adelete_file(self, name: str) -> None:
+        await self.client.aio.files.delete(name=name)
+
+
+def _http_timeout_ms() -> Optional[int]:
+    """The gateway's bound on the current attempt, in the milliseconds HttpOptions.timeout expects."""
+    timeout = attempt_timeout()
+    return max(1, int(timeout * 1000)) if timeout is not None else None
+
+
+def _with_timeout(config: Optional["genai.types.GenerateContentConfig"]) -> Optional["genai.types.GenerateContentConfig"]:
+    timeout_ms = _http_timeout_ms()
+    if timeout_ms is None:
+        return config
+    types = genai_types()
+    if config is None:
+        return types.GenerateContentConfig(http_options=types.HttpOptions(timeout=timeout_ms))
+    http_options = config.http_options or types.HttpOptions()
+    return config.model_copy(update={"http_options": http_options.model_copy(update={"timeout": timeout_ms})})
+
+
+def _upload_config(mime_type: str) -> Dict[str, Any]:
+    upload_config: Dict[str, Any] = {"mime_type": mime_type}
+    timeout_ms = _http_timeout_ms()
+    if timeout_ms is not None:
+        upload_config["http_options"] = {"timeout": timeout_ms}
+    return upload_config
+
+
+def _raise_timeout(exc: Exception) -> None:
+    """Re-raise the HTTP client's timeout as TimeoutError, which the gateway counts and retries."""
+    import httpx
+
+    if isinstance(exc, httpx.TimeoutException):
+        raise TimeoutError(str(exc) or "model request timed out") from exc
+
+
+_models: Dict[Tuple[str, str], GeminiModel] = {}
+_models_lock = threading.Lock()
+
+
+def get_gemini_model(model: str, explicit_api_key: Optional[str] = None) -> GeminiModel:
+    """Return the shared handle for this model on the pooled client of the API key."""
+    api_key = resolve_api_key(explicit_api_key)
+    handle = _models.get((api_key, model))
+    if handle is None:
+        client = get_gemini_client(api_key)
+        with _models_lock:
+            handle = _models.setdefault((api_key, model), GeminiModel(client, model))
+    return handle
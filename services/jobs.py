@@ -0,0 +1,262 @@
+import asyncio
+import multiprocessing
+import sqlite3
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from config import get_env
+from services.gateway import PRIORITY_BACKGROUND, request_priority
+from services.metrics import JOBS_FINISHED, JOBS_IN_FLIGHT
+from services.results import (
+    STATE_DONE,
+    STATE_FAILED,
+    STATE_QUEUED,
+    STATE_RUNNING,
+    ResultStore,
+    get_result_store,
+)
+from services.webhooks import notify_result
+
+JOB_QUEUED = STATE_QUEUED
+JOB_RUNNING = STATE_RUNNING
+JOB_DONE = STATE_DONE
+JOB_FAILED = STATE_FAILED
+
+SUPPORTED_EXECUTORS = ("thread", "process")
+
+# How often a job waiting on another owner of its key (e.g. a live session) re-checks the record
+JOB_WATCH_POLL_SECONDS = 2.0
+# How often a queue refreshes the records of its unfinished jobs; at most a third of the store's
+# stale_seconds, so a long job is never mistaken for one lost to a restart
+JOB_HEARTBEAT_SECONDS = 60.0
+
+
+def _heartbeat_interval(store: ResultStore) -> float:
+    return min(JOB_HEARTBEAT_SECONDS, store.stale_seconds / 3)
+
+
+def _run_marked(key: str, fn: Callable[..., Dict[str, Any]], args: tuple, kwargs: dict) -> Dict[str, Any]:
+    # Runs inside the worker (thread or child process), which opens the shared store itself.
+    # Queued jobs yield model capacity to interactive requests.
+    get_result_store().set_state(key, JOB_RUNNING)
+    with request_priority(PRIORITY_BACKGROUND):
+        return fn(*args, **kwargs)
+
+
+def _unfinished(record: Optional[Dict[str, Any]]) -> bool:
+    return record is not None and record["state"] in (JOB_QUEUED, JOB_RUNNING)
+
+
+class JobQueue:
+    """Runs keyed jobs on a thread or process pool.
+
+    Job states live in the shared ResultStore, so every gunicorn worker sees the
+    same queued/running/done/failed state. Submitting a key that any worker has
+    already claimed is a no-op, so retried webhook deliveries do not redo the
+    work. Failed jobs may be resubmitted. Finished results are pushed to
+    RESULT_WEBHOOK_URL when one is configured.
+
+    A key whose owner has not finished yet (another worker's job, or a live
+    transcription session for the call) is watched rather than dropped: if
+    the owner fails or stops updating, the submitted job runs after all.
+    While its jobs are queued or running, the queue refreshes their records
+    from a heartbeat thread, so however long a job takes it is only re-claimed
+    once this process stops.
+    """
+
+    def __init__(self, workers: int = 2, executor: str = "thread", store: Optional[ResultStore] = None) -> None:
+        if executor not in SUPPORTED_EXECUTORS:
+            raise RuntimeError(f"Unsupported PIPELINE_EXECUTOR '{executor}'. Use one of {SUPPORTED_EXECUTORS}.")
+        self.executor_kind = executor
+        self._executor: Executor
+        if executor == "process":
+            # Spawned, not forked: the parent is multi-threaded (gthread, warm-up, gateway), and a
+            # forked child would inherit locks held by those threads and the open SQLite handles
+            self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=workers)
+        self.store = store or get_result_store()
+        self._watching: Set[str] = set()
+        self._watching_lock = threading.Lock()
+        self._in_flight: Set[str] = set()
+        self._heartbeat: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @classmethod
+    def from_env(cls) -> "JobQueue":
+        workers = int(get_env("PIPELINE_WORKERS", "2") or "2")
+        executor = (get_env("PIPELINE_EXECUTOR", "thread") or "thread").strip().lower()
+        return cls(workers=workers, executor=executor)
+
+    def submit(self, key: str, fn: Callable[..., Dict[str, Any]], *args: Any, **kwargs: Any) -> bool:
+        """Queue fn(*args, **kwargs) under key. Returns False if the key was already claimed.
+
+        When the current owner is still queued or running, fn is kept on a
+        watcher thread and run only if that owner fails or goes stale.
+        """
+        if not self.store.claim(key):
+            if _unfinished(self.store.get(key)):
+                self._watch(key, fn, args, kwargs)
+            return False
+        self._start(key, fn, args, kwargs)
+        return True
+
+    def _watch(self, key: str, fn: Callable[..., Dict[str, Any]], args: tuple, kwargs: dict) -> None:
+        with self._watching_lock:
+            if key in self._watching:
+                return
+            self._watching.add(key)
+
+        def _run() -> None:
+            try:
+                while True:
+                    record = self.store.wait_until_finished(key, JOB_WATCH_POLL_SECONDS * 15, JOB_WATCH_POLL_SECONDS)
+                    if record is not None and record["state"] == JOB_DONE:
+                        return
+                    if self.store.claim(key):
+                        self._start(key, fn, args, kwargs)
+                        return
+            finally:
+                with self._watching_lock:
+                    self._watching.discard(key)
+
+        threading.Thread(target=_run, name=f"job-watch-{key}", daemon=True).start()
+
+    def _start(self, key: str, fn: Callable[..., Dict[str, Any]], args: tuple, kwargs: dict) -> None:
+        JOBS_IN_FLIGHT.inc()
+        with self._watching_lock:
+            self._in_flight.add(key)
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._beat, name="job-heartbeat", daemon=True)
+                self._heartbeat.start()
+        future = self._executor.submit(_run_marked, key, fn, args, kwargs)
+        future.add_done_callback(lambda done: self._finish(key, done))
+
+    def _beat(self) -> None:
+        # Runs in this process for both executors: a job in a child process is alive while its future is
+        while not self._stopped.wait(_heartbeat_interval(self.store)):
+            with self._watching_lock:
+                keys = list(self._in_flight)
+            if keys:
+                try:
+                    self.store.touch(keys)
+                except sqlite3.Error:
+                    # A missed beat is harmless; stale_seconds leaves room for several
+                    pass
+
+    def _finish(self, key: str, future: Future) -> None:
+        JOBS_IN_FLIGHT.dec()
+        with self._watching_lock:
+            self._in_flight.discard(key)
+        exc = future.exception()
+        if exc is not None:
+            JOBS_FINISHED.inc(state=JOB_FAILED)
+            self.store.set_state(key, JOB_FAILED, error=f"{type(exc).__name__}: {exc}")
+        else:
+            JOBS_FINISHED.inc(state=JOB_DONE)
+            self.store.set_state(key, JOB_DONE, result=future.result())
+        notify_result(key, self.store.get(key))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(key)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+        self._stopped.set()
+
+
+class AsyncJobQueue:
+    """JobQueue for the ASGI backend: keyed coroutine jobs run as tasks on the event loop.
+
+    Claims, states and result webhooks work exactly as in JobQueue, so both
+    backends can share one ResultStore. At most `concurrency` jobs run at once
+    (the rest wait their turn in the queued state), which bounds memory however
+    many recordings arrive. Store access runs in worker threads. Keys owned
+    by an unfinished job are watched as in JobQueue, by a task per key, and
+    unfinished jobs get the same heartbeat, from a task.
+    """
+
+    def __init__(self, concurrency: int = 200, store: Optional[ResultStore] = None) -> None:
+        self.store = store or get_result_store()
+        self._limit = asyncio.Semaphore(max(1, concurrency))
+        self._tasks: Set[asyncio.Task] = set()
+        self._watching: Set[str] = set()
+        self._in_flight: Set[str] = set()
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls) -> "AsyncJobQueue":
+        return cls(concurrency=int(get_env("PIPELINE_ASYNC_CONCURRENCY", "200") or "200"))
+
+    async def submit(self, key: str, fn: Callable[..., Awaitable[Dict[str, Any]]], *args: Any, **kwargs: Any) -> bool:
+        """Schedule await fn(*args, **kwargs) under key. Returns False if the key was already claimed."""
+        if not await asyncio.to_thread(self.store.claim, key):
+            if key not in self._watching and _unfinished(await asyncio.to_thread(self.store.get, key)):
+                self._watching.add(key)
+                self._spawn(self._watch(key, fn, args, kwargs))
+            return False
+        self._start(key, fn, args, kwargs)
+        return True
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        task = asyncio.get_running_loop().create_task(coro)
+        # The loop only keeps weak references to tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _start(self, key: str, fn: Callable[..., Awaitable[Dict[str, Any]]], args: tuple, kwargs: dict) -> None:
+        JOBS_IN_FLIGHT.inc()
+        self._in_flight.add(key)
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = asyncio.get_running_loop().create_task(self._beat())
+        self._spawn(self._run(key, fn, args, kwargs))
+
+    async def _beat(self) -> None:
+        while self._in_flight:
+            await asyncio.sleep(_heartbeat_interval(self.store))
+            try:
+                await asyncio.to_thread(self.store.touch, list(self._in_flight))
+            except sqlite3.Error:
+                pass
+
+    async def _watch(self, key: str, fn: Callable[..., Awaitable[Dict[str, Any]]], args: tuple, kwargs: dict) -> None:
+        try:
+            while True:
+                await asyncio.sleep(JOB_WATCH_POLL_SECONDS)
+                record = await asyncio.to_thread(self.store.get, key)
+                if record is not None and record["state"] == JOB_DONE:
+                    return
+                if await asyncio.to_thread(self.store.claim, key):
+                    self._start(key, fn, args, kwargs)
+                    return
+        finally:
+            self._watching.discard(key)
+
+    async def _run(self, key: str, fn: Callable[..., Awaitable[Dict[str, Any]]], args: tuple, kwargs: dict) -> None:
+        try:
+            async with self._limit:
+                await asyncio.to_thread(self.store.set_state, key, JOB_RUNNING)
+                with request_priority(PRIORITY_BACKGROUND):
+                    result = await fn(*args, **kwargs)
+        except Exception as exc:
+            JOBS_FINISHED.inc(state=JOB_FAILED)
+            await asyncio.to_thread(self.store.set_state, key, JOB_FAILED, error=f"{type(exc).__name__}: {exc}")
+        else:
+            JOBS_FINISHED.inc(state=JOB_DONE)
+            await asyncio.to_thread(self.store.set_state, key, JOB_DONE, result=result)
+        finally:
+            JOBS_IN_FLIGHT.dec()
+            self._in_flight.discard(key)
+        notify_result(key, await asyncio.to_thread(self.store.get, key))
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.get, key)
+
+    async def shutdown(self) -> None:
+        """Cancel running jobs; they stay claimed, like jobs lost to a worker restart."""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
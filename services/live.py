@@ -0,0 +1,359 @@
+import argparse
+import base64
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import get_bool_env, get_env
+from models import ExtractedInfo
+from services.audio import (
+    SILENCE_FLOOR_DBFS,
+    WavAudio,
+    decode_mulaw,
+    encode_mulaw,
+    encode_wav,
+    frame_rms,
+    read_wav,
+    resample,
+    split_on_silence,
+)
+from services.pipeline import event_sink, run_transcript_stages
+from services.results import STATE_DONE, STATE_FAILED, STATE_RUNNING, get_result_store
+from services.submissions import find_submission
+from services.summarize import extract_caller_info
+from services.transcribe import stitch_transcripts, transcribe_audio
+from services.webhooks import notify_result
+
+# Twilio Media Streams carry 8 kHz mono mu-law, 160 bytes (20 ms) per media message
+MEDIA_SAMPLE_RATE = 8000
+MEDIA_FRAME_BYTES = 160
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = int(get_env("LIVE_TRANSCRIBE_THREADS", "4") or "4")
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="live-window")
+    return _executor
+
+
+def _is_silent(samples: np.ndarray) -> bool:
+    rms = frame_rms(samples, MEDIA_SAMPLE_RATE)
+    return not len(rms) or float(rms.max()) < 10 ** (SILENCE_FLOOR_DBFS / 20.0)
+
+
+class LiveCallSession:
+    """Transcribes one call's inbound audio in rolling windows while the call is in progress.
+
+    Audio is buffered until a window (plus room to look for a pause) has
+    arrived, then cut at the quietest point near the boundary with a short
+    overlap, the same way long recordings are chunked. Windows are transcribed
+    in parallel and stitched in order; after each one the caller details are
+    re-extracted from the transcript so far until a submission matches.
+    finish() only has the tail window and the summary left to do.
+
+    The session claims call_sid in the result store. The recording callback
+    for the same call then waits on that claim (see JobQueue.submit): it is
+    skipped once the session stores its result, and processes the recording
+    if the session fails or dies without finishing.
+    """
+
+    def __init__(
+        self,
+        call_sid: str,
+        *,
+        provider: Optional[str] = None,
+        api_key: Optional[str] = None,
+        window_seconds: float = 15.0,
+        overlap_seconds: float = 1.0,
+    ) -> None:
+        self.call_sid = call_sid
+        self.provider = provider
+        self.api_key = api_key
+        self.window_seconds = window_seconds
+        self.overlap_seconds = overlap_seconds
+        self.store = get_result_store()
+        self.owner = self.store.claim(call_sid)
+        self.extracted = ExtractedInfo()
+        self.submission: Optional[Dict[str, Any]] = None
+        # Reentrant because a window that is already done runs its callback inside _submit_window
+        self._lock = threading.RLock()
+        self._buffer: List[np.ndarray] = []
+        self._buffered = 0
+        self._windows: List[Future] = []
+        self._published = 0
+        self._extracting = False
+        self._extract_again = False
+        self._emit = event_sink(call_sid) if self.owner else None
+        if self.owner:
+            self.store.set_state(call_sid, STATE_RUNNING)
+            self._emit("stage", {"stage": "transcribe", "state": "started"})
+
+    @classmethod
+    def from_env(cls, call_sid: str, **kwargs: Any) -> "LiveCallSession":
+        return cls(
+            call_sid,
+            window_seconds=float(get_env("LIVE_WINDOW_SECONDS", "15")),
+            overlap_seconds=float(get_env("LIVE_WINDOW_OVERLAP_SECONDS", "1")),
+            **kwargs,
+        )
+
+    def feed(self, payload: bytes) -> None:
+        """Add one Media Streams payload (raw mu-law bytes) to the rolling buffer."""
+        if not self.owner:
+            return
+        samples = decode_mulaw(payload)
+        with self._lock:
+            self._buffer.append(samples)
+            self._buffered += len(samples)
+            if self._buffered < int(self.window_seconds * 1.25 * MEDIA_SAMPLE_RATE):
+                return
+            audio = np.concatenate(self._buffer)
+            ranges = split_on_silence(
+                WavAudio(audio.reshape(-1, 1), MEDIA_SAMPLE_RATE),
+                target_seconds=self.window_seconds,
+                overlap_seconds=self.overlap_seconds,
+            )
+            start, end = ranges[0]
+            rest = audio[ranges[1][0]:]
+            self._buffer = [rest]
+            self._buffered = len(rest)
+            self._submit_window(audio[start:end])
+
+    def _submit_window(self, samples: np.ndarray) -> None:
+        future = _get_executor().submit(self._transcribe_window, samples)
+        self._windows.append(future)
+        future.add_done_callback(lambda done: self._window_done())
+
+    def _transcribe_window(self, samples: np.ndarray) -> str:
+        if _is_silent(samples):
+            return ""
+        data = encode_wav(samples, MEDIA_SAMPLE_RATE)
+        return transcribe_audio(data, provider=self.provider, api_key=self.api_key, chunked=False)
+
+    def _stitched(self, count: int) -> str:
+        parts = [window.result() if window.exception() is None else "" for window in self._windows[:count]]
+        return stitch_transcripts(parts, self.overlap_seconds)
+
+    def _window_done(self) -> None:
+        with self._lock:
+            ready = 0
+            while ready < len(self._windows) and self._windows[ready].done():
+                ready += 1
+            if ready <= self._published:
+                return
+            self._published = ready
+            transcript = self._stitched(ready)
+        # Also keeps the claim fresh so a long call is not mistaken for a stale job
+        self.store.set_state(self.call_sid, STATE_RUNNING)
+        self._emit("transcript_partial", {"text": transcript, "windows": ready})
+        self._schedule_extract()
+
+    def _schedule_extract(self) -> None:
+        with self._lock:
+            if self.submission is not None:
+                return
+            if self._extracting:
+                self._extract_again = True
+                return
+            self._extracting = True
+        _get_executor().submit(self._extract_latest)
+
+    def _extract_latest(self) -> None:
+        # Runs until no newer transcript arrived meanwhile, so bursts of windows cost one extraction each round
+        while True:
+            with self._lock:
+                transcript = self._stitched(self._published)
+                self._extract_again = False
+            try:
+                info = extract_caller_info(transcript, provider=self.provider, api_key=self.api_key)
+                submission = find_submission(info) if any(info.model_dump().values()) else None
+            except Exception:
+                info, submission = None, None
+            if info is not None:
+                self._emit("extracted", info.model_dump())
+            if submission is not None:
+                self._emit("submission", submission)
+            with self._lock:
+                if info is not None:
+                    self.extracted = info
+                if submission is not None:
+                    self.submission = submission
+                if not self._extract_again or self.submission is not None:
+                    self._extracting = False
+                    return
+
+    def finish(self) -> Optional[Dict[str, Any]]:
+        """Transcribe the remaining audio, run the final stages and store the call result.
+
+        Returns the result (shaped like process_recording's) or None when this
+        session did not own the call or failed; failures are recorded in the
+        store so the recording callback can process the call instead.
+        """
+        if not self.owner:
+            return None
+        result = None
+        try:
+            with self._lock:
+                if self._buffered and not _is_silent(np.concatenate(self._buffer)):
+                    self._submit_window(np.concatenate(self._buffer))
+                self._buffer = []
+                self._buffered = 0
+                windows = list(self._windows)
+            errors: Dict[str, str] = {}
+            parts = []
+            for index, window in enumerate(windows):
+                try:
+                    parts.append(window.result())
+                except Exception as exc:
+                    parts.append("")
+                    errors[f"transcribe_window_{index}"] = f"{type(exc).__name__}: {exc}"
+            if errors:
+                # An incomplete live transcript is left to the recording pipeline
+                raise RuntimeError(f"{len(errors)} live transcription window(s) failed: {errors}")
+            transcript = stitch_transcripts(parts, self.overlap_seconds)
+            self._emit("stage", {"stage": "transcribe", "state": "done"})
+            self._emit("transcript", {"text": transcript})
+
+            stages = run_transcript_stages(
+                transcript,
+                provider=self.provider,
+                api_key=self.api_key,
+                single_pass=get_bool_env("PIPELINE_SINGLE_PASS"),
+                on_event=self._emit,
+            )
+            errors.update(stages["errors"])
+            extracted: ExtractedInfo = stages["extracted"]
+            if not any(extracted.model_dump().values()):
+                extracted = self.extracted
+            self._emit("summary", {"text": stages["summary"]})
+            result = {
+                "transcript": transcript,
+                "summary": stages["summary"],
+                "extracted": extracted.model_dump(),
+                "submission": stages["submission"] or self.submission,
+                "errors": errors,
+            }
+            if stages["still_running"]:
+                result["still_running"] = stages["still_running"]
+            self.store.set_state(self.call_sid, STATE_DONE, result=result)
+        except Exception as exc:
+            self.store.set_state(self.call_sid, STATE_FAILED, error=f"{type(exc).__name__}: {exc}")
+            result = None
+        notify_result(self.call_sid, self.store.get(self.call_sid))
+        return result
+
+
+def handle_media_stream(receive, *, provider: Optional[str], api_key: Optional[str]) -> Optional[LiveCallSession]:
+    """Consume Twilio Media Streams messages from receive() until "stop" or disconnect.
+
+    receive returns the next text message or None once the socket closed.
+    Only the inbound (caller) track is transcribed. The session's finish()
+    is started on a background thread so the socket is released at hangup.
+    """
+    session: Optional[LiveCallSession] = None
+    try:
+        while True:
+            message = receive()
+            if message is None:
+                break
+            data = json.loads(message)
+            event = data.get("event")
+            if event == "start":
+                session = LiveCallSession.from_env(data["start"]["callSid"], provider=provider, api_key=api_key)
+            elif event == "media" and session is not None:
+                media = data.get("media") or {}
+                if media.get("track", "inbound") == "inbound":
+                    session.feed(base64.b64decode(media["payload"]))
+            elif event == "stop":
+                break
+    finally:
+        # Also after a malformed message, so the claim ends as done or failed rather than going stale
+        if session is not None:
+            threading.Thread(target=session.finish, name=f"live-finish-{session.call_sid}", daemon=True).start()
+    return session
+
+
+def replay(wav_path: Path, url: str, call_sid: str, speed: float = 1.0) -> int:
+    """Stream a WAV file to a Media Streams endpoint as Twilio would; returns media messages sent."""
+    from simple_websocket import Client
+
+    audio = read_wav(wav_path)
+    if audio is None:
+        raise RuntimeError(f"{wav_path} is not a PCM WAV file")
+    mono = resample(audio.mono(), audio.sample_rate, MEDIA_SAMPLE_RATE)
+    payload = encode_mulaw(mono)
+    stream_sid = f"MZ{call_sid}"
+    ws = Client.connect(url)
+    try:
+        ws.send(json.dumps({"event": "connected", "protocol": "Call", "version": "1.0.0"}))
+        ws.send(json.dumps({
+            "event": "start",
+            "sequenceNumber": "1",
+            "streamSid": stream_sid,
+            "start": {
+                "streamSid": stream_sid,
+                "callSid": call_sid,
+                "tracks": ["inbound"],
+                "mediaFormat": {"encoding": "audio/x-mulaw", "sampleRate": MEDIA_SAMPLE_RATE, "channels": 1},
+            },
+        }))
+        frame_seconds = MEDIA_FRAME_BYTES / float(MEDIA_SAMPLE_RATE)
+        started = time.monotonic()
+        sent = 0
+        for chunk_index, offset in enumerate(range(0, len(payload), MEDIA_FRAME_BYTES)):
+            ws.send(json.dumps({
+                "event": "media",
+                "sequenceNumber": str(chunk_index + 2),
+                "streamSid": stream_sid,
+                "media": {
+                    "track": "inbound",
+                    "chunk": str(chunk_index + 1),
+                    "timestamp": str(int(chunk_index * frame_seconds * 1000)),
+                    "payload": base64.b64encode(payload[offset:offset + MEDIA_FRAME_BYTES]).decode("ascii"),
+                },
+            }))
+            sent += 1
+            if speed > 0:
+                delay = started + (chunk_index + 1) * frame_seconds / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+        ws.send(json.dumps({"event": "stop", "streamSid": stream_sid, "stop": {"callSid": call_sid}}))
+    finally:
+        ws.close()
+    return sent
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Live transcription utilities.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    play = sub.add_parser("replay", help="Stream a WAV file to /twilio/media as Twilio Media Streams frames.")
+    play.add_argument("wav", type=Path)
+    play.add_argument("--url", default="ws://localhost:5001/twilio/media", help="Media Streams endpoint (default: %(default)s)")
+    play.add_argument("--call-sid", default=f"CAreplay{int(time.time())}")
+    play.add_argument("--speed", type=float, default=1.0, help="Playback speed; 0 sends as fast as possible")
+    play.add_argument("--result-url", help="Backend base URL; wait for and print /call/result after the replay")
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        sent = replay(args.wav, args.url, args.call_sid, args.speed)
+        print(f"Sent {sent} media messages for {args.call_sid}")
+        if args.result_url:
+            import requests
+
+            resp = requests.get(f"{args.result_url}/call/result/{args.call_sid}", params={"wait": 30}, timeout=40)
+            print(json.dumps(resp.json(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
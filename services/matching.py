@@ -0,0 +1,374 @@
+"""Ranked fuzzy matching of ExtractedInfo records against the submissions data.
+
+find_submission (services.submissions) stays on the exact, indexed lookups.
+Ranking is for callers that want candidates rather than one answer: POST
+/submissions/lookup for back-office reconciliation and the "closest
+submissions" table in the UI. The matcher scores every submission against
+all three fields at once and returns the best k candidates:
+
+- name: edit distance, computed for all rows together as NumPy column
+  operations (one step per query character), blended with a Soundex-style
+  phonetic key per name token so "Sharma" still finds "Sarma".
+- mobile and submission numbers: digits are right-aligned and compared
+  position by position (Hamming distance); up to SUBMISSIONS_MATCH_MOBILE_ERRORS
+  and SUBMISSIONS_MATCH_SUBMISSION_ERRORS mismatched or missing digits still count.
+
+Field similarities are in [0, 1] and combine into a weighted average over the
+fields the query actually has. The matcher holds only NumPy arrays (no row
+dicts), is built on the first ranking request in a worker, rebuilt when the
+store's version changes and shared by all threads.
+"""
+
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import get_env
+from models import ExtractedInfo
+from services.metrics import timed
+from services.submissions import _digits, get_store
+
+# Relative weight of each field in the combined score
+FIELD_WEIGHTS = {"submission_number": 0.45, "mobile_number": 0.35, "name": 0.2}
+
+NAME_MAX_CHARS = 48
+MOBILE_DIGITS = 10
+# Names are mostly edit distance; the phonetic share forgives spellings that sound alike
+PHONETIC_WEIGHT = 0.3
+# A query that matches inside a longer name ("Anita" in "Anita Sharma") scores a little below a full match
+PARTIAL_NAME_FACTOR = 0.9
+# Rows per exact edit-distance pass when narrowing name candidates
+NAME_CHUNK_ROWS = 4096
+# A best match must lead the runner-up by this much to be accepted
+AMBIGUITY_MARGIN = 0.05
+
+_PAD_DIGIT = 10
+_BAG_ALPHABET = "abcdefghijklmnopqrstuvwxyz "
+_BAG_COLUMNS = {ch: column for column, ch in enumerate(_BAG_ALPHABET)}
+_HONORIFICS = {"mr", "mrs", "ms", "miss", "dr", "shri", "sri", "smt", "kumari"}
+_SOUNDEX_CODES = {
+    letter: code
+    for letters, code in (("bfpv", "1"), ("cgjkqsxz", "2"), ("dt", "3"), ("l", "4"), ("mn", "5"), ("r", "6"))
+    for letter in letters
+}
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Lower-case letters and single spaces, without honorifics ("Mr. A  Sharma" -> "a sharma")."""
+    tokens = re.sub(r"[^\w]+|[\d_]+", " ", (name or "").lower()).split()
+    return " ".join(token for token in tokens if token not in _HONORIFICS)[:NAME_MAX_CHARS]
+
+
+@lru_cache(maxsize=65536)
+def phonetic_key(token: str) -> str:
+    """Soundex code of a name token, with a consonant first letter replaced by its sound class.
+
+    Plain Soundex keeps the first letter, so "Kumar" (K560) and "Coomar" (C560)
+    differ; here both become "2560".
+    """
+    letters = [ch for ch in token if "a" <= ch <= "z"]
+    if not letters:
+        return ""
+    first = letters[0]
+    key = _SOUNDEX_CODES.get(first, first)
+    previous = _SOUNDEX_CODES.get(first, "")
+    for letter in letters[1:]:
+        code = _SOUNDEX_CODES.get(letter, "")
+        if code and code != previous:
+            key += code
+            if len(key) == 4:
+                break
+        if letter not in "hw":
+            previous = code
+    return key.ljust(4, "0")
+
+
+def _encode_names(names: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Names as an (N, width) matrix of code points (0-padded) plus their lengths."""
+    lengths = np.fromiter((len(name) for name in names), dtype=np.int32, count=len(names))
+    chars = np.zeros((len(names), max(int(lengths.max(initial=0)), 1)), dtype=np.uint32)
+    for pos, name in enumerate(names):
+        if name:
+            chars[pos, : len(name)] = np.frombuffer(name.encode("utf-32-le"), dtype=np.uint32)
+    return chars, lengths
+
+
+def _encode_digits(values: Sequence[str], width: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Digit strings right-aligned in an (N, width) matrix, padded on the left; longer values keep their tail."""
+    values = [value[-width:] for value in values]
+    lengths = np.fromiter((len(value) for value in values), dtype=np.int32, count=len(values))
+    # ":" follows "9" in ASCII, so left padding with it decodes to _PAD_DIGIT
+    padded = "".join(value.rjust(width, chr(ord("0") + _PAD_DIGIT)) for value in values)
+    matrix = np.frombuffer(padded.encode("ascii"), dtype=np.uint8).reshape(len(values), width) - ord("0")
+    return matrix, lengths
+
+
+def _edit_step(previous: np.ndarray, cost: np.ndarray, first: int, columns: np.ndarray) -> np.ndarray:
+    """One Levenshtein row for every name at once.
+
+    D[i][j] = min(D[i-1][j] + 1, D[i-1][j-1] + cost, D[i][j-1] + 1). The first
+    two terms are elementwise; the insertion chain is a running minimum of
+    D[i][j] - j, so the row needs no Python loop over j.
+    """
+    row = np.empty_like(previous)
+    row[:, 0] = first
+    np.minimum(previous[:, 1:] + 1, previous[:, :-1] + cost, out=row[:, 1:])
+    return np.minimum.accumulate(row - columns, axis=1) + columns
+
+
+def edit_distances(query: str, chars: np.ndarray, lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Levenshtein distance from query to each encoded name, and to the best-matching substring of it."""
+    count, width = chars.shape
+    # Distances never exceed len(query) + width, which is small; int16 halves the memory traffic
+    columns = np.arange(width + 1, dtype=np.int16)
+    full = np.broadcast_to(columns, (count, width + 1)).copy()
+    # Starting anywhere in the name is free for the substring variant
+    partial = np.zeros((count, width + 1), dtype=np.int16)
+    costs: Dict[str, np.ndarray] = {}
+    for i, ch in enumerate(query, start=1):
+        cost = costs.get(ch)
+        if cost is None:
+            cost = costs[ch] = (chars != ord(ch)).astype(np.int16)
+        full = _edit_step(full, cost, i, columns)
+        partial = _edit_step(partial, cost, i, columns)
+    rows = np.arange(count)
+    # Ending anywhere inside the name is free too; cells past its end compare against padding
+    partial = np.where(columns[None, :] <= lengths[:, None], partial, np.iinfo(np.int16).max)
+    return full[rows, lengths], partial.min(axis=1)
+
+
+def hamming_similarity(query: str, matrix: np.ndarray, lengths: np.ndarray, max_errors: int) -> np.ndarray:
+    """1 - errors / digits, where errors are differing aligned digits plus digits only one side has.
+
+    Rows with more than max_errors errors, or with no digits at all, get 0.
+    """
+    width = matrix.shape[1]
+    encoded, _ = _encode_digits([query], width)
+    errors = (matrix != encoded[0]).sum(axis=1) + max(len(query) - width, 0)
+    longest = np.maximum(lengths, len(query))
+    similarity = 1.0 - errors / np.maximum(longest, 1)
+    similarity[(errors > max_errors) | (lengths == 0)] = 0.0
+    return similarity
+
+
+class Candidate(NamedTuple):
+    pos: int
+    score: float
+    fields: Dict[str, float]
+
+
+class SubmissionMatcher:
+    """Column arrays of one version of the submissions data, scored against queries with NumPy."""
+
+    def __init__(self, fields: Iterable[Tuple[str, str, str]], version: object = None) -> None:
+        names: List[str] = []
+        mobiles: List[str] = []
+        submissions: List[str] = []
+        for name, mobile_digits, submission_number in fields:
+            names.append(normalize_name(name))
+            mobiles.append(mobile_digits[-MOBILE_DIGITS:])
+            submissions.append(_digits(submission_number))
+        self.version = version
+        self.size = len(names)
+
+        # Names repeat a lot, so they are scored once per distinct name and mapped back to rows
+        distinct: Dict[str, int] = {}
+        self._name_of_row = np.fromiter(
+            (distinct.setdefault(name, len(distinct)) for name in names), dtype=np.int32, count=self.size
+        )
+        distinct_names = list(distinct)
+        self._name_chars, self._name_lengths = _encode_names(distinct_names)
+        # Letter counts per name, for a cheap upper bound on edit similarity
+        self._name_bags = np.stack(
+            [(self._name_chars == ord(ch)).sum(axis=1, dtype=np.int16) for ch in _BAG_ALPHABET], axis=1
+        )
+        # Phonetic keys per name token as small ints, padded with -1
+        keys = [sorted({phonetic_key(token) for token in name.split()} - {""}) for name in distinct_names]
+        self._key_ids: Dict[str, int] = {}
+        self._name_keys = np.full((len(keys), max((len(k) for k in keys), default=0) or 1), -1, dtype=np.int32)
+        for pos, row_keys in enumerate(keys):
+            for column, key in enumerate(row_keys):
+                self._name_keys[pos, column] = self._key_ids.setdefault(key, len(self._key_ids))
+
+        self._mobiles, self._mobile_lengths = _encode_digits(mobiles, MOBILE_DIGITS)
+        submission_width = max((len(digits) for digits in submissions), default=0) or 1
+        self._submissions, self._submission_lengths = _encode_digits(submissions, submission_width)
+
+    def _phonetic_similarity(self, query: str) -> np.ndarray:
+        """Share of the query's phonetic keys found in each distinct name."""
+        query_keys = {phonetic_key(token) for token in query.split()} - {""}
+        key_ids = np.array([self._key_ids.get(key, -2) for key in query_keys], dtype=np.int32)
+        if not key_ids.size:
+            return np.zeros(len(self._name_keys))
+        return np.isin(self._name_keys, key_ids).sum(axis=1) / key_ids.size
+
+    def _edit_upper_bound(self, query: str) -> np.ndarray:
+        """Edit similarity each distinct name could reach at best, from letter counts alone.
+
+        A query letter with no counterpart in the name costs at least one edit,
+        so both distances are bounded below by the letters the two do not share.
+        """
+        common = np.zeros(len(self._name_lengths), dtype=np.int16)
+        for ch, count in Counter(query).items():
+            column = _BAG_COLUMNS.get(ch)
+            if column is None:
+                # Not counted per name; assume it matches so the bound stays an upper bound
+                common += count
+            else:
+                common += np.minimum(self._name_bags[:, column], count)
+        bound = np.maximum(
+            common / np.maximum(self._name_lengths, len(query)), PARTIAL_NAME_FACTOR * common / len(query)
+        )
+        bound[self._name_lengths == 0] = 0.0
+        return np.minimum(bound, 1.0)
+
+    def _edit_similarity(self, query: str, names: np.ndarray) -> np.ndarray:
+        """Edit similarity (full name, or PARTIAL_NAME_FACTOR x best substring) for the given distinct names."""
+        lengths = self._name_lengths[names]
+        chars = self._name_chars[names, : max(int(lengths.max()), 1)]
+        full, partial = edit_distances(query, chars, lengths)
+        edit = np.maximum(
+            1.0 - full / np.maximum(lengths, len(query)), PARTIAL_NAME_FACTOR * (1.0 - partial / len(query))
+        )
+        edit[lengths == 0] = 0.0
+        return edit
+
+    def _name_similarity(self, query: str, base: np.ndarray, weight: float, k: int, floor: float) -> np.ndarray:
+        """Per-row name similarity: edit similarity blended with the phonetic share.
+
+        base is each row's combined score from the other fields and weight the
+        name's share of it. Exact edit distances are only computed where they
+        can matter: rows are visited best upper bound first, in chunks, until
+        none left can reach the current k-th best score or floor. Rows never
+        visited keep their lower bound (phonetic share only), which is below
+        both, so they cannot enter the top k.
+        """
+        phonetic = PHONETIC_WEIGHT * self._phonetic_similarity(query)
+        upper = (1.0 - PHONETIC_WEIGHT) * self._edit_upper_bound(query) + phonetic
+        similarity = phonetic.copy()
+        scored = np.zeros(len(similarity), dtype=bool)
+
+        row_upper = base + weight * upper[self._name_of_row]
+        threshold = max(floor, _kth_largest(base + weight * similarity[self._name_of_row], k))
+        order = np.flatnonzero(row_upper >= threshold)
+        order = order[np.argsort(-row_upper[order], kind="stable")]
+        for start in range(0, order.size, NAME_CHUNK_ROWS):
+            chunk = order[start:start + NAME_CHUNK_ROWS]
+            if row_upper[chunk[0]] < threshold:
+                break
+            names = np.unique(self._name_of_row[chunk])
+            names = names[~scored[names]]
+            if names.size:
+                similarity[names] += (1.0 - PHONETIC_WEIGHT) * self._edit_similarity(query, names)
+                scored[names] = True
+                threshold = max(threshold, _kth_largest(base + weight * similarity[self._name_of_row], k))
+        return np.clip(similarity, 0.0, 1.0)[self._name_of_row]
+
+    def rank(self, info: ExtractedInfo, k: int = 5, min_score: float = 0.0) -> List[Candidate]:
+        """Best k rows for info by combined score (highest first), dropping those below min_score."""
+        if not self.size or k <= 0:
+            return []
+        scores: Dict[str, np.ndarray] = {}
+        submission = _digits(info.submission_number or "")
+        if submission:
+            scores["submission_number"] = hamming_similarity(
+                submission, self._submissions, self._submission_lengths, _max_errors("SUBMISSION", 1)
+            )
+        mobile = (info.normalized_mobile() or "")[-MOBILE_DIGITS:]
+        if mobile:
+            scores["mobile_number"] = hamming_similarity(
+                mobile, self._mobiles, self._mobile_lengths, _max_errors("MOBILE", 2)
+            )
+        name = normalize_name(info.name)
+        total_weight = sum(FIELD_WEIGHTS[field] for field in scores) + (FIELD_WEIGHTS["name"] if name else 0.0)
+        if not total_weight:
+            return []
+
+        combined = sum((FIELD_WEIGHTS[field] * values for field, values in scores.items()), np.zeros(self.size))
+        combined /= total_weight
+        if name:
+            weight = FIELD_WEIGHTS["name"] / total_weight
+            scores["name"] = self._name_similarity(name, combined, weight, k, min_score)
+            combined += weight * scores["name"]
+
+        if k < self.size:
+            top = np.argpartition(-combined, k - 1)[:k]
+        else:
+            top = np.arange(self.size)
+        top = top[np.argsort(-combined[top], kind="stable")]
+        return [
+            Candidate(int(pos), round(float(combined[pos]), 4), {f: round(float(v[pos]), 4) for f, v in scores.items()})
+            for pos in top
+            if combined[pos] >= min_score and combined[pos] > 0
+        ]
+
+
+def _kth_largest(values: np.ndarray, k: int) -> float:
+    return float(np.partition(values, values.size - k)[values.size - k]) if k <= values.size else 0.0
+
+
+def _max_errors(field: str, default: int) -> int:
+    return int(get_env(f"SUBMISSIONS_MATCH_{field}_ERRORS", str(default)))
+
+
+def _min_score() -> float:
+    return float(get_env("SUBMISSIONS_MATCH_MIN_SCORE", "0.5"))
+
+
+def _accept_score() -> float:
+    return float(get_env("SUBMISSIONS_MATCH_ACCEPT_SCORE", "0.8"))
+
+
+_matcher: Optional[SubmissionMatcher] = None
+_matcher_store: object = None
+_matcher_lock = threading.Lock()
+
+
+def get_matcher() -> SubmissionMatcher:
+    """Matcher for the current store, rebuilt when the store (or its data file) changes."""
+    global _matcher, _matcher_store
+    store = get_store()
+    version = store.version()
+    matcher = _matcher
+    if matcher is not None and _matcher_store is store and matcher.version == version:
+        return matcher
+    with _matcher_lock:
+        if _matcher is None or _matcher_store is not store or _matcher.version != version:
+            with timed("match_index"):
+                _matcher = SubmissionMatcher(store.match_fields(), version)
+            _matcher_store = store
+        return _matcher
+
+
+def rank_submissions(info: ExtractedInfo, k: int = 5, min_score: Optional[float] = None) -> List[Dict]:
+    """Top-k candidate submissions for info: [{"submission": row, "score": ..., "fields": {...}}, ...]."""
+    with timed("match"):
+        store = get_store()
+        matcher = get_matcher()
+        threshold = _min_score() if min_score is None else min_score
+        return [
+            {"submission": store.row_at(candidate.pos), "score": candidate.score, "fields": candidate.fields}
+            for candidate in matcher.rank(info, k, threshold)
+        ]
+
+
+def best_match(candidates: List[Dict]) -> Optional[Dict[str, str]]:
+    """The top candidate if it clears SUBMISSIONS_MATCH_ACCEPT_SCORE and is not tied with the runner-up."""
+    if not candidates or candidates[0]["score"] < _accept_score():
+        return None
+    if len(candidates) > 1 and candidates[0]["score"] - candidates[1]["score"] < AMBIGUITY_MARGIN:
+        return None
+    return candidates[0]["submission"]
+
+
+def lookup_batch(records: Sequence[ExtractedInfo], k: int = 3, min_score: Optional[float] = None) -> List[Dict]:
+    """Resolve many records against one matcher: each gets its ranked candidates and the accepted match, if any."""
+    results = []
+    for info in records:
+        candidates = rank_submissions(info, k, min_score)
+        results.append({"query": info.model_dump(), "match": best_match(candidates), "candidates": candidates})
+    return results
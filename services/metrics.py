@@ -0,0 +1,227 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = [(key, list(counts), self._sums[key]) for key, counts in self._counts.items()]
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            plain = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{plain} {_format_value(total)}")
+            lines.append(f"{self.name}_count{plain} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Process-local metrics rendered in the Prometheus text exposition format.
+
+    Under gunicorn every worker has its own registry, so each scrape reports
+    the worker that answered it; the shared result store figures are the same
+    from every worker.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], List[_Metric]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], List[_Metric]]) -> None:
+        """Register a callable that builds metrics fresh at scrape time (e.g. cache stats)."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                metrics = collector()
+            except Exception:
+                continue
+            for metric in metrics:
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram("pipeline_stage_seconds", "Wall time of pipeline stages.", ["stage"]))
+STAGE_FAILURES = REGISTRY.register(Counter("pipeline_stage_failures_total", "Pipeline stages that raised.", ["stage"]))
+STAGES_ABANDONED = REGISTRY.register(
+    Gauge("pipeline_stages_abandoned", "Timed-out pipeline stages still running in the background.", ["stage"])
+)
+STAGE_BYTES = REGISTRY.register(Counter("pipeline_stage_bytes_total", "Bytes received or sent by pipeline stages.", ["stage", "direction"]))
+LLM_TOKENS = REGISTRY.register(Counter("llm_tokens_total", "Tokens reported by the model API.", ["model", "kind"]))
+LLM_REQUESTS = REGISTRY.register(Counter("llm_requests_total", "Model API requests.", ["model", "outcome"]))
+JOBS_IN_FLIGHT = REGISTRY.register(Gauge("pipeline_jobs_in_flight", "Recording jobs queued or running in this worker."))
+JOBS_FINISHED = REGISTRY.register(Counter("pipeline_jobs_finished_total", "Recording jobs finished in this worker.", ["state"]))
+
+_trace: contextvars.ContextVar = contextvars.ContextVar("pipeline_trace", default=None)
+
+
+def start_trace() -> List[Dict[str, Any]]:
+    """Collect stage timings of the current context (and contexts copied from it) into a list."""
+    trace: List[Dict[str, Any]] = []
+    _trace.set(trace)
+    return trace
+
+
+# Ways out of a stage that do not mean it failed: a consumer closing a stream early, or shutdown
+_NOT_FAILURES = (GeneratorExit, KeyboardInterrupt, SystemExit)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    ok = True
+    try:
+        yield
+    except _NOT_FAILURES:
+        raise
+    except BaseException:
+        ok = False
+        STAGE_FAILURES.inc(stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        trace = _trace.get()
+        if trace is not None:
+            trace.append({"stage": stage, "seconds": round(elapsed, 4), "ok": ok})
+
+
+def record_bytes(stage: str, direction: str, amount: int) -> None:
+    STAGE_BYTES.inc(amount, stage=stage, direction=direction)
+
+
+def record_llm_response(model: str, response: Any) -> None:
+    LLM_REQUESTS.inc(model=model, outcome="ok")
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    for kind, attr in (("prompt", "prompt_token_count"), ("output", "candidates_token_count"), ("total", "total_token_count")):
+        value = getattr(usage, attr, None)
+        if value:
+            LLM_TOKENS.inc(value, model=model, kind=kind)
+
+
+def render() -> str:
+    return REGISTRY.render()
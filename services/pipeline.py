@@ -0,0 +1,498 @@
+import asyncio
+import contextlib
+import contextvars
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, TimeoutError
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import get_bool_env, get_env
+from models import ExtractedInfo
+from services.gateway import request_deadline
+from services.metrics import STAGES_ABANDONED, record_bytes, start_trace, timed
+from services.results import get_result_store
+from services.submissions import find_submission
+from services.summarize import (
+    aanalyze_transcript,
+    aextract_caller_info,
+    analyze_transcript,
+    astream_summary,
+    asummarize_transcript,
+    extract_caller_info,
+    stream_summary,
+    summarize_transcript,
+)
+from services.transcribe import atranscribe_audio, transcribe_audio
+
+if TYPE_CHECKING:
+    import httpx
+
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def download_recording(recording_url: str) -> Path:
+    """Stream a Twilio recording to a temporary WAV file and return its path.
+
+    The body is written in fixed-size chunks, so memory use does not grow with
+    the recording length. The caller is responsible for deleting the file.
+    """
+    import requests
+
+    # Twilio RecordingUrl does not include extension; append .wav for a WAV file
+    audio_url = f"{recording_url}.wav"
+    with timed("download"), requests.get(audio_url, stream=True, timeout=60) as resp:
+        resp.raise_for_status()
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+            try:
+                for chunk in resp.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    tmp.write(chunk)
+                    record_bytes("download", "in", len(chunk))
+            except BaseException:
+                tmp.close()
+                Path(tmp.name).unlink(missing_ok=True)
+                raise
+            return Path(tmp.name)
+
+
+EventSink = Callable[[str, Dict[str, Any]], None]
+
+
+def event_sink(call_sid: Optional[str]) -> Optional[EventSink]:
+    """Return a callable appending progress events for call_sid to the result store."""
+    if call_sid is None:
+        return None
+    store = get_result_store()
+
+    def emit(event: str, data: Dict[str, Any]) -> None:
+        try:
+            store.append_event(call_sid, event, data)
+        except sqlite3.Error:
+            # Progress is informational; never fail the job over it
+            pass
+
+    return emit
+
+
+def _stream_summary_text(transcript: str, on_event: EventSink, **kwargs: Any) -> str:
+    pieces = []
+    for piece in stream_summary(transcript, **kwargs):
+        pieces.append(piece)
+        on_event("summary_delta", {"text": piece})
+    return "".join(pieces).strip()
+
+
+DEFAULT_STAGE_TIMEOUTS = {
+    "summarize": 120.0,
+    "extract": 120.0,
+    "analyze": 180.0,
+    "lookup": 10.0,
+}
+
+_stage_executor: Optional[ThreadPoolExecutor] = None
+_stage_executor_lock = threading.Lock()
+
+
+def _get_stage_executor() -> ThreadPoolExecutor:
+    global _stage_executor
+    if _stage_executor is None:
+        with _stage_executor_lock:
+            if _stage_executor is None:
+                workers = int(get_env("PIPELINE_STAGE_THREADS", "8") or "8")
+                _stage_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipeline-stage")
+    return _stage_executor
+
+
+def _stage_timeouts(overrides: Optional[Dict[str, float]]) -> Dict[str, float]:
+    timeouts = {
+        stage: float(get_env(f"PIPELINE_TIMEOUT_{stage.upper()}", str(default)))
+        for stage, default in DEFAULT_STAGE_TIMEOUTS.items()
+    }
+    timeouts.update(overrides or {})
+    return timeouts
+
+
+def _run_before(deadline: float, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a stage with its model calls capped at the stage deadline, so a timed-out stage winds down."""
+    with request_deadline(deadline - time.monotonic()):
+        return fn(*args, **kwargs)
+
+
+def _await_stage(stage: str, future: Future, deadline: float, result: Dict[str, Any]) -> Any:
+    """Wait for a stage until its deadline; record timeouts and failures instead of raising."""
+    errors = result["errors"]
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except TimeoutError:
+        errors[stage] = "timed out"
+        # Not-yet-started work is dropped. A running stage cannot be interrupted; its model
+        # calls stop at the same deadline, and until then it is reported as still running.
+        if not future.cancel():
+            result["still_running"].append(stage)
+            STAGES_ABANDONED.inc(stage=stage)
+            future.add_done_callback(lambda _: STAGES_ABANDONED.dec(stage=stage))
+    except CancelledError:
+        errors[stage] = "cancelled"
+    except Exception as exc:
+        errors[stage] = f"{type(exc).__name__}: {exc}"
+    return None
+
+
+def run_transcript_stages(
+    transcript: str,
+    *,
+    provider: Optional[str] = None,
+    api_key: Optional[str] = None,
+    single_pass: bool = False,
+    timeouts: Optional[Dict[str, float]] = None,
+    on_event: Optional[EventSink] = None,
+) -> Dict[str, Any]:
+    """Run the post-transcription stages concurrently on the shared stage executor.
+
+    Summarization and extraction (or the single analyze call) start together,
+    and the submission lookup is chained onto extraction so it begins the
+    moment extraction finishes. Every stage has its own timeout; a failed or
+    timed-out stage leaves its default value and an entry in "errors" while
+    the other stages' results are still returned. A stage's model calls share
+    its deadline (services.gateway.request_deadline), so a stage that times
+    out mid-request stops shortly after; stages that were still running when
+    they were given up on are listed in "still_running".
+
+    With on_event, stage progress is reported as it happens and the summary is
+    streamed, with each piece of text reported as a "summary_delta" event.
+
+    Returns {"summary", "extracted" (ExtractedInfo), "submission", "errors", "still_running"}.
+    """
+    executor = _get_stage_executor()
+    # Each stage runs in a copy of the caller's context so its timings land in the caller's trace
+    context = contextvars.copy_context()
+
+    def _submit(stage: str, fn, *args, **kwargs) -> Future:
+        deadline = time.monotonic() + limits[stage]
+        future = executor.submit(context.copy().run, _run_before, deadline, fn, *args, **kwargs)
+        if on_event is not None:
+            on_event("stage", {"stage": stage, "state": "started"})
+            future.add_done_callback(lambda done: on_event("stage", {
+                "stage": stage,
+                "state": "done" if not done.cancelled() and done.exception() is None else "failed",
+            }))
+        return future
+
+    limits = _stage_timeouts(timeouts)
+    errors: Dict[str, str] = {}
+    result: Dict[str, Any] = {
+        "summary": "", "extracted": ExtractedInfo(), "submission": None, "errors": errors, "still_running": []
+    }
+    started = time.monotonic()
+
+    lookup: Dict[str, Future] = {}
+    lookup_scheduled = threading.Event()
+    abandoned = threading.Event()
+
+    def _chain_lookup(done: Future) -> None:
+        try:
+            if not abandoned.is_set() and not done.cancelled() and done.exception() is None:
+                value = done.result()
+                info = value.extracted if single_pass else value
+                lookup["future"] = _submit("lookup", find_submission, info)
+        finally:
+            lookup_scheduled.set()
+
+    kwargs = {"provider": provider, "api_key": api_key}
+    if single_pass:
+        extract_stage = "analyze"
+        extract_future = _submit("analyze", analyze_transcript, transcript, **kwargs)
+        summary_future = None
+    else:
+        extract_stage = "extract"
+        if on_event is not None:
+            summary_future = _submit("summarize", _stream_summary_text, transcript, on_event, **kwargs)
+        else:
+            summary_future = _submit("summarize", summarize_transcript, transcript, **kwargs)
+        extract_future = _submit("extract", extract_caller_info, transcript, **kwargs)
+    extract_future.add_done_callback(_chain_lookup)
+
+    extract_deadline = started + limits[extract_stage]
+    extracted = _await_stage(extract_stage, extract_future, extract_deadline, result)
+    if extracted is None:
+        abandoned.set()
+    else:
+        if single_pass:
+            result["summary"] = extracted.summary
+            result["extracted"] = extracted.extracted
+        else:
+            result["extracted"] = extracted
+        lookup_scheduled.wait()
+        lookup_future = lookup.get("future")
+        if lookup_future is not None:
+            submission = _await_stage("lookup", lookup_future, time.monotonic() + limits["lookup"], result)
+            result["submission"] = submission
+
+    if summary_future is not None:
+        summary = _await_stage("summarize", summary_future, started + limits["summarize"], result)
+        if summary is not None:
+            result["summary"] = summary
+
+    return result
+
+
+def process_recording(
+    recording_url: str,
+    *,
+    provider: Optional[str] = None,
+    api_key: Optional[str] = None,
+    single_pass: Optional[bool] = None,
+    call_sid: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Download a Twilio recording, transcribe it and run the remaining stages concurrently.
+
+    With single_pass (default: PIPELINE_SINGLE_PASS) summary and extraction come
+    from one analyze_transcript call. With PIPELINE_TRACE enabled the per-stage
+    timings are returned under "trace". When call_sid is given, progress and
+    partial summary text are appended to the result store as events for
+    /call/events/<call_sid>. Kept as a plain module-level function so it can
+    run in a thread or a separate process of the job queue.
+    """
+    if single_pass is None:
+        single_pass = get_bool_env("PIPELINE_SINGLE_PASS")
+    trace = start_trace() if get_bool_env("PIPELINE_TRACE") else None
+    on_event = event_sink(call_sid)
+
+    def _stage(stage: str, state: str) -> None:
+        if on_event is not None:
+            on_event("stage", {"stage": stage, "state": state})
+
+    _stage("download", "started")
+    audio_path = download_recording(recording_url)
+    _stage("download", "done")
+    try:
+        _stage("transcribe", "started")
+        transcript = transcribe_audio(audio_path, provider=provider, api_key=api_key)
+        _stage("transcribe", "done")
+    finally:
+        audio_path.unlink(missing_ok=True)
+    if on_event is not None:
+        on_event("transcript", {"text": transcript})
+
+    stages = run_transcript_stages(
+        transcript, provider=provider, api_key=api_key, single_pass=single_pass, on_event=on_event
+    )
+    extracted: ExtractedInfo = stages["extracted"]
+    if on_event is not None:
+        on_event("summary", {"text": stages["summary"]})
+
+    result = {
+        "transcript": transcript,
+        "summary": stages["summary"],
+        "extracted": extracted.model_dump(),
+        "submission": stages["submission"],
+        "errors": stages["errors"],
+    }
+    if stages["still_running"]:
+        result["still_running"] = stages["still_running"]
+    if trace is not None:
+        result["trace"] = trace
+    return result
+
+
+# Async variants for the ASGI backend (asgi_app.py). One event loop can overlap
+# many calls that are waiting on Twilio or Gemini, where the sync versions hold
+# a worker thread (or process) per call for the whole pipeline.
+
+
+async def adownload_recording(recording_url: str, client: Optional["httpx.AsyncClient"] = None) -> Path:
+    """Async download_recording: streams the WAV to a temporary file in fixed-size chunks.
+
+    Pass a shared httpx.AsyncClient to reuse its connection pool.
+    """
+    audio_url = f"{recording_url}.wav"
+    own_client = client is None
+    if own_client:
+        import httpx
+
+        client = httpx.AsyncClient(timeout=60, follow_redirects=True)
+    try:
+        with timed("download"):
+            async with client.stream("GET", audio_url) as resp:
+                resp.raise_for_status()
+                with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+                    try:
+                        async for chunk in resp.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                            tmp.write(chunk)
+                            record_bytes("download", "in", len(chunk))
+                    except BaseException:
+                        tmp.close()
+                        Path(tmp.name).unlink(missing_ok=True)
+                        raise
+                    return Path(tmp.name)
+    finally:
+        if own_client:
+            await client.aclose()
+
+
+@contextlib.asynccontextmanager
+async def aevent_sink(call_sid: Optional[str]) -> AsyncIterator[Optional[EventSink]]:
+    """Async event_sink whose emit never blocks the event loop.
+
+    Events are queued and appended by a single writer task in a worker
+    thread, in order, batching whatever arrived while the previous write ran
+    (summary deltas come one token at a time). Leaving the context waits
+    until every queued event is written.
+    """
+    if call_sid is None:
+        yield None
+        return
+    write = event_sink(call_sid)
+    queue: "asyncio.Queue[Optional[Tuple[str, Dict[str, Any]]]]" = asyncio.Queue()
+
+    def _write_batch(batch: List[Tuple[str, Dict[str, Any]]]) -> None:
+        for event, data in batch:
+            write(event, data)
+
+    async def _writer() -> None:
+        finished = False
+        while not finished:
+            batch = [await queue.get()]
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+            finished = batch[-1] is None
+            await asyncio.to_thread(_write_batch, [item for item in batch if item is not None])
+
+    writer = asyncio.create_task(_writer())
+    try:
+        yield lambda event, data: queue.put_nowait((event, data))
+    finally:
+        queue.put_nowait(None)
+        await writer
+
+
+async def _astream_summary_text(transcript: str, on_event: EventSink, **kwargs: Any) -> str:
+    pieces = []
+    async for piece in astream_summary(transcript, **kwargs):
+        pieces.append(piece)
+        on_event("summary_delta", {"text": piece})
+    return "".join(pieces).strip()
+
+
+async def arun_transcript_stages(
+    transcript: str,
+    *,
+    provider: Optional[str] = None,
+    api_key: Optional[str] = None,
+    single_pass: bool = False,
+    timeouts: Optional[Dict[str, float]] = None,
+    on_event: Optional[EventSink] = None,
+) -> Dict[str, Any]:
+    """Async run_transcript_stages with the same stages, timeouts, events and result.
+
+    Stages run as tasks on the current event loop; a stage that times out is
+    cancelled rather than left running in the background, so "still_running"
+    stays empty.
+    """
+    limits = _stage_timeouts(timeouts)
+    errors: Dict[str, str] = {}
+    result: Dict[str, Any] = {
+        "summary": "", "extracted": ExtractedInfo(), "submission": None, "errors": errors, "still_running": []
+    }
+    kwargs = {"provider": provider, "api_key": api_key}
+
+    async def _run(stage: str, work: Awaitable[Any], timeout: float) -> Any:
+        if on_event is not None:
+            on_event("stage", {"stage": stage, "state": "started"})
+        state = "failed"
+        try:
+            value = await asyncio.wait_for(work, max(0.0, timeout))
+            state = "done"
+            return value
+        except asyncio.TimeoutError:
+            errors[stage] = "timed out"
+        except Exception as exc:
+            errors[stage] = f"{type(exc).__name__}: {exc}"
+        finally:
+            if on_event is not None:
+                on_event("stage", {"stage": stage, "state": state})
+        return None
+
+    async def _extract_then_lookup() -> None:
+        if single_pass:
+            analysis = await _run("analyze", aanalyze_transcript(transcript, **kwargs), limits["analyze"])
+            if analysis is None:
+                return
+            result["summary"] = analysis.summary
+            info = result["extracted"] = analysis.extracted
+        else:
+            info = await _run("extract", aextract_caller_info(transcript, **kwargs), limits["extract"])
+            if info is None:
+                return
+            result["extracted"] = info
+        result["submission"] = await _run("lookup", asyncio.to_thread(find_submission, info), limits["lookup"])
+
+    async def _summarize() -> None:
+        if on_event is not None:
+            work = _astream_summary_text(transcript, on_event, **kwargs)
+        else:
+            work = asummarize_transcript(transcript, **kwargs)
+        summary = await _run("summarize", work, limits["summarize"])
+        if summary is not None:
+            result["summary"] = summary
+
+    if single_pass:
+        await _extract_then_lookup()
+    else:
+        await asyncio.gather(_summarize(), _extract_then_lookup())
+    return result
+
+
+async def aprocess_recording(
+    recording_url: str,
+    *,
+    provider: Optional[str] = None,
+    api_key: Optional[str] = None,
+    single_pass: Optional[bool] = None,
+    call_sid: Optional[str] = None,
+    http_client: Optional["httpx.AsyncClient"] = None,
+) -> Dict[str, Any]:
+    """Async process_recording; returns the same result dict and emits the same events."""
+    if single_pass is None:
+        single_pass = get_bool_env("PIPELINE_SINGLE_PASS")
+    trace = start_trace() if get_bool_env("PIPELINE_TRACE") else None
+    async with aevent_sink(call_sid) as on_event:
+
+        def _stage(stage: str, state: str) -> None:
+            if on_event is not None:
+                on_event("stage", {"stage": stage, "state": state})
+
+        _stage("download", "started")
+        audio_path = await adownload_recording(recording_url, http_client)
+        _stage("download", "done")
+        try:
+            _stage("transcribe", "started")
+            transcript = await atranscribe_audio(audio_path, provider=provider, api_key=api_key)
+            _stage("transcribe", "done")
+        finally:
+            audio_path.unlink(missing_ok=True)
+        if on_event is not None:
+            on_event("transcript", {"text": transcript})
+
+        stages = await arun_transcript_stages(
+            transcript, provider=provider, api_key=api_key, single_pass=single_pass, on_event=on_event
+        )
+        extracted: ExtractedInfo = stages["extracted"]
+        if on_event is not None:
+            on_event("summary", {"text": stages["summary"]})
+
+    result = {
+        "transcript": transcript,
+        "summary": stages["summary"],
+        "extracted": extracted.model_dump(),
+        "submission": stages["submission"],
+        "errors": stages["errors"],
+    }
+    if stages["still_running"]:
+        result["still_running"] = stages["still_running"]
+    if trace is not None:
+        result["trace"] = trace
+    return result
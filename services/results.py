@@ -0,0 +1,315 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import get_env
+from services.metrics import REGISTRY, Gauge
+
+RESULTS_DB_PATH = Path("data") / "call_results.db"
+
+STATE_QUEUED = "queued"
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS call_results (
+    call_sid TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    result_json TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_call_results_updated ON call_results (updated_at);
+CREATE TABLE IF NOT EXISTS call_events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    call_sid TEXT NOT NULL,
+    event TEXT NOT NULL,
+    data_json TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_call_events_sid ON call_events (call_sid, seq);
+"""
+
+
+class ResultStore:
+    """Call results shared by every worker through a local SQLite file.
+
+    A small LRU of finished results sits in front of the database so hot reads
+    never touch disk. Only "done" records are cached because they no longer
+    change; in-flight states are always read from the file since another worker
+    may be updating them. Rows expire after ttl_seconds and the table is capped
+    at max_rows, so both memory and disk stay bounded over long uptimes.
+
+    Progress events of running jobs (stage changes, partial summary text) are
+    appended to a second table so a stream opened on any worker can follow them.
+    """
+
+    PURGE_INTERVAL_SECONDS = 60.0
+
+    def __init__(
+        self,
+        db_path: Path = RESULTS_DB_PATH,
+        *,
+        ttl_seconds: float = 7 * 24 * 3600,
+        cache_size: int = 256,
+        max_rows: int = 100000,
+        stale_seconds: float = 900,
+    ) -> None:
+        self.db_path = Path(db_path)
+        self.ttl_seconds = ttl_seconds
+        self.cache_size = cache_size
+        self.max_rows = max_rows
+        self.stale_seconds = stale_seconds
+        self._local = threading.local()
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._last_purge = 0.0
+        # Notified on every state change or event written by this process
+        self._changed = threading.Condition()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    @classmethod
+    def from_env(cls) -> "ResultStore":
+        return cls(
+            Path(get_env("CALL_RESULTS_DB") or RESULTS_DB_PATH),
+            ttl_seconds=float(get_env("CALL_RESULTS_TTL_SECONDS", str(7 * 24 * 3600))),
+            cache_size=int(get_env("CALL_RESULTS_CACHE_SIZE", "256")),
+            max_rows=int(get_env("CALL_RESULTS_MAX_ROWS", "100000")),
+            stale_seconds=float(get_env("JOB_STALE_SECONDS", "900")),
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # A forked child (PIPELINE_EXECUTOR=process) inherits the parent's connection;
+        # SQLite connections must not cross a fork, so leave it alone and open a new one
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def claim(self, call_sid: str) -> bool:
+        """Mark call_sid as queued unless another worker already owns it.
+
+        Returns True when the caller should run the job. Failed records and
+        queued/running records that stopped updating (e.g. their worker was
+        restarted) can be claimed again.
+        """
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT state, updated_at FROM call_results WHERE call_sid = ?", (call_sid,)
+            ).fetchone()
+            if row is not None:
+                state, updated_at = row
+                stale = state in (STATE_QUEUED, STATE_RUNNING) and now - updated_at > self.stale_seconds
+                expired = now - updated_at > self.ttl_seconds
+                if state != STATE_FAILED and not stale and not expired:
+                    conn.execute("COMMIT")
+                    return False
+            conn.execute(
+                "INSERT OR REPLACE INTO call_results (call_sid, state, result_json, error, created_at, updated_at) "
+                "VALUES (?, ?, NULL, NULL, ?, ?)",
+                (call_sid, STATE_QUEUED, now, now),
+            )
+            # Events of an earlier attempt would confuse anyone following the new run
+            conn.execute("DELETE FROM call_events WHERE call_sid = ?", (call_sid,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._forget(call_sid)
+        return True
+
+    def set_state(
+        self,
+        call_sid: str,
+        state: str,
+        *,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        now = time.time()
+        result_json = json.dumps(result) if result is not None else None
+        self._connection().execute(
+            "INSERT INTO call_results (call_sid, state, result_json, error, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (call_sid) DO UPDATE SET state = excluded.state, result_json = excluded.result_json, "
+            "error = excluded.error, updated_at = excluded.updated_at",
+            (call_sid, state, result_json, error, now, now),
+        )
+        self._forget(call_sid)
+        self._notify()
+        self._maybe_purge(now)
+
+    def touch(self, call_sids: Iterable[str]) -> None:
+        """Heartbeat: refresh updated_at of queued/running records so claim() does not treat them as stale."""
+        now = time.time()
+        self._connection().executemany(
+            "UPDATE call_results SET updated_at = ? WHERE call_sid = ? AND state IN (?, ?)",
+            [(now, call_sid, STATE_QUEUED, STATE_RUNNING) for call_sid in call_sids],
+        )
+
+    def get(self, call_sid: str) -> Optional[Dict[str, Any]]:
+        """Return {"state", "result", "error", "created_at", "updated_at"} or None."""
+        now = time.time()
+        with self._cache_lock:
+            record = self._cache.get(call_sid)
+            if record is not None:
+                if now - record["updated_at"] <= self.ttl_seconds:
+                    self._cache.move_to_end(call_sid)
+                    return record
+                del self._cache[call_sid]
+
+        row = self._connection().execute(
+            "SELECT state, result_json, error, created_at, updated_at FROM call_results WHERE call_sid = ?",
+            (call_sid,),
+        ).fetchone()
+        if row is None or now - row[4] > self.ttl_seconds:
+            return None
+        record = {
+            "state": row[0],
+            "result": json.loads(row[1]) if row[1] else None,
+            "error": row[2],
+            "created_at": row[3],
+            "updated_at": row[4],
+        }
+        if record["state"] == STATE_DONE and self.cache_size > 0:
+            with self._cache_lock:
+                self._cache[call_sid] = record
+                self._cache.move_to_end(call_sid)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return record
+
+    def wait_until_finished(self, call_sid: str, timeout: float, poll_seconds: float = 0.25) -> Optional[Dict[str, Any]]:
+        """Block up to timeout for call_sid to reach done/failed and return its latest record.
+
+        A job finishing in this process wakes the caller immediately; one
+        finishing on another worker is picked up within poll_seconds.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            record = self.get(call_sid)
+            remaining = deadline - time.monotonic()
+            if (record is not None and record["state"] in (STATE_DONE, STATE_FAILED)) or remaining <= 0:
+                return record
+            with self._changed:
+                self._changed.wait(min(poll_seconds, remaining))
+
+    def append_event(self, call_sid: str, event: str, data: Dict[str, Any]) -> int:
+        """Record a progress event for call_sid and return its sequence number."""
+        cursor = self._connection().execute(
+            "INSERT INTO call_events (call_sid, event, data_json, created_at) VALUES (?, ?, ?, ?)",
+            (call_sid, event, json.dumps(data), time.time()),
+        )
+        self._notify()
+        return cursor.lastrowid
+
+    def events_since(self, call_sid: str, after: int = 0) -> List[Dict[str, Any]]:
+        """Return [{"id", "event", "data"}] for call_sid with id > after, oldest first."""
+        rows = self._connection().execute(
+            "SELECT seq, event, data_json FROM call_events WHERE call_sid = ? AND seq > ? ORDER BY seq",
+            (call_sid, after),
+        ).fetchall()
+        return [{"id": seq, "event": event, "data": json.loads(data_json)} for seq, event, data_json in rows]
+
+    def wait_for_events(self, timeout: float) -> None:
+        """Sleep until this process appends an event or timeout passes.
+
+        Events written by other workers (or a process executor) are only seen
+        on the caller's next poll, so keep timeout short.
+        """
+        with self._changed:
+            self._changed.wait(timeout)
+
+    def _notify(self) -> None:
+        with self._changed:
+            self._changed.notify_all()
+
+    def _forget(self, call_sid: str) -> None:
+        with self._cache_lock:
+            self._cache.pop(call_sid, None)
+
+    def _maybe_purge(self, now: float) -> None:
+        if now - self._last_purge < self.PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        self.purge(now)
+
+    def count_by_state(self) -> Dict[str, int]:
+        rows = self._connection().execute("SELECT state, COUNT(*) FROM call_results GROUP BY state").fetchall()
+        return {state: count for state, count in rows}
+
+    def purge(self, now: Optional[float] = None) -> None:
+        """Delete expired rows, trim the table to max_rows (oldest first) and drop orphaned events."""
+        now = now or time.time()
+        conn = self._connection()
+        conn.execute("DELETE FROM call_results WHERE updated_at < ?", (now - self.ttl_seconds,))
+        conn.execute(
+            "DELETE FROM call_results WHERE call_sid IN ("
+            "SELECT call_sid FROM call_results ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_rows,),
+        )
+        conn.execute(
+            "DELETE FROM call_events WHERE created_at < ? OR call_sid NOT IN (SELECT call_sid FROM call_results)",
+            (now - self.ttl_seconds,),
+        )
+
+
+def result_payload(call_sid: str, record: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], int]:
+    """Client-facing body and HTTP status for a job record (as served by /call/result)."""
+    if record is None:
+        return {"status": "pending", "call_sid": call_sid}, 404
+    job = {key: record[key] for key in ("state", "error", "created_at", "updated_at")}
+    if record["state"] == STATE_FAILED:
+        return {"status": "failed", "call_sid": call_sid, "job": job}, 500
+    if record["state"] != STATE_DONE:
+        return {"status": "pending", "call_sid": call_sid, "job": job}, 404
+    return {"status": "ready", "call_sid": call_sid, "job": job, **(record["result"] or {})}, 200
+
+
+def sse_message(event: str, data: Dict[str, Any], event_id: int = 0) -> str:
+    """One Server-Sent Events message (as served by /call/events)."""
+    head = f"id: {event_id}\n" if event_id else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+_store: Optional[ResultStore] = None
+_store_lock = threading.Lock()
+
+
+def get_result_store() -> ResultStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ResultStore.from_env()
+    return _store
+
+
+def _store_metrics() -> list:
+    if _store is None:
+        return []
+    jobs = Gauge("call_results_jobs", "Jobs in the shared result store by state (all workers).", ["state"])
+    counts = _store.count_by_state()
+    for state in (STATE_QUEUED, STATE_RUNNING, STATE_DONE, STATE_FAILED):
+        jobs.set(counts.get(state, 0), state=state)
+    cached = Gauge("call_results_cache_items", "Finished results held in this worker's LRU.")
+    cached.set(len(_store._cache))
+    return [jobs, cached]
+
+
+REGISTRY.add_collector(_store_metrics)
@@ -0,0 +1,176 @@
+"""Cold-start tooling: an import-cost report and a background warm-up.
+
+Heavy SDKs (google.genai, twilio, numpy, requests/httpx) are imported on
+first use, so a fresh worker answers /health right away. warm_up() then
+loads them, creates the pooled clients and builds the submissions index in
+the background, after the port is bound (see gunicorn.conf.py), so the
+first real call does not pay for it either.
+
+Report where import time goes:
+
+    python -m services.startup report flask_app --top 20
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from config import get_bool_env, get_env
+from services.metrics import REGISTRY, Counter, Gauge
+
+STARTUP_SECONDS = REGISTRY.register(
+    Gauge("startup_phase_seconds", "Seconds this worker spent in each startup phase (import, warm-up steps).", ["phase"])
+)
+WARMUP_FAILURES = REGISTRY.register(Counter("startup_warmup_failures_total", "Warm-up steps that raised.", ["step"]))
+
+
+@contextmanager
+def startup_phase(phase: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_SECONDS.set(time.perf_counter() - started, phase=phase)
+
+
+# Import profile
+
+
+class ImportTiming(NamedTuple):
+    module: str
+    self_seconds: float
+    cumulative_seconds: float
+    depth: int
+
+
+def profile_imports(module: str) -> List[ImportTiming]:
+    """Import module in a fresh interpreter with -X importtime and return one row per imported module."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        rows.append(ImportTiming(name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6, depth))
+    return rows
+
+
+def format_report(module: str, rows: List[ImportTiming], top: int = 20) -> str:
+    """Total import time, cost per top-level package, and the slowest modules (cumulative)."""
+    total = sum(row.self_seconds for row in rows)
+    by_package: Dict[str, float] = defaultdict(float)
+    for row in rows:
+        by_package[row.module.split(".", 1)[0]] += row.self_seconds
+    lines = [f"import {module}: {total * 1000:.0f} ms across {len(rows)} modules", "", "By package (self time):"]
+    for package, seconds in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"  {seconds * 1000:8.1f} ms  {package}")
+    lines += ["", "Slowest modules (including their imports):"]
+    for row in sorted(rows, key=lambda row: -row.cumulative_seconds)[:top]:
+        lines.append(f"  {row.cumulative_seconds * 1000:8.1f} ms  {'  ' * row.depth}{row.module}")
+    return "\n".join(lines)
+
+
+# Warm-up
+
+
+def _warm_pipeline() -> None:
+    import services.pipeline  # noqa: F401  (numpy, audio, transcription and summarization)
+
+
+def _warm_gemini() -> None:
+    from config import get_gemini_client
+
+    if get_env("GOOGLE_API_KEY"):
+        get_gemini_client()
+
+
+def _warm_twilio() -> None:
+    from services.telephony import get_twilio_client
+
+    if get_env("TWILIO_ACCOUNT_SID") and get_env("TWILIO_AUTH_TOKEN"):
+        get_twilio_client()
+    from twilio.twiml.voice_response import VoiceResponse  # noqa: F401
+
+
+def _warm_submissions() -> None:
+    from services.submissions import get_store
+
+    get_store().is_empty()
+
+
+def _warm_live() -> None:
+    if get_bool_env("LIVE_TRANSCRIPTION"):
+        import services.live  # noqa: F401
+
+
+WARMUP_STEPS: Dict[str, Callable[[], None]] = {
+    "pipeline": _warm_pipeline,
+    "gemini_client": _warm_gemini,
+    "twilio_client": _warm_twilio,
+    "submissions_index": _warm_submissions,
+    "live": _warm_live,
+}
+
+
+def warm_up() -> Dict[str, float]:
+    """Run every warm-up step and return its duration; a failing step is counted and skipped."""
+    timings = {}
+    for step, run in WARMUP_STEPS.items():
+        started = time.perf_counter()
+        try:
+            with startup_phase(f"warmup_{step}"):
+                run()
+        except Exception:
+            WARMUP_FAILURES.inc(step=step)
+        timings[step] = time.perf_counter() - started
+    return timings
+
+
+def start_warm_up(on_done: Optional[Callable[[Dict[str, float]], None]] = None) -> Optional[threading.Thread]:
+    """Warm up on a daemon thread unless WARMUP_ON_START=false; requests are served meanwhile."""
+    if not get_bool_env("WARMUP_ON_START", True):
+        return None
+
+    def _run() -> None:
+        timings = warm_up()
+        if on_done is not None:
+            on_done(timings)
+
+    thread = threading.Thread(target=_run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cold-start utilities.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    report = sub.add_parser("report", help="Show where the import time of a module goes.")
+    report.add_argument("module", nargs="?", default="flask_app", help="Module to import (default: %(default)s)")
+    report.add_argument("--top", type=int, default=20, help="Rows per section (default: %(default)s)")
+    sub.add_parser("warmup", help="Run the warm-up steps in this process and print their timings.")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        print(format_report(args.module, profile_imports(args.module), args.top))
+    elif args.command == "warmup":
+        for step, seconds in warm_up().items():
+            print(f"{seconds * 1000:8.1f} ms  {step}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,424 @@
-from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import argparse
 import csv
+import json
+import os
+import sqlite3
+import threading
+from config import get_env
 from models import ExtractedInfo
+from services.metrics import timed
 
 DATA_PATH = Path("data") / "submissions.csv"
+DB_PATH = Path("data") / "submissions.db"
 
-@lru_cache(maxsize=1)
-def _load_rows() -> list:
-    if not DATA_PATH.exists():
-        return []
+SUPPORTED_BACKENDS = ("csv", "sqlite")
+
+NGRAM_SIZE = 3
+
+
+def _digits(value: str) -> str:
+    return "".join(ch for ch in value if ch.isdigit())
+
+
+def _ngrams(text: str) -> Set[str]:
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+class SubmissionIndex:
+    """In-memory lookup structures built once per version of the CSV (the "csv" backend).
+
+    Exact lookups are dict hits on the submission number and on pre-normalized
+    mobile digits. Name "contains" queries intersect the posting lists of the
+    query's trigrams and only verify the surviving candidates.
+    """
+
+    def __init__(self, rows: List[Dict[str, str]], mtime_ns: Optional[int] = None) -> None:
+        self.rows = rows
+        self.mtime_ns = mtime_ns
+        self.by_submission: Dict[str, int] = {}
+        self.by_mobile: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.name_grams: Dict[str, List[int]] = {}
+
+        for pos, row in enumerate(rows):
+            # setdefault keeps the first occurrence, matching the old linear scans
+            submission_number = (row.get("submission_number") or "").strip()
+            if submission_number:
+                self.by_submission.setdefault(submission_number, pos)
+            mobile = _digits(row.get("mobile_number") or "")
+            if mobile:
+                self.by_mobile.setdefault(mobile, pos)
+            name = (row.get("name") or "").strip().lower()
+            self.names.append(name)
+            for gram in _ngrams(name):
+                self.name_grams.setdefault(gram, []).append(pos)
+
+    def is_empty(self) -> bool:
+        return not self.rows
+
+    def version(self) -> Optional[int]:
+        return self.mtime_ns
+
+    def match_fields(self) -> Iterator[Tuple[str, str, str]]:
+        """(lower-cased name, mobile digits, submission number) for every row, in row order."""
+        for pos, row in enumerate(self.rows):
+            yield self.names[pos], _digits(row.get("mobile_number") or ""), (row.get("submission_number") or "").strip()
+
+    def row_at(self, pos: int) -> Dict[str, str]:
+        return self.rows[pos]
+
+    def by_submission_number(self, submission_number: str) -> Optional[Dict[str, str]]:
+        pos = self.by_submission.get(submission_number.strip())
+        return self.rows[pos] if pos is not None else None
+
+    def by_mobile_digits(self, digits: str) -> Optional[Dict[str, str]]:
+        pos = self.by_mobile.get(digits)
+        return self.rows[pos] if pos is not None else None
+
+    def by_name_contains(self, name: str) -> Optional[Dict[str, str]]:
+        query = name.strip().lower()
+        if len(query) < NGRAM_SIZE:
+            # Too short to have a trigram; fall back to a scan over the names only
+            for pos, row_name in enumerate(self.names):
+                if query in row_name:
+                    return self.rows[pos]
+            return None
+
+        postings = sorted((self.name_grams.get(gram, []) for gram in _ngrams(query)), key=len)
+        if not postings or not postings[0]:
+            return None
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return None
+        for pos in sorted(candidates):
+            if query in self.names[pos]:
+                return self.rows[pos]
+        return None
+
+
+_EMPTY_INDEX = SubmissionIndex([])
+_index: SubmissionIndex = _EMPTY_INDEX
+_index_lock = threading.Lock()
+
+
+def _current_mtime() -> Optional[int]:
+    try:
+        return DATA_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _read_rows() -> List[Dict[str, str]]:
     with open(DATA_PATH, newline='', encoding='utf-8') as f:
         reader = csv.DictReader(f)
         return list(reader)
 
+
+def get_index() -> SubmissionIndex:
+    """Return the index for the current CSV, rebuilding it when the file changes.
+
+    The rebuilt index is swapped in with a single assignment, so concurrent
+    readers always see either the old or the new index, never a partial one.
+    """
+    global _index
+    mtime_ns = _current_mtime()
+    if mtime_ns is None:
+        _index = _EMPTY_INDEX
+        return _index
+    index = _index
+    if index.mtime_ns == mtime_ns:
+        return index
+    with _index_lock:
+        if _index.mtime_ns != mtime_ns:
+            _index = SubmissionIndex(_read_rows(), mtime_ns)
+        return _index
+
+
+def _load_rows() -> list:
+    return get_index().rows
+
+
+_SCHEMA = """
+CREATE TABLE submissions (
+    pos INTEGER PRIMARY KEY,
+    submission_number TEXT,
+    mobile_digits TEXT,
+    name_lower TEXT NOT NULL,
+    row_json TEXT NOT NULL
+);
+CREATE TABLE name_grams (
+    gram TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    PRIMARY KEY (gram, pos)
+) WITHOUT ROWID;
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_INDEXES = """
+CREATE INDEX idx_submission_number ON submissions (submission_number, pos);
+CREATE INDEX idx_mobile_digits ON submissions (mobile_digits, pos);
+"""
+
+
+def _iter_csv(csv_path: Path) -> Iterator[Dict[str, str]]:
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
+
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _source_stamp(csv_path: Path) -> str:
+    """Size and mtime of the CSV a database is built from; a changed stamp means a stale database."""
+    stat = Path(csv_path).stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _read_meta(db_path: Path) -> Dict[str, str]:
+    conn = sqlite3.connect(f"file:{Path(db_path).resolve()}?mode=ro", uri=True)
+    try:
+        return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+    except sqlite3.Error:
+        # Built before the meta table existed
+        return {}
+    finally:
+        conn.close()
+
+
+def convert_csv_to_sqlite(csv_path: Path = DATA_PATH, db_path: Path = DB_PATH, batch_size: int = 10000) -> int:
+    """Convert the submissions CSV into an indexed SQLite file and return the row count.
+
+    Rows are streamed from the CSV in batches, so conversion memory does not
+    depend on dataset size. The file is built next to the target and renamed
+    into place, so running workers never open a half-written database. The
+    source path and stamp are stored so workers can tell when it is stale.
+    """
+    db_path = Path(db_path)
+    stamp = _source_stamp(csv_path)
+    tmp_path = db_path.with_name(f"{db_path.name}.{os.getpid()}.tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    conn = sqlite3.connect(tmp_path)
+    count = 0
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript(_SCHEMA)
+        for batch in _batched(enumerate(_iter_csv(Path(csv_path))), batch_size):
+            records = []
+            grams = []
+            for pos, row in batch:
+                name_lower = (row.get("name") or "").strip().lower()
+                records.append(
+                    (
+                        pos,
+                        (row.get("submission_number") or "").strip() or None,
+                        _digits(row.get("mobile_number") or "") or None,
+                        name_lower,
+                        json.dumps(row, ensure_ascii=False),
+                    )
+                )
+                grams.extend((gram, pos) for gram in _ngrams(name_lower))
+            conn.executemany("INSERT INTO submissions VALUES (?, ?, ?, ?, ?)", records)
+            conn.executemany("INSERT OR IGNORE INTO name_grams VALUES (?, ?)", grams)
+            count += len(records)
+        conn.executescript(_INDEXES)
+        conn.executemany(
+            "INSERT INTO meta VALUES (?, ?)", [("source", str(Path(csv_path).resolve())), ("source_stamp", stamp)]
+        )
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, db_path)
+    return count
+
+
+class SqliteSubmissionStore:
+    """Read-only lookups against a database built by convert_csv_to_sqlite.
+
+    Nothing is materialized in Python: each lookup is an indexed query and the
+    data pages are shared between processes through the OS page cache. Each
+    thread keeps its own connection and reopens it when the file is replaced.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        mtime_ns = self.db_path.stat().st_mtime_ns
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.mtime_ns == mtime_ns:
+            return conn
+        if conn is not None:
+            conn.close()
+        conn = sqlite3.connect(f"file:{self.db_path.resolve()}?mode=ro", uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        self._local.conn = conn
+        self._local.mtime_ns = mtime_ns
+        return conn
+
+    def _fetch_row(self, sql: str, params: tuple) -> Optional[Dict[str, str]]:
+        found = self._connection().execute(sql, params).fetchone()
+        return json.loads(found[0]) if found else None
+
+    def is_empty(self) -> bool:
+        return self._connection().execute("SELECT 1 FROM submissions LIMIT 1").fetchone() is None
+
+    def version(self) -> int:
+        return self.db_path.stat().st_mtime_ns
+
+    def match_fields(self) -> Iterator[Tuple[str, str, str]]:
+        """(lower-cased name, mobile digits, submission number) for every row, in row order."""
+        cursor = self._connection().execute(
+            "SELECT name_lower, mobile_digits, submission_number FROM submissions ORDER BY pos"
+        )
+        for name_lower, mobile_digits, submission_number in cursor:
+            yield name_lower, mobile_digits or "", submission_number or ""
+
+    def row_at(self, pos: int) -> Dict[str, str]:
+        return self._fetch_row("SELECT row_json FROM submissions WHERE pos = ?", (pos,))
+
+    def by_submission_number(self, submission_number: str) -> Optional[Dict[str, str]]:
+        return self._fetch_row(
+            "SELECT row_json FROM submissions WHERE submission_number = ? ORDER BY pos LIMIT 1",
+            (submission_number.strip(),),
+        )
+
+    def by_mobile_digits(self, digits: str) -> Optional[Dict[str, str]]:
+        return self._fetch_row(
+            "SELECT row_json FROM submissions WHERE mobile_digits = ? ORDER BY pos LIMIT 1",
+            (digits,),
+        )
+
+    def by_name_contains(self, name: str) -> Optional[Dict[str, str]]:
+        query = name.strip().lower()
+        grams = sorted(_ngrams(query))
+        if not grams:
+            return self._fetch_row(
+                "SELECT row_json FROM submissions WHERE instr(name_lower, ?) > 0 ORDER BY pos LIMIT 1",
+                (query,),
+            )
+        candidates = " INTERSECT ".join("SELECT pos FROM name_grams WHERE gram = ?" for _ in grams)
+        return self._fetch_row(
+            f"SELECT row_json FROM submissions WHERE pos IN ({candidates}) "
+            "AND instr(name_lower, ?) > 0 ORDER BY pos LIMIT 1",
+            (*grams, query),
+        )
+
+
+_sqlite_store: Optional[SqliteSubmissionStore] = None
+_sqlite_lock = threading.Lock()
+# (database mtime, CSV stamp) last found to be in sync, so the meta table is read once per change
+_sqlite_checked: Optional[Tuple[int, str]] = None
+
+
+def get_backend() -> str:
+    backend = (get_env("SUBMISSIONS_BACKEND", "csv") or "csv").strip().lower()
+    if backend not in SUPPORTED_BACKENDS:
+        raise RuntimeError(f"Unsupported SUBMISSIONS_BACKEND '{backend}'. Use one of {SUPPORTED_BACKENDS}.")
+    return backend
+
+
+def _sqlite_is_stale(db_path: Path) -> bool:
+    """True when db_path is missing, or was built from DATA_PATH and the CSV has changed since."""
+    global _sqlite_checked
+    if not db_path.exists():
+        return True
+    checked = (db_path.stat().st_mtime_ns, _source_stamp(DATA_PATH))
+    if checked == _sqlite_checked:
+        return False
+    meta = _read_meta(db_path)
+    # Databases converted from another CSV (convert --csv) are left alone
+    if meta.get("source", str(DATA_PATH.resolve())) == str(DATA_PATH.resolve()) and meta.get("source_stamp") != checked[1]:
+        return True
+    _sqlite_checked = checked
+    return False
+
+
+def _get_sqlite_store() -> Optional[SqliteSubmissionStore]:
+    global _sqlite_store
+    db_path = Path(get_env("SUBMISSIONS_DB_PATH") or DB_PATH)
+    with _sqlite_lock:
+        if DATA_PATH.exists():
+            if _sqlite_is_stale(db_path):
+                # Missing, or older than the CSV; the atomic rename makes racing workers harmless
+                # and open connections switch over on their next query
+                convert_csv_to_sqlite(DATA_PATH, db_path)
+        elif not db_path.exists():
+            return None
+        if _sqlite_store is None or _sqlite_store.db_path != db_path:
+            _sqlite_store = SqliteSubmissionStore(db_path)
+        return _sqlite_store
+
+
+def get_store():
+    """Return the lookup backend selected by SUBMISSIONS_BACKEND ("csv" or "sqlite")."""
+    if get_backend() == "sqlite":
+        return _get_sqlite_store() or _EMPTY_INDEX
+    return get_index()
+
+
 def find_submission(info: ExtractedInfo) -> Optional[Dict[str, str]]:
-    rows = _load_rows()
-    if not rows:
+    with timed("lookup"):
+        return _find_submission(info)
+
+
+def _find_submission(info: ExtractedInfo) -> Optional[Dict[str, str]]:
+    store = get_store()
+    if store.is_empty():
         return None
 
     # Try exact match by submission number
     if info.submission_number:
-        for row in rows:
-            if row.get("submission_number", "").strip() == info.submission_number.strip():
-                return row
+        row = store.by_submission_number(info.submission_number)
+        if row is not None:
+            return row
 
     # Try exact match by normalized mobile number
     mobile = info.normalized_mobile()
     if mobile:
-        for row in rows:
-            row_mobile = row.get("mobile_number", "")
-            row_mobile_digits = ''.join(ch for ch in row_mobile if ch.isdigit())
-            if row_mobile_digits == mobile:
-                return row
+        row = store.by_mobile_digits(mobile)
+        if row is not None:
+            return row
 
     # Optionally, try case-insensitive name contains match if provided and others failed
     if info.name:
-        name_lower = info.name.strip().lower()
-        for row in rows:
-            if name_lower in row.get("name", "").strip().lower():
-                return row
+        return store.by_name_contains(info.name)
 
     return None
 
 
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Submissions store utilities.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="Build the indexed SQLite store from the submissions CSV.")
+    convert.add_argument("--csv", default=str(DATA_PATH), help="Source CSV (default: %(default)s)")
+    convert.add_argument("--db", default=str(DB_PATH), help="Target SQLite file (default: %(default)s)")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        count = convert_csv_to_sqlite(Path(args.csv), Path(args.db))
+        print(f"Wrote {count} submissions to {args.db}")
+
+
+if __name__ == "__main__":
+    main()
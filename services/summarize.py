@@ -1,24 +1,166 @@
-from typing import Optional
-from config import (
-    get_default_models,
-    configure_gemini_client,
-    get_provider,
+import asyncio
+import contextvars
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Iterator, List, Optional, Tuple
+from pydantic import BaseModel, ConfigDict, ValidationError
+from config import genai_types, get_bool_env, get_default_models, get_env, get_provider
+from models import CallAnalysis, CallSummary, ExtractedInfo
+from services.cache import amemoize, cache_key, get_cache, memoize
+from services.fast_extract import FASTPATH_EXTRACTIONS, extract_known_fields
+from services.gemini import get_gemini_model
+from services.metrics import record_bytes, timed
+
+# Bump when a prompt changes so cached results from the old prompt are not reused
+SUMMARY_PROMPT_VERSION = "2"
+CHUNK_NOTES_PROMPT_VERSION = "1"
+EXTRACT_PROMPT_VERSION = "1"
+ANALYZE_PROMPT_VERSION = "1"
+
+SUMMARY_PROMPT = (
+    "Summarize this insurance support call. "
+    "Return a short, structured summary with: Purpose, Key details (bullets), "
+    "Customer sentiment, Next steps. Avoid hallucinating."
+)
+
+CHUNK_NOTES_PROMPT = (
+    "This is part {index} of {count} of an insurance support call transcript. "
+    "Write brief notes on it: the caller's purpose, key details (names, numbers, policy or submission IDs, "
+    "amounts, dates), the caller's sentiment and any agreed next steps. Avoid hallucinating."
+)
+
+EXTRACT_PROMPT = (
+    "Extract caller details from the transcript. "
+    "Return JSON with keys exactly: name, mobile_number, submission_number. "
+    "Use null when unknown. Do not invent details."
 )
-from models import ExtractedInfo
-import google.genai as genai
+
+ANALYZE_PROMPT = (
+    "Analyze this insurance support call and return JSON matching the schema. "
+    "summary: Purpose, Key details (short bullets), Customer sentiment, Next steps. "
+    "caller: name, mobile_number, submission_number as stated by the caller; use null when unknown. "
+    "Avoid hallucinating and do not invent details."
+)
+
+REDUCE_PROMPT = (
+    "These are notes on consecutive parts of one insurance support call. "
+    "Merge them into a short, structured summary of the whole call with: Purpose, Key details (bullets), "
+    "Customer sentiment, Next steps. Avoid hallucinating."
+)
+
+# Rough size of a Gemini token in characters; good enough to decide when to split
+CHARS_PER_TOKEN = 4
+
+# A new turn starts at a line break or at a "Speaker:" label following the end of a sentence
+_TURN_SPLIT_RE = re.compile(r"\n+|(?<=[.!?])\s+(?=[A-Z][A-Za-z]{1,20}(?: \d{1,2})?:\s)")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def split_turns(transcript_text: str, max_tokens: int) -> List[str]:
+    """Split a transcript into chunks of whole speaker turns of at most about max_tokens each.
+
+    A single turn longer than max_tokens is split at sentence ends instead.
+    """
+    pieces: List[str] = []
+    for turn in _TURN_SPLIT_RE.split(transcript_text):
+        turn = turn.strip()
+        if not turn:
+            continue
+        if estimate_tokens(turn) > max_tokens:
+            pieces.extend(sentence for sentence in _SENTENCE_SPLIT_RE.split(turn) if sentence)
+        else:
+            pieces.append(turn)
+
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for piece in pieces:
+        piece_tokens = estimate_tokens(piece)
+        if current and size + piece_tokens > max_tokens:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += piece_tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _map_reduce_settings() -> Tuple[int, int, int]:
+    threshold = int(get_env("SUMMARY_MAP_REDUCE_TOKENS", "12000"))
+    chunk_tokens = int(get_env("SUMMARY_CHUNK_TOKENS", "4000"))
+    concurrency = int(get_env("SUMMARY_MAP_CONCURRENCY", "4"))
+    return threshold, chunk_tokens, concurrency
+
+
+def _summary_key(model: str, transcript_text: str) -> str:
+    """Cache key of a summary; the map-reduce settings decide which prompt a transcript gets."""
+    threshold, chunk_tokens, _ = _map_reduce_settings()
+    return cache_key(SUMMARY_PROMPT_VERSION, model, f"map_reduce={threshold}|chunk={chunk_tokens}", transcript_text)
+
+
+def _chunk_notes(chunk: str, index: int, count: int, model: str, api_key: Optional[str]) -> str:
+    gemini_model = get_gemini_model(model, api_key)
+    response = gemini_model.generate_content([
+        CHUNK_NOTES_PROMPT.format(index=index, count=count),
+        f"Transcript part:\n\n{chunk}"
+    ], config=genai_types().GenerateContentConfig(temperature=0.2))
+    record_bytes("summarize", "out", len(chunk.encode("utf-8")))
+    record_bytes("summarize", "in", len((response.text or "").encode("utf-8")))
+    return (response.text or "").strip()
+
+
+def _map_notes(text: str, model: str, api_key: Optional[str], chunk_tokens: int, concurrency: int) -> str:
+    chunks = split_turns(text, chunk_tokens)
+
+    def _notes(position: int) -> str:
+        chunk = chunks[position]
+        key = cache_key(CHUNK_NOTES_PROMPT_VERSION, model, str(position + 1), str(len(chunks)), chunk)
+        return memoize(
+            "summarize_chunk",
+            key,
+            lambda: _chunk_notes(chunk, position + 1, len(chunks), model, api_key),
+        )
+
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(chunks)))) as pool:
+        futures = [pool.submit(context.copy().run, _notes, position) for position in range(len(chunks))]
+        notes = [future.result() for future in futures]
+    return "\n\n".join(f"Part {i + 1}:\n{note}" for i, note in enumerate(notes))
+
+
+def _summary_contents(transcript_text: str, model: str, api_key: Optional[str]) -> List[Any]:
+    """Prompt for the (final) summary call, running the map step first for long transcripts.
+
+    Transcripts above SUMMARY_MAP_REDUCE_TOKENS are split into speaker-turn
+    chunks of about SUMMARY_CHUNK_TOKENS that are summarized concurrently; the
+    notes are mapped again while they are still too long, and the final call
+    merges them into the usual summary structure.
+    """
+    threshold, chunk_tokens, concurrency = _map_reduce_settings()
+    if estimate_tokens(transcript_text) <= threshold:
+        return [SUMMARY_PROMPT, f"Transcript:\n\n{transcript_text}"]
+    notes = transcript_text
+    while estimate_tokens(notes) > threshold:
+        shorter = _map_notes(notes, model, api_key, chunk_tokens, concurrency)
+        if len(shorter) >= len(notes):
+            break
+        notes = shorter
+    return [REDUCE_PROMPT, f"Notes:\n\n{notes}"]
+
 
 def _summarize_gemini(transcript_text: str, model: str, api_key: Optional[str]) -> str:
-    configure_gemini_client(api_key)
-    gemini_model = genai.GenerativeModel(model)
-    prompt = (
-        "Summarize this insurance support call. "
-        "Return a short, structured summary with: Purpose, Key details (bullets), "
-        "Customer sentiment, Next steps. Avoid hallucinating."
+    gemini_model = get_gemini_model(model, api_key)
+    response = gemini_model.generate_content(
+        _summary_contents(transcript_text, model, api_key),
+        config=genai_types().GenerateContentConfig(temperature=0.2),
     )
-    response = gemini_model.generate_content([
-        prompt,
-        f"Transcript:\n\n{transcript_text}"
-    ], generation_config=genai.types.GenerationConfig(temperature=0.2))
+    record_bytes("summarize", "out", len(transcript_text.encode("utf-8")))
+    record_bytes("summarize", "in", len((response.text or "").encode("utf-8")))
     return (response.text or "").strip()
 
 def summarize_transcript(
@@ -28,6 +170,7 @@ def summarize_transcript(
     api_key: Optional[str] = None,
     provider: Optional[str] = None,
 ) -> str:
+    """Summarize a transcript; long ones are summarized map-reduce style (see _summary_contents)."""
     if not transcript_text.strip():
         return ""
     provider = provider or get_provider()
@@ -35,21 +178,64 @@ def summarize_transcript(
     chat_model = model or models["chat_model"]
     if provider != "gemini":
         raise RuntimeError("Only Gemini provider is supported in this deployment.")
-    return _summarize_gemini(transcript_text, chat_model, api_key)
+    key = _summary_key(chat_model, transcript_text)
+    with timed("summarize"):
+        return memoize("summarize", key, lambda: _summarize_gemini(transcript_text, chat_model, api_key))
+
+def stream_summary(
+    transcript_text: str,
+    *,
+    model: Optional[str] = None,
+    api_key: Optional[str] = None,
+    provider: Optional[str] = None,
+) -> Iterator[str]:
+    """Streaming variant of summarize_transcript that yields text pieces as they arrive.
+
+    Uses the same prompt and cache entry as summarize_transcript: a cached
+    summary is yielded in one piece, and a completed stream is cached so later
+    calls of either function reuse it. The joined pieces may carry surrounding
+    whitespace that summarize_transcript would strip. For long transcripts
+    only the final merge step streams.
+    """
+    if not transcript_text.strip():
+        return
+    provider = provider or get_provider()
+    models = get_default_models(provider)
+    chat_model = model or models["chat_model"]
+    if provider != "gemini":
+        raise RuntimeError("Only Gemini provider is supported in this deployment.")
+    key = _summary_key(chat_model, transcript_text)
+    cache = get_cache()
+    cached = cache.get("summarize", key) if cache is not None else None
+    if cached is not None:
+        yield cached
+        return
+
+    gemini_model = get_gemini_model(chat_model, api_key)
+    pieces = []
+    with timed("summarize"):
+        record_bytes("summarize", "out", len(transcript_text.encode("utf-8")))
+        for chunk in gemini_model.generate_content_stream(
+            _summary_contents(transcript_text, chat_model, api_key),
+            config=genai_types().GenerateContentConfig(temperature=0.2),
+        ):
+            text = chunk.text or ""
+            if text:
+                pieces.append(text)
+                record_bytes("summarize", "in", len(text.encode("utf-8")))
+                yield text
+    if cache is not None:
+        cache.set("summarize", key, "".join(pieces).strip())
 
 def _extract_gemini(transcript_text: str, model: str, api_key: Optional[str]) -> ExtractedInfo:
-    configure_gemini_client(api_key)
-    gemini_model = genai.GenerativeModel(model)
-    prompt = (
-        "Extract caller details from the transcript. "
-        "Return JSON with keys exactly: name, mobile_number, submission_number. "
-        "Use null when unknown. Do not invent details."
-    )
+    gemini_model = get_gemini_model(model, api_key)
     response = gemini_model.generate_content([
-        prompt,
+        EXTRACT_PROMPT,
         f"Transcript:\n\n{transcript_text}"
-    ], generation_config=genai.types.GenerationConfig(temperature=0))
+    ], config=genai_types().GenerateContentConfig(temperature=0))
     content = response.text or ""
+    record_bytes("extract", "out", len(transcript_text.encode("utf-8")))
+    record_bytes("extract", "in", len(content.encode("utf-8")))
     return ExtractedInfo.model_validate_json(content)
 
 def extract_caller_info(
@@ -59,6 +245,278 @@ def extract_caller_info(
     api_key: Optional[str] = None,
     provider: Optional[str] = None,
 ) -> ExtractedInfo:
+    """Extract caller details, answering from transcript patterns when they can be verified.
+
+    A submission number or mobile number heard in the call that exists in the
+    submissions store is returned at once, with the name registered on that
+    submission (EXTRACT_FASTPATH, on by default); only otherwise is the model
+    asked.
+    """
+    if not transcript_text.strip():
+        return ExtractedInfo()
+    provider = provider or get_provider()
+    models = get_default_models(provider)
+    chat_model = model or models["chat_model"]
+    if provider != "gemini":
+        raise RuntimeError("Only Gemini provider is supported in this deployment.")
+    if get_bool_env("EXTRACT_FASTPATH", True):
+        with timed("extract_fastpath"):
+            known, _ = extract_known_fields(transcript_text)
+        if known.submission_number or known.mobile_number:
+            FASTPATH_EXTRACTIONS.inc(outcome="hit")
+            return known
+        FASTPATH_EXTRACTIONS.inc(outcome="miss")
+    key = cache_key(EXTRACT_PROMPT_VERSION, chat_model, transcript_text)
+    try:
+        with timed("extract"):
+            return memoize(
+                "extract",
+                key,
+                lambda: _extract_gemini(transcript_text, chat_model, api_key),
+                dump=lambda info: info.model_dump(),
+                load=lambda data: ExtractedInfo(**data),
+            )
+    except (ValidationError, ValueError):
+        # Unparseable model output means "nothing found"; API errors propagate to the caller
+        return ExtractedInfo()
+
+
+_NULLABLE_STRING = {"type": "string", "nullable": True}
+
+ANALYSIS_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {
+            "type": "object",
+            "properties": {
+                "purpose": {"type": "string"},
+                "key_details": {"type": "array", "items": {"type": "string"}},
+                "customer_sentiment": {"type": "string"},
+                "next_steps": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": ["purpose", "key_details", "customer_sentiment", "next_steps"],
+        },
+        "caller": {
+            "type": "object",
+            "properties": {
+                "name": _NULLABLE_STRING,
+                "mobile_number": _NULLABLE_STRING,
+                "submission_number": _NULLABLE_STRING,
+            },
+            "required": ["name", "mobile_number", "submission_number"],
+        },
+    },
+    "required": ["summary", "caller"],
+}
+
+
+class _AnalysisPayload(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    summary: CallSummary
+    caller: ExtractedInfo
+
+
+def _analysis_config():
+    return genai_types().GenerateContentConfig(
+        temperature=0,
+        response_mime_type="application/json",
+        response_schema=ANALYSIS_RESPONSE_SCHEMA,
+    )
+
+
+def _analyze_gemini(transcript_text: str, model: str, api_key: Optional[str]) -> CallAnalysis:
+    gemini_model = get_gemini_model(model, api_key)
+    response = gemini_model.generate_content([
+        ANALYZE_PROMPT,
+        f"Transcript:\n\n{transcript_text}"
+    ], config=_analysis_config())
+    return _parse_analysis(transcript_text, response)
+
+
+def _parse_analysis(transcript_text: str, response: Any) -> CallAnalysis:
+    record_bytes("analyze", "out", len(transcript_text.encode("utf-8")))
+    record_bytes("analyze", "in", len((response.text or "").encode("utf-8")))
+    payload = _AnalysisPayload.model_validate_json(response.text or "", strict=True)
+    return CallAnalysis(
+        summary=payload.summary.to_text(),
+        extracted=payload.caller,
+        structured_summary=payload.summary,
+    )
+
+
+def analyze_transcript(
+    transcript_text: str,
+    *,
+    model: Optional[str] = None,
+    api_key: Optional[str] = None,
+    provider: Optional[str] = None,
+) -> CallAnalysis:
+    """Summarize and extract caller details with a single schema-constrained model call.
+
+    Falls back to summarize_transcript + extract_caller_info only when the
+    response does not validate against the expected structure.
+    """
+    if not transcript_text.strip():
+        return CallAnalysis(summary="")
+    provider = provider or get_provider()
+    models = get_default_models(provider)
+    chat_model = model or models["chat_model"]
+    if provider != "gemini":
+        raise RuntimeError("Only Gemini provider is supported in this deployment.")
+    key = cache_key(ANALYZE_PROMPT_VERSION, chat_model, transcript_text)
+    try:
+        with timed("analyze"):
+            return memoize(
+                "analyze",
+                key,
+                lambda: _analyze_gemini(transcript_text, chat_model, api_key),
+                dump=lambda analysis: analysis.model_dump(),
+                load=CallAnalysis.model_validate,
+            )
+    except (ValidationError, ValueError):
+        summary = summarize_transcript(transcript_text, model=chat_model, api_key=api_key, provider=provider)
+        extracted = extract_caller_info(transcript_text, model=chat_model, api_key=api_key, provider=provider)
+        return CallAnalysis(summary=summary, extracted=extracted)
+
+
+# Async variants for the ASGI backend. They share prompts, cache entries and
+# the gateway budgets with the sync functions above; the sync API stays the
+# one used by the Streamlit app, batch and the Flask backend.
+
+
+async def _achunk_notes(chunk: str, index: int, count: int, model: str, api_key: Optional[str]) -> str:
+    gemini_model = get_gemini_model(model, api_key)
+    response = await gemini_model.agenerate_content([
+        CHUNK_NOTES_PROMPT.format(index=index, count=count),
+        f"Transcript part:\n\n{chunk}"
+    ], config=genai_types().GenerateContentConfig(temperature=0.2))
+    record_bytes("summarize", "out", len(chunk.encode("utf-8")))
+    record_bytes("summarize", "in", len((response.text or "").encode("utf-8")))
+    return (response.text or "").strip()
+
+
+async def _amap_notes(text: str, model: str, api_key: Optional[str], chunk_tokens: int, concurrency: int) -> str:
+    chunks = split_turns(text, chunk_tokens)
+    limit = asyncio.Semaphore(max(1, concurrency))
+
+    async def _notes(position: int) -> str:
+        chunk = chunks[position]
+        key = cache_key(CHUNK_NOTES_PROMPT_VERSION, model, str(position + 1), str(len(chunks)), chunk)
+        async with limit:
+            return await amemoize(
+                "summarize_chunk",
+                key,
+                lambda: _achunk_notes(chunk, position + 1, len(chunks), model, api_key),
+            )
+
+    notes = await asyncio.gather(*(_notes(position) for position in range(len(chunks))))
+    return "\n\n".join(f"Part {i + 1}:\n{note}" for i, note in enumerate(notes))
+
+
+async def _asummary_contents(transcript_text: str, model: str, api_key: Optional[str]) -> List[Any]:
+    threshold, chunk_tokens, concurrency = _map_reduce_settings()
+    if estimate_tokens(transcript_text) <= threshold:
+        return [SUMMARY_PROMPT, f"Transcript:\n\n{transcript_text}"]
+    notes = transcript_text
+    while estimate_tokens(notes) > threshold:
+        shorter = await _amap_notes(notes, model, api_key, chunk_tokens, concurrency)
+        if len(shorter) >= len(notes):
+            break
+        notes = shorter
+    return [REDUCE_PROMPT, f"Notes:\n\n{notes}"]
+
+
+async def _asummarize_gemini(transcript_text: str, model: str, api_key: Optional[str]) -> str:
+    gemini_model = get_gemini_model(model, api_key)
+    response = await gemini_model.agenerate_content(
+        await _asummary_contents(transcript_text, model, api_key),
+        config=genai_types().GenerateContentConfig(temperature=0.2),
+    )
+    record_bytes("summarize", "out", len(transcript_text.encode("utf-8")))
+    record_bytes("summarize", "in", len((response.text or "").encode("utf-8")))
+    return (response.text or "").strip()
+
+
+async def asummarize_transcript(
+    transcript_text: str,
+    *,
+    model: Optional[str] = None,
+    api_key: Optional[str] = None,
+    provider: Optional[str] = None,
+) -> str:
+    """Async summarize_transcript; map-step chunks run concurrently up to SUMMARY_MAP_CONCURRENCY."""
+    if not transcript_text.strip():
+        return ""
+    provider = provider or get_provider()
+    models = get_default_models(provider)
+    chat_model = model or models["chat_model"]
+    if provider != "gemini":
+        raise RuntimeError("Only Gemini provider is supported in this deployment.")
+    key = _summary_key(chat_model, transcript_text)
+    with timed("summarize"):
+        return await amemoize("summarize", key, lambda: _asummarize_gemini(transcript_text, chat_model, api_key))
+
+
+async def astream_summary(
+    transcript_text: str,
+    *,
+    model: Optional[str] = None,
+    api_key: Optional[str] = None,
+    provider: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """Async stream_summary: yields text pieces as they arrive, sharing its cache entry."""
+    if not transcript_text.strip():
+        return
+    provider = provider or get_provider()
+    models = get_default_models(provider)
+    chat_model = model or models["chat_model"]
+    if provider != "gemini":
+        raise RuntimeError("Only Gemini provider is supported in this deployment.")
+    key = _summary_key(chat_model, transcript_text)
+    cache = get_cache()
+    cached = await asyncio.to_thread(cache.get, "summarize", key) if cache is not None else None
+    if cached is not None:
+        yield cached
+        return
+
+    gemini_model = get_gemini_model(chat_model, api_key)
+    pieces = []
+    with timed("summarize"):
+        record_bytes("summarize", "out", len(transcript_text.encode("utf-8")))
+        async for chunk in gemini_model.agenerate_content_stream(
+            await _asummary_contents(transcript_text, chat_model, api_key),
+            config=genai_types().GenerateContentConfig(temperature=0.2),
+        ):
+            text = chunk.text or ""
+            if text:
+                pieces.append(text)
+                record_bytes("summarize", "in", len(text.encode("utf-8")))
+                yield text
+    if cache is not None:
+        await asyncio.to_thread(cache.set, "summarize", key, "".join(pieces).strip())
+
+
+async def _aextract_gemini(transcript_text: str, model: str, api_key: Optional[str]) -> ExtractedInfo:
+    gemini_model = get_gemini_model(model, api_key)
+    response = await gemini_model.agenerate_content([
+        EXTRACT_PROMPT,
+        f"Transcript:\n\n{transcript_text}"
+    ], config=genai_types().GenerateContentConfig(temperature=0))
+    content = response.text or ""
+    record_bytes("extract", "out", len(transcript_text.encode("utf-8")))
+    record_bytes("extract", "in", len(content.encode("utf-8")))
+    return ExtractedInfo.model_validate_json(content)
+
+
+async def aextract_caller_info(
+    transcript_text: str,
+    *,
+    model: Optional[str] = None,
+    api_key: Optional[str] = None,
+    provider: Optional[str] = None,
+) -> ExtractedInfo:
+    """Async extract_caller_info, with the same verified fast path (its store lookups run in a thread)."""
     if not transcript_text.strip():
         return ExtractedInfo()
     provider = provider or get_provider()
@@ -66,9 +524,64 @@ def extract_caller_info(
     chat_model = model or models["chat_model"]
     if provider != "gemini":
         raise RuntimeError("Only Gemini provider is supported in this deployment.")
+    if get_bool_env("EXTRACT_FASTPATH", True):
+        with timed("extract_fastpath"):
+            known, _ = await asyncio.to_thread(extract_known_fields, transcript_text)
+        if known.submission_number or known.mobile_number:
+            FASTPATH_EXTRACTIONS.inc(outcome="hit")
+            return known
+        FASTPATH_EXTRACTIONS.inc(outcome="miss")
+    key = cache_key(EXTRACT_PROMPT_VERSION, chat_model, transcript_text)
     try:
-        return _extract_gemini(transcript_text, chat_model, api_key)
-    except Exception:
+        with timed("extract"):
+            return await amemoize(
+                "extract",
+                key,
+                lambda: _aextract_gemini(transcript_text, chat_model, api_key),
+                dump=lambda info: info.model_dump(),
+                load=lambda data: ExtractedInfo(**data),
+            )
+    except (ValidationError, ValueError):
         return ExtractedInfo()
 
 
+async def _aanalyze_gemini(transcript_text: str, model: str, api_key: Optional[str]) -> CallAnalysis:
+    gemini_model = get_gemini_model(model, api_key)
+    response = await gemini_model.agenerate_content([
+        ANALYZE_PROMPT,
+        f"Transcript:\n\n{transcript_text}"
+    ], config=_analysis_config())
+    return _parse_analysis(transcript_text, response)
+
+
+async def aanalyze_transcript(
+    transcript_text: str,
+    *,
+    model: Optional[str] = None,
+    api_key: Optional[str] = None,
+    provider: Optional[str] = None,
+) -> CallAnalysis:
+    """Async analyze_transcript, falling back to the separate calls the same way."""
+    if not transcript_text.strip():
+        return CallAnalysis(summary="")
+    provider = provider or get_provider()
+    models = get_default_models(provider)
+    chat_model = model or models["chat_model"]
+    if provider != "gemini":
+        raise RuntimeError("Only Gemini provider is supported in this deployment.")
+    key = cache_key(ANALYZE_PROMPT_VERSION, chat_model, transcript_text)
+    try:
+        with timed("analyze"):
+            return await amemoize(
+                "analyze",
+                key,
+                lambda: _aanalyze_gemini(transcript_text, chat_model, api_key),
+                dump=lambda analysis: analysis.model_dump(),
+                load=CallAnalysis.model_validate,
+            )
+    except (ValidationError, ValueError):
+        summary, extracted = await asyncio.gather(
+            asummarize_transcript(transcript_text, model=chat_model, api_key=api_key, provider=provider),
+            aextract_caller_info(transcript_text, model=chat_model, api_key=api_key, provider=provider),
+        )
+        return CallAnalysis(summary=summary, extracted=extracted)
@@ -0,0 +1,56 @@
+from typing import TYPE_CHECKING, Optional
+
+from config import get_bool_env, get_env, get_provider
+
+if TYPE_CHECKING:
+    from twilio.rest import Client
+
+# The Twilio SDK is imported where it is used: twilio.rest alone costs a noticeable
+# share of a cold start, and most requests (health checks, result polling) never need it.
+
+
+def get_twilio_client() -> "Client":
+    from twilio.rest import Client
+
+    account_sid = get_env("TWILIO_ACCOUNT_SID")
+    auth_token = get_env("TWILIO_AUTH_TOKEN")
+    if not account_sid or not auth_token:
+        raise RuntimeError("TWILIO_ACCOUNT_SID or TWILIO_AUTH_TOKEN not set")
+    return Client(account_sid, auth_token)
+
+
+def voice_twiml() -> str:
+    """TwiML for inbound/outbound calls.
+
+    For simplicity, this plays a short message and records the call.
+    After hangup, Twilio will POST to /twilio/recording with the recording URL.
+    With LIVE_TRANSCRIPTION enabled the caller's audio is also streamed to
+    /twilio/media and transcribed during the call; the recording then only
+    serves as a fallback.
+    """
+    from twilio.twiml.voice_response import Start, VoiceResponse
+
+    public_base_url = get_env("PUBLIC_BASE_URL") or ""
+    recording_callback = f"{public_base_url}/twilio/recording" if public_base_url else ""
+
+    vr = VoiceResponse()
+    if public_base_url and get_bool_env("LIVE_TRANSCRIPTION"):
+        stream_url = "wss://" + public_base_url.split("://", 1)[-1].rstrip("/") + "/twilio/media"
+        start = Start()
+        start.stream(url=stream_url, track="inbound_track")
+        vr.append(start)
+    vr.say("Thank you for calling. This call will be recorded for quality and training purposes.")
+    vr.record(
+        max_length="600",
+        play_beep=True,
+        recording_status_callback=recording_callback or None,
+        recording_status_callback_method="POST",
+    )
+    vr.say("Goodbye.")
+    return str(vr)
+
+
+def pipeline_api_key() -> Optional[str]:
+    """API key of the configured provider, for jobs started by Twilio callbacks."""
+    api_key_env = "OPENAI_API_KEY" if get_provider() == "openai" else "GOOGLE_API_KEY"
+    return get_env(api_key_env)
@@ -1,37 +1,425 @@
-from typing import Optional, BinaryIO
-from config import (
-    get_default_models,
-    configure_gemini_client,
-    get_provider,
+import asyncio
+import contextvars
+import io
+import math
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, BinaryIO, Tuple, Union
+from config import genai_types, get_bool_env, get_default_models, get_env, get_provider
+from services.audio import (
+    TRIM_VERSION,
+    PcmAudio,
+    PreparedAudio,
+    encode_wav,
+    open_wav,
+    preprocess_audio,
+    read_header,
+    sniff_mime_type,
+    source_size,
+    split_on_silence,
 )
-import google.genai as genai
+from services.cache import amemoize, cache_key, hash_audio, memoize
+from services.gemini import GeminiModel, get_gemini_model
+from services.metrics import record_bytes, timed
 
-def _transcribe_gemini(file_obj: BinaryIO, model: str, api_key: Optional[str]) -> str:
-    configure_gemini_client(api_key)
+# A path on disk, an in-memory buffer, or an open binary file (e.g. Streamlit's UploadedFile)
+AudioSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+# Bump when the transcription prompt changes so cached transcripts are not reused
+TRANSCRIBE_PROMPT_VERSION = "1"
+TRANSCRIBE_PROMPT = "Transcribe this insurance support call. Return only the transcript text without timestamps."
+
+DEFAULT_INLINE_AUDIO_MAX_BYTES = 4 * 1024 * 1024
+SPOOL_CHUNK_SIZE = 64 * 1024
+
+# Speech rarely runs faster than this, so n seconds of overlap hold at most about n * this many words
+STITCH_WORDS_PER_SECOND = 4.0
+# Shorter repeats across a boundary are kept: they are more likely real speech than overlap
+STITCH_MIN_OVERLAP_WORDS = 4
+# How far into the next part the repeated run may start (a word cut in half at the boundary)
+STITCH_ANCHOR_WORDS = 2
+# Changes how chunk transcripts are joined; part of the transcript cache key
+STITCH_VERSION = "2"
+
+
+def _inline_max_bytes() -> int:
+    return int(get_env("GEMINI_INLINE_AUDIO_MAX_BYTES", str(DEFAULT_INLINE_AUDIO_MAX_BYTES)))
+
+
+def _spool_to_temp(file_obj: BinaryIO) -> Path:
+    with tempfile.NamedTemporaryFile(suffix=".audio", delete=False) as tmp:
+        shutil.copyfileobj(file_obj, tmp, SPOOL_CHUNK_SIZE)
+        return Path(tmp.name)
+
+
+def _stream_size(file_obj: BinaryIO) -> int:
+    file_obj.seek(0, os.SEEK_END)
+    size = file_obj.tell()
     file_obj.seek(0)
-    data = file_obj.read()
-    # google.genai expects a file-like object or bytes for audio
-    gemini_model = genai.GenerativeModel(model)
-    response = gemini_model.generate_content([
-        genai.types.Content(
-            parts=[genai.types.Blob(mime_type="audio/wav", data=data)]
-        ),
-        "Transcribe this insurance support call. Return only the transcript text without timestamps."
-    ], generation_config=genai.types.GenerationConfig(temperature=0))
+    return size
+
+
+def _generate_transcript(audio_part, gemini_model: GeminiModel) -> str:
+    response = gemini_model.generate_content(
+        [audio_part, TRANSCRIBE_PROMPT], config=genai_types().GenerateContentConfig(temperature=0)
+    )
     return (response.text or "").strip()
 
+
+def _inline_part(data: bytes, mime_type: str):
+    # google.genai expects a file-like object or bytes for audio
+    record_bytes("transcribe", "out", len(data))
+    return genai_types().Part.from_bytes(data=data, mime_type=mime_type)
+
+
+def _transcribe_path(path: Path, gemini_model: GeminiModel, mime_type: str) -> str:
+    if path.stat().st_size <= _inline_max_bytes():
+        return _generate_transcript(_inline_part(path.read_bytes(), mime_type), gemini_model)
+    # Large recordings are streamed from disk by the upload call instead of being held in memory
+    record_bytes("transcribe", "out", path.stat().st_size)
+    uploaded = gemini_model.upload_file(str(path), mime_type)
+    try:
+        return _generate_transcript(uploaded, gemini_model)
+    finally:
+        try:
+            gemini_model.delete_file(uploaded.name)
+        except Exception:
+            pass
+
+
+def _transcribe_gemini(source: AudioSource, model: str, api_key: Optional[str], mime_type: str = "audio/wav") -> str:
+    gemini_model = get_gemini_model(model, api_key)
+
+    if isinstance(source, (str, os.PathLike)):
+        return _transcribe_path(Path(source), gemini_model, mime_type)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        if len(source) > _inline_max_bytes():
+            spooled = _spool_to_temp(io.BytesIO(source))
+            try:
+                return _transcribe_path(spooled, gemini_model, mime_type)
+            finally:
+                spooled.unlink(missing_ok=True)
+        return _generate_transcript(_inline_part(bytes(source), mime_type), gemini_model)
+
+    if hasattr(source, "getvalue"):
+        # BytesIO (and Streamlit's UploadedFile) hand out their buffer without copying it
+        return _transcribe_gemini(source.getvalue(), model, api_key, mime_type)
+    if _stream_size(source) <= _inline_max_bytes():
+        return _generate_transcript(_inline_part(source.read(), mime_type), gemini_model)
+    spooled = _spool_to_temp(source)
+    try:
+        return _transcribe_path(spooled, gemini_model, mime_type)
+    finally:
+        spooled.unlink(missing_ok=True)
+
+
+_WORD_RE = re.compile(r"[^\w']+")
+
+
+def _normalize_word(word: str) -> str:
+    return _WORD_RE.sub("", word.lower())
+
+
+def stitch_transcripts(parts: List[str], overlap_seconds: float = 2.0) -> str:
+    """Join chunk transcripts in order, dropping words repeated across each overlap.
+
+    Only words that can fall inside the overlap are compared: the last
+    overlap_seconds of speech so far (at STITCH_WORDS_PER_SECOND) against the
+    start of the next part, ignoring case and punctuation. The longest run of
+    at least STITCH_MIN_OVERLAP_WORDS trailing words that starts within
+    STITCH_ANCHOR_WORDS words of the next part is dropped from it, along with
+    anything before it.
+    """
+    window = math.ceil(max(overlap_seconds, 0.0) * STITCH_WORDS_PER_SECOND) + STITCH_ANCHOR_WORDS
+    words: List[str] = []
+    for part in parts:
+        incoming = part.split()
+        if not incoming:
+            continue
+        if words:
+            tail = [_normalize_word(word) for word in words[-window:]]
+            head = [_normalize_word(word) for word in incoming[: window + STITCH_ANCHOR_WORDS]]
+            skip = 0
+            for size in range(min(len(tail), len(head)), STITCH_MIN_OVERLAP_WORDS - 1, -1):
+                run = tail[-size:]
+                starts = range(min(STITCH_ANCHOR_WORDS, len(head) - size) + 1)
+                found = next((j for j in starts if head[j:j + size] == run), None)
+                if found is not None:
+                    skip = found + size
+                    break
+            incoming = incoming[skip:]
+        words.extend(incoming)
+    return " ".join(words)
+
+
+def _chunk_settings() -> Tuple[float, float]:
+    return (
+        float(get_env("TRANSCRIBE_CHUNK_SECONDS", "120")),
+        float(get_env("TRANSCRIBE_CHUNK_OVERLAP_SECONDS", "2")),
+    )
+
+
+def _preprocess_settings() -> Tuple[float, str]:
+    return (
+        float(get_env("AUDIO_MAX_SILENCE_SECONDS", "0.6")),
+        (get_env("AUDIO_ENCODING", "wav") or "wav").strip().lower(),
+    )
+
+
+def _transcribe_chunked(audio: PcmAudio, model: str, api_key: Optional[str]) -> str:
+    chunk_seconds, overlap_seconds = _chunk_settings()
+    concurrency = int(get_env("TRANSCRIBE_CHUNK_CONCURRENCY", "4"))
+    ranges = split_on_silence(audio, target_seconds=chunk_seconds, overlap_seconds=overlap_seconds)
+
+    def _transcribe_range(bounds) -> str:
+        start, end = bounds
+        data = encode_wav(audio.read(start, end), audio.sample_rate)
+        key = cache_key(TRANSCRIBE_PROMPT_VERSION, model, hash_audio(data))
+        return memoize("transcribe", key, lambda: _transcribe_gemini(data, model, api_key))
+
+    # Each chunk runs in a copy of the caller's context so trace and priority carry over
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(ranges)))) as pool:
+        futures = [pool.submit(context.copy().run, _transcribe_range, bounds) for bounds in ranges]
+        parts = [future.result() for future in futures]
+    return stitch_transcripts(parts, overlap_seconds)
+
+
+def _should_chunk(duration: float, chunked: Optional[bool]) -> bool:
+    if chunked is not None:
+        return chunked
+    return duration > _chunk_settings()[0] * 1.5
+
+
+def _transcribe_settings(chunked: Optional[bool], preprocess: bool) -> str:
+    """The settings that change what is sent to the model, as part of the transcript cache key."""
+    settings = [f"chunked={chunked}", f"preprocess={preprocess}"]
+    if preprocess:
+        settings.append("max_gap={}|encoding={}|trim={}".format(*_preprocess_settings(), TRIM_VERSION))
+    if chunked is not False:
+        settings.append("chunk={}|overlap={}|stitch={}".format(*_chunk_settings(), STITCH_VERSION))
+    return ";".join(settings)
+
+
+def _prepare_source(
+    file_obj: AudioSource, *, chunked: Optional[bool], preprocess: bool
+) -> Tuple[Optional[PcmAudio], Optional[AudioSource], str, Optional[PreparedAudio]]:
+    """Decide how a recording is sent: (audio to chunk, or source for one request, MIME type, prepared).
+
+    Only one of the first two is set; both are None when preprocessing found
+    no audio at all. Long WAV recordings are read in ranges rather than
+    decoded whole. prepared owns temporary files; close it once the
+    transcription is done.
+    """
+    mime_type = sniff_mime_type(read_header(file_obj))
+    if preprocess:
+        max_gap_seconds, encoding = _preprocess_settings()
+        prepared = preprocess_audio(file_obj, max_gap_seconds=max_gap_seconds, encoding=encoding)
+        if prepared is not None:
+            if not prepared.audio.frames:
+                return None, None, mime_type, prepared
+            if _should_chunk(prepared.audio.duration, chunked):
+                return prepared.audio, None, mime_type, prepared
+            return None, prepared.path, prepared.mime_type, prepared
+    elif mime_type == "audio/wav" and chunked is not False:
+        audio = open_wav(file_obj)
+        if audio is not None and _should_chunk(audio.duration, chunked):
+            return audio, None, mime_type, None
+    return None, file_obj, mime_type, None
+
+
+def _transcribe_source(
+    file_obj: AudioSource,
+    model: str,
+    api_key: Optional[str],
+    *,
+    chunked: Optional[bool],
+    preprocess: bool,
+) -> str:
+    audio, source, mime_type, prepared = _prepare_source(file_obj, chunked=chunked, preprocess=preprocess)
+    try:
+        if audio is not None:
+            return _transcribe_chunked(audio, model, api_key)
+        if source is None:
+            return ""
+        return _transcribe_gemini(source, model, api_key, mime_type)
+    finally:
+        if prepared is not None:
+            prepared.close()
+
+
 def transcribe_audio(
-    file_obj: BinaryIO,
+    file_obj: AudioSource,
     *,
     model: Optional[str] = None,
     api_key: Optional[str] = None,
     provider: Optional[str] = None,
+    chunked: Optional[bool] = None,
+    preprocess: Optional[bool] = None,
 ) -> str:
+    """Transcribe a recording given as a path, a bytes-like buffer or a binary file object.
+
+    With preprocess (default: AUDIO_PREPROCESS, on) the audio is downmixed to
+    mono, downsampled to 16 kHz and stripped of long silences before upload;
+    audio that cannot be decoded is sent as-is with its sniffed MIME type.
+    Paths larger than GEMINI_INLINE_AUDIO_MAX_BYTES are uploaded straight from
+    disk, so callers that spool downloads to a file keep memory flat. Results
+    are cached by audio content hash, model and the preprocessing and
+    chunking settings.
+
+    With chunked=True (or by default for WAV recordings longer than 1.5x
+    TRANSCRIBE_CHUNK_SECONDS) the audio is split at quiet points into
+    overlapping chunks that are transcribed in parallel and stitched back in
+    order. Formats that cannot be decoded always use a single request.
+    """
     provider = provider or get_provider()
     models = get_default_models(provider)
     transcription_model = model or models["transcription_model"]
     if provider != "gemini":
         raise RuntimeError("Only Gemini provider is supported in this deployment.")
-    return _transcribe_gemini(file_obj, transcription_model, api_key)
+    if preprocess is None:
+        preprocess = get_bool_env("AUDIO_PREPROCESS", True)
+
+    with timed("transcribe"):
+        record_bytes("transcribe", "in", source_size(file_obj))
+        key = cache_key(
+            TRANSCRIBE_PROMPT_VERSION,
+            transcription_model,
+            hash_audio(file_obj),
+            _transcribe_settings(chunked, preprocess),
+        )
+        return memoize(
+            "transcribe",
+            key,
+            lambda: _transcribe_source(
+                file_obj, transcription_model, api_key, chunked=chunked, preprocess=preprocess
+            ),
+        )
+
+
+# Async variant for the ASGI backend. Decoding, preprocessing and hashing run
+# in worker threads; only the model requests are awaited on the event loop.
+
+
+def _load_source(source: AudioSource) -> Tuple[Optional[bytes], Optional[Path], bool]:
+    """Small sources as inline bytes, larger ones as a path on disk (spooled=True if a temp file was written)."""
+    if isinstance(source, (str, os.PathLike)):
+        path = Path(source)
+        if path.stat().st_size <= _inline_max_bytes():
+            return path.read_bytes(), None, False
+        return None, path, False
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        if len(source) <= _inline_max_bytes():
+            return bytes(source), None, False
+        return None, _spool_to_temp(io.BytesIO(source)), True
+    if hasattr(source, "getvalue"):
+        return _load_source(source.getvalue())
+    if _stream_size(source) <= _inline_max_bytes():
+        return source.read(), None, False
+    return None, _spool_to_temp(source), True
+
+
+async def _agenerate_transcript(audio_part, gemini_model: GeminiModel) -> str:
+    response = await gemini_model.agenerate_content(
+        [audio_part, TRANSCRIBE_PROMPT], config=genai_types().GenerateContentConfig(temperature=0)
+    )
+    return (response.text or "").strip()
+
+
+async def _atranscribe_gemini(source: AudioSource, model: str, api_key: Optional[str], mime_type: str = "audio/wav") -> str:
+    gemini_model = get_gemini_model(model, api_key)
+    data, path, spooled = await asyncio.to_thread(_load_source, source)
+    if data is not None:
+        return await _agenerate_transcript(_inline_part(data, mime_type), gemini_model)
+    try:
+        record_bytes("transcribe", "out", path.stat().st_size)
+        uploaded = await gemini_model.aupload_file(str(path), mime_type)
+        try:
+            return await _agenerate_transcript(uploaded, gemini_model)
+        finally:
+            try:
+                await gemini_model.adelete_file(uploaded.name)
+            except Exception:
+                pass
+    finally:
+        if spooled:
+            path.unlink(missing_ok=True)
 
 
+async def _atranscribe_chunked(audio: PcmAudio, model: str, api_key: Optional[str]) -> str:
+    chunk_seconds, overlap_seconds = _chunk_settings()
+    limit = asyncio.Semaphore(max(1, int(get_env("TRANSCRIBE_CHUNK_CONCURRENCY", "4"))))
+    ranges = await asyncio.to_thread(
+        split_on_silence, audio, target_seconds=chunk_seconds, overlap_seconds=overlap_seconds
+    )
+
+    async def _transcribe_range(bounds) -> str:
+        start, end = bounds
+        async with limit:
+            data = await asyncio.to_thread(lambda: encode_wav(audio.read(start, end), audio.sample_rate))
+            key = cache_key(TRANSCRIBE_PROMPT_VERSION, model, hash_audio(data))
+            return await amemoize("transcribe", key, lambda: _atranscribe_gemini(data, model, api_key))
+
+    parts = await asyncio.gather(*(_transcribe_range(bounds) for bounds in ranges))
+    return stitch_transcripts(parts, overlap_seconds)
+
+
+async def _atranscribe_source(
+    file_obj: AudioSource,
+    model: str,
+    api_key: Optional[str],
+    *,
+    chunked: Optional[bool],
+    preprocess: bool,
+) -> str:
+    audio, source, mime_type, prepared = await asyncio.to_thread(
+        _prepare_source, file_obj, chunked=chunked, preprocess=preprocess
+    )
+    try:
+        if audio is not None:
+            return await _atranscribe_chunked(audio, model, api_key)
+        if source is None:
+            return ""
+        return await _atranscribe_gemini(source, model, api_key, mime_type)
+    finally:
+        if prepared is not None:
+            prepared.close()
+
+
+async def atranscribe_audio(
+    file_obj: AudioSource,
+    *,
+    model: Optional[str] = None,
+    api_key: Optional[str] = None,
+    provider: Optional[str] = None,
+    chunked: Optional[bool] = None,
+    preprocess: Optional[bool] = None,
+) -> str:
+    """Async transcribe_audio: same sources, preprocessing, chunking and cache entries."""
+    provider = provider or get_provider()
+    models = get_default_models(provider)
+    transcription_model = model or models["transcription_model"]
+    if provider != "gemini":
+        raise RuntimeError("Only Gemini provider is supported in this deployment.")
+    if preprocess is None:
+        preprocess = get_bool_env("AUDIO_PREPROCESS", True)
+
+    with timed("transcribe"):
+        record_bytes("transcribe", "in", source_size(file_obj))
+        key = cache_key(
+            TRANSCRIBE_PROMPT_VERSION,
+            transcription_model,
+            await asyncio.to_thread(hash_audio, file_obj),
+            _transcribe_settings(chunked, preprocess),
+        )
+        return await amemoize(
+            "transcribe",
+            key,
+            lambda: _atranscribe_source(
+                file_obj, transcription_model, api_key, chunked=chunked, preprocess=preprocess
+            ),
+        )
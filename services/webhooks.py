@@ -0,0 +1,72 @@
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from config import get_env
+from services.metrics import REGISTRY, Counter
+from services.results import result_payload
+
+WEBHOOK_DELIVERIES = REGISTRY.register(
+    Counter("result_webhook_deliveries_total", "Outbound result webhook deliveries by outcome.", ["outcome"])
+)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="result-webhook")
+    return _executor
+
+
+def sign(body: bytes, secret: str) -> str:
+    """Signature sent in X-Signature-256 so receivers can verify the body came from this backend."""
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+def _deliver(url: str, body: bytes, headers: Dict[str, str], attempts: int, timeout: float) -> None:
+    import requests
+
+    for attempt in range(attempts):
+        try:
+            resp = requests.post(url, data=body, headers=headers, timeout=timeout)
+            # 4xx other than 429 will not succeed on retry
+            if resp.status_code < 500 and resp.status_code != 429:
+                WEBHOOK_DELIVERIES.inc(outcome="ok" if resp.ok else "rejected")
+                return
+        except requests.RequestException:
+            pass
+        if attempt + 1 < attempts:
+            time.sleep(min(30.0, 2.0 ** attempt) * random.uniform(0.5, 1.0))
+    WEBHOOK_DELIVERIES.inc(outcome="failed")
+
+
+def notify_result(call_sid: str, record: Optional[Dict[str, Any]]) -> bool:
+    """POST the finished result for call_sid to RESULT_WEBHOOK_URL in the background.
+
+    The body is the same JSON /call/result returns. Only the worker that ran
+    the job calls this, so each result is pushed once however many workers
+    there are. Returns False when no webhook is configured.
+    """
+    url = get_env("RESULT_WEBHOOK_URL")
+    if not url:
+        return False
+    payload, _ = result_payload(call_sid, record)
+    body = json.dumps(payload).encode("utf-8")
+    headers = {"Content-Type": "application/json", "X-Call-Sid": call_sid}
+    secret = get_env("RESULT_WEBHOOK_SECRET")
+    if secret:
+        headers["X-Signature-256"] = sign(body, secret)
+    attempts = int(get_env("RESULT_WEBHOOK_ATTEMPTS", "5"))
+    timeout = float(get_env("RESULT_WEBHOOK_TIMEOUT_SECONDS", "10"))
+    _get_executor().submit(_deliver, url, body, headers, attempts, timeout)
+    return True
@@ -0,0 +1,61 @@
+"""Shared fixtures: tests import the application modules from the repository root."""
+
+import csv
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from config import reload_settings  # noqa: E402
+
+SUBMISSION_FIELDS = ["submission_number", "name", "mobile_number", "policy_type", "status", "premium", "created_at"]
+
+SAMPLE_SUBMISSIONS = [
+    {"submission_number": "SUB-1001", "name": "Anita Sharma", "mobile_number": "98765 43210", "policy_type": "Auto",
+     "status": "Active", "premium": "12000", "created_at": "2025-11-20"},
+    {"submission_number": "SUB-1002", "name": "Rohit Kumar", "mobile_number": "9123456780", "policy_type": "Health",
+     "status": "Pending", "premium": "18000", "created_at": "2025-12-05"},
+    {"submission_number": "SUB-1003", "name": "Priya Nair", "mobile_number": "+91 99887 76655", "policy_type": "Home",
+     "status": "Active", "premium": "9000", "created_at": "2026-01-12"},
+    {"submission_number": "SUB-1004", "name": "Anil Sharma", "mobile_number": "9012345678", "policy_type": "Auto",
+     "status": "Lapsed", "premium": "11000", "created_at": "2026-02-01"},
+]
+
+
+@pytest.fixture(autouse=True)
+def isolated_settings(tmp_path, monkeypatch):
+    """Re-read the environment for each test so settings changed with monkeypatch take effect."""
+    monkeypatch.setenv("SUBMISSIONS_BACKEND", "csv")
+    reload_settings()
+    yield
+    monkeypatch.undo()
+    reload_settings()
+
+
+@pytest.fixture
+def submissions_csv(tmp_path, monkeypatch):
+    """Make a temporary CSV the submissions data; call it with rows to (re)write the file."""
+    from services import submissions
+
+    path = tmp_path / "submissions.csv"
+    monkeypatch.setattr(submissions, "DATA_PATH", path)
+    monkeypatch.setattr(submissions, "_index", submissions._EMPTY_INDEX)
+
+    def write(rows: Optional[List[Dict[str, str]]] = None) -> Path:
+        previous = path.stat().st_mtime_ns if path.exists() else None
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=SUBMISSION_FIELDS)
+            writer.writeheader()
+            writer.writerows(SAMPLE_SUBMISSIONS if rows is None else rows)
+        if previous is not None and path.stat().st_mtime_ns == previous:
+            # Coarse filesystem clocks can give a rewrite the same mtime
+            os.utime(path, ns=(previous + 1_000_000, previous + 1_000_000))
+        return path
+
+    return write
@@ -0,0 +1,39 @@
+import numpy as np
+
+from services.audio import TARGET_SAMPLE_RATE, encode_wav, keep_frames, preprocess_audio
+
+
+def _speech(level_dbfs, seconds=2.0, gap_seconds=3.0, rate=TARGET_SAMPLE_RATE):
+    """A tone at level_dbfs, a silent gap, then the tone again."""
+    t = np.arange(int(seconds * rate)) / rate
+    tone = np.sin(2 * np.pi * 220 * t) * 10 ** (level_dbfs / 20.0) * np.sqrt(2)
+    return np.concatenate([tone, np.zeros(int(gap_seconds * rate)), tone]).astype(np.float32)
+
+
+def _prepare(tmp_path, samples):
+    path = tmp_path / "call.wav"
+    path.write_bytes(encode_wav(samples, TARGET_SAMPLE_RATE))
+    return preprocess_audio(path)
+
+
+def test_normal_recording_has_long_silence_shortened(tmp_path):
+    samples = _speech(-20.0)
+    prepared = _prepare(tmp_path, samples)
+    try:
+        assert 4.0 <= prepared.audio.duration < 5.0
+    finally:
+        prepared.close()
+
+
+def test_low_gain_recording_is_kept_whole(tmp_path):
+    # Every sample is below the -45 dBFS silence floor
+    samples = _speech(-55.0)
+    prepared = _prepare(tmp_path, samples)
+    try:
+        assert prepared.audio.frames == len(samples)
+    finally:
+        prepared.close()
+
+
+def test_digital_silence_is_dropped():
+    assert not keep_frames(np.zeros(100, dtype=np.float32)).any()
@@ -0,0 +1,102 @@
+import json
+import os
+
+import pytest
+
+from config import reload_settings
+from services import cache as cache_module
+from services.cache import ResultCache, cache_key, memoize
+
+VALUE = "x" * 100
+ENTRY_BYTES = len(json.dumps(VALUE))
+
+
+def _age(result_cache, key, mtime):
+    path = result_cache._path("ns", key)
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def shared_cache(tmp_path, monkeypatch):
+    """The process-wide cache used by memoize, in a temporary directory."""
+    monkeypatch.setenv("CACHE_DIR", str(tmp_path / "cache"))
+    reload_settings()
+    monkeypatch.setattr(cache_module, "_cache", None)
+    return lambda: cache_module.get_cache()
+
+
+def test_cache_key_separates_parts():
+    assert cache_key("ab", "c") != cache_key("a", "bc")
+    assert cache_key("a", b"b") == cache_key("a", "b")
+
+
+def test_memory_tier_is_lru_over_disk(tmp_path):
+    result_cache = ResultCache(tmp_path, memory_items=2)
+    for key in ("a", "b", "c"):
+        result_cache.set("ns", key, key.upper())
+
+    assert result_cache.get("ns", "a") == "A"
+    stats = result_cache.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["memory_items"] == 2
+    assert result_cache.get("ns", "c") == "C"
+    assert result_cache.stats()["memory_hits"] == 1
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    result_cache = ResultCache(tmp_path, memory_items=0, max_disk_bytes=ENTRY_BYTES * 3 + ENTRY_BYTES // 2)
+    for mtime, key in enumerate(("a", "b", "c"), start=1):
+        result_cache.set("ns", key, VALUE)
+        _age(result_cache, key, mtime * 1000)
+    # Reading "a" from disk marks it as recently used, so "b" is now the oldest
+    assert result_cache.get("ns", "a") == VALUE
+
+    result_cache.set("ns", "d", VALUE)
+
+    assert result_cache.get("ns", "b") is None
+    assert [result_cache.get("ns", key) for key in ("a", "c", "d")] == [VALUE] * 3
+    assert result_cache.stats()["evictions"] == 1
+    assert sum(p.stat().st_size for p in tmp_path.rglob("*.json")) <= result_cache.max_disk_bytes
+
+
+def test_eviction_trims_below_the_budget(tmp_path):
+    result_cache = ResultCache(tmp_path, memory_items=0, max_disk_bytes=ENTRY_BYTES * 10)
+    for mtime, key in enumerate("abcdefghij", start=1):
+        result_cache.set("ns", key, VALUE)
+        _age(result_cache, key, mtime * 1000)
+
+    result_cache.set("ns", "k", VALUE)
+
+    # Down to 90% of the budget in one pass, oldest first
+    remaining = sorted(p.stem for p in tmp_path.rglob("*.json"))
+    assert remaining == list("cdefghijk")
+    assert result_cache.stats()["evictions"] == 2
+
+
+def test_memoize_computes_once_and_does_not_cache_failures(shared_cache):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"summary": "ok"}
+
+    assert memoize("summary", "k1", compute) == {"summary": "ok"}
+    assert memoize("summary", "k1", compute) == {"summary": "ok"}
+    assert len(calls) == 1
+
+    def fail():
+        raise RuntimeError("model error")
+
+    with pytest.raises(RuntimeError):
+        memoize("summary", "k2", fail)
+    assert shared_cache().get("summary", "k2") is None
+
+
+def test_disk_write_failure_still_returns_the_value(tmp_path, monkeypatch, shared_cache):
+    blocker = tmp_path / "not-a-directory"
+    blocker.write_text("")
+    monkeypatch.setattr(cache_module, "_cache", ResultCache(blocker / "cache"))
+
+    assert memoize("summary", "k1", lambda: "computed") == "computed"
+    assert memoize("summary", "k1", lambda: "recomputed") == "computed"
+    assert cache_module.get_cache().stats()["write_errors"] == 1
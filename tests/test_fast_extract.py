@@ -0,0 +1,97 @@
+import pytest
+
+from models import ExtractedInfo
+from services.fast_extract import (
+    extract_known_fields,
+    find_mobile_numbers,
+    find_submission_numbers,
+    normalize_spoken_digits,
+)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Nine eight seven six", "9876"),
+        ("nine eight double seven", "9877"),
+        ("triple five, oh one", "55501"),
+        ("call 98765 43210", "call 9876543210"),
+        ("call 98765-43210", "call 9876543210"),
+        ("plus 91 98765 43210", "plus 919876543210"),
+        ("nine eight seven 65 43210", "9876543210"),
+        # Numerals that do not add up to a mobile number keep their grouping
+        ("call 98 76-5 43", "call 98 76-5 43"),
+        ("submission 1001, 9876543210", "submission 1001, 9876543210"),
+        ("call me on 98765 43210 1001", "call me on 9876543210 1001"),
+        ("sub 1001, nine eight seven six five four three two one zero", "sub 1001, 9876543210"),
+        ("one moment please", "one moment please"),
+    ],
+)
+def test_normalize_spoken_digits(text, expected):
+    assert normalize_spoken_digits(text) == expected
+
+
+def test_find_identifiers():
+    text = normalize_spoken_digits("It is sub dash one zero zero two, or SUB-1003; mobile +91 98765 43210")
+
+    assert find_submission_numbers(text) == ["SUB-1002", "SUB-1003"]
+    assert find_mobile_numbers(text) == ["919876543210"]
+
+
+def test_separate_numbers_are_not_merged():
+    text = normalize_spoken_digits("Submission 1001, call me on 98765 43210 1001")
+
+    assert find_mobile_numbers(text) == ["9876543210"]
+
+
+def test_verified_submission_fills_name(submissions_csv):
+    submissions_csv()
+
+    info, row = extract_known_fields("Hi, my reference is sub dash one zero zero two.")
+
+    assert info == ExtractedInfo(name="Rohit Kumar", submission_number="SUB-1002")
+    assert row["submission_number"] == "SUB-1002"
+
+
+def test_mobile_with_country_code_matches_last_ten_digits(submissions_csv):
+    submissions_csv()
+
+    info, row = extract_known_fields("You can reach me on plus nine one nine eight seven six five four three two one zero")
+
+    assert info.mobile_number == "9876543210"
+    assert info.name == "Anita Sharma"
+    assert row["submission_number"] == "SUB-1001"
+
+
+def test_submission_row_wins_over_mobile_row(submissions_csv):
+    submissions_csv()
+
+    info, row = extract_known_fields("SUB-1004, and my number is 9876543210")
+
+    assert info == ExtractedInfo(name="Anil Sharma", submission_number="SUB-1004", mobile_number="9876543210")
+    assert row["submission_number"] == "SUB-1004"
+
+
+def test_unverified_identifiers_are_not_returned(submissions_csv):
+    submissions_csv()
+
+    assert extract_known_fields("SUB-9999 and 9000000000") == (ExtractedInfo(), None)
+
+
+def test_extract_caller_info_answers_verified_calls_without_the_model(submissions_csv, monkeypatch):
+    from services import summarize
+
+    submissions_csv()
+
+    def no_model(*args, **kwargs):
+        raise AssertionError("the model should not be called")
+
+    monkeypatch.setattr(summarize, "_extract_gemini", no_model)
+
+    info = summarize.extract_caller_info("my submission is SUB-1003", provider="gemini", api_key="test")
+
+    assert info == ExtractedInfo(name="Priya Nair", submission_number="SUB-1003")
+
+
+def test_empty_store(submissions_csv):
+    assert extract_known_fields("SUB-1001") == (ExtractedInfo(), None)
@@ -0,0 +1,123 @@
+import asyncio
+import contextvars
+import time
+
+import pytest
+
+from services.gateway import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    DeadlineExceeded,
+    GeminiGateway,
+    attempt_timeout,
+    request_priority,
+)
+
+
+def _gateway(**overrides):
+    settings = dict(max_concurrency=1, initial_concurrency=1, max_attempts=1, deadline_seconds=5.0)
+    settings.update(overrides)
+    return GeminiGateway(**settings)
+
+
+def _call_at(gateway, priority, fn):
+    with request_priority(priority):
+        context = contextvars.copy_context()
+    return asyncio.create_task(gateway.acall(fn), context=context)
+
+
+def test_released_slot_goes_to_interactive_waiter_first():
+    gateway = _gateway()
+    admitted = []
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold():
+            await release.wait()
+            return "held"
+
+        def record(name):
+            async def fn():
+                admitted.append(name)
+                return name
+
+            return fn
+
+        holder = _call_at(gateway, PRIORITY_INTERACTIVE, hold)
+        await asyncio.sleep(0)
+        background = _call_at(gateway, PRIORITY_BACKGROUND, record("background"))
+        await asyncio.sleep(0.01)
+        interactive = _call_at(gateway, PRIORITY_INTERACTIVE, record("interactive"))
+        await asyncio.sleep(0.01)
+        release.set()
+        return await asyncio.gather(holder, background, interactive)
+
+    assert asyncio.run(scenario()) == ["held", "background", "interactive"]
+    assert admitted == ["interactive", "background"]
+    assert gateway.in_flight == 0
+    assert gateway._async_waiters == []
+
+
+def test_async_waiter_gives_up_at_its_deadline():
+    gateway = _gateway()
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold():
+            await release.wait()
+
+        holder = _call_at(gateway, PRIORITY_INTERACTIVE, hold)
+        await asyncio.sleep(0)
+        with pytest.raises(DeadlineExceeded):
+            await gateway.acall(hold, deadline=0.05)
+        release.set()
+        await holder
+
+    asyncio.run(scenario())
+    assert gateway.in_flight == 0
+    assert gateway._waiting == {PRIORITY_INTERACTIVE: 0, PRIORITY_BACKGROUND: 0}
+    assert gateway._async_waiters == []
+
+
+def test_async_attempt_times_out_and_is_retried():
+    gateway = _gateway(max_attempts=2, base_delay=0.0, request_timeout=0.05)
+    attempts = []
+
+    async def slow():
+        attempts.append(attempt_timeout())
+        await asyncio.sleep(1.0)
+
+    with pytest.raises(TimeoutError) as excinfo:
+        asyncio.run(gateway.acall(slow))
+    assert not isinstance(excinfo.value, DeadlineExceeded)
+    assert attempts == [0.05, 0.05]
+    assert gateway.in_flight == 0
+
+
+def test_attempt_timeout_is_bounded_by_the_deadline():
+    gateway = _gateway(request_timeout=120.0)
+    seen = []
+
+    assert gateway.call(lambda: seen.append(attempt_timeout()) or "ok", deadline=2.0) == "ok"
+    assert 0 < seen[0] <= 2.0
+    assert attempt_timeout() is None
+
+
+def test_shared_budget_keeps_a_reserve_for_interactive_requests(tmp_path):
+    # Two gateways on one budget file stand in for two processes on a host
+    batch = _gateway(rpm=60, budget_db=tmp_path / "budget.db", interactive_reserve=0.4)
+    web = _gateway(rpm=60, budget_db=tmp_path / "budget.db", interactive_reserve=0.4)
+    capacity = batch.requests.capacity
+
+    with request_priority(PRIORITY_BACKGROUND):
+        for _ in range(int(capacity * 0.6)):
+            assert batch.call(lambda: "ok") == "ok"
+        with pytest.raises(DeadlineExceeded):
+            batch.call(lambda: "ok", deadline=0.2)
+
+    started = time.monotonic()
+    for _ in range(int(capacity * 0.4)):
+        assert web.call(lambda: "ok") == "ok"
+    assert time.monotonic() - started < 0.5
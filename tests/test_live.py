@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+from services import live
+from services.jobs import JobQueue
+from services.live import LiveCallSession
+from services.results import STATE_DONE, STATE_RUNNING, ResultStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    result_store = ResultStore(tmp_path / "call_results.db")
+    monkeypatch.setattr(live, "get_result_store", lambda: result_store)
+    monkeypatch.setattr("services.pipeline.get_result_store", lambda: result_store)
+    return result_store
+
+
+@pytest.fixture
+def queue(store, monkeypatch):
+    monkeypatch.setattr("services.jobs.JOB_WATCH_POLL_SECONDS", 0.05)
+    job_queue = JobQueue(workers=1, store=store)
+    yield job_queue
+    job_queue.shutdown()
+
+
+def _process_recording(url):
+    return {"transcript": f"from {url}", "summary": "", "extracted": {}, "submission": None, "errors": {}}
+
+
+def _wait_for(store, call_sid, state, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        record = store.get(call_sid)
+        if record is not None and record["state"] == state:
+            return record
+        time.sleep(0.02)
+    raise AssertionError(f"{call_sid} never reached {state}: {store.get(call_sid)}")
+
+
+def test_recording_runs_when_the_live_session_fails(store, queue, monkeypatch):
+    def broken_stages(*args, **kwargs):
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr(live, "run_transcript_stages", broken_stages)
+    session = LiveCallSession("CA1")
+    assert session.owner
+    assert store.get("CA1")["state"] == STATE_RUNNING
+
+    # The recording callback arrives while the live session still owns the call
+    assert not queue.submit("CA1", _process_recording, "https://example.com/rec.wav")
+    assert session.finish() is None
+
+    record = _wait_for(store, "CA1", STATE_DONE)
+    assert record["result"]["transcript"] == "from https://example.com/rec.wav"
+
+
+def test_recording_is_skipped_when_the_live_session_succeeds(store, queue, monkeypatch):
+    def stages(transcript, **kwargs):
+        return {
+            "summary": "live summary",
+            "extracted": live.ExtractedInfo(),
+            "submission": None,
+            "errors": {},
+            "still_running": [],
+        }
+
+    monkeypatch.setattr(live, "run_transcript_stages", stages)
+    ran = []
+    session = LiveCallSession("CA2")
+
+    assert not queue.submit("CA2", lambda url: ran.append(url) or {}, "https://example.com/rec.wav")
+    assert session.finish()["summary"] == "live summary"
+    time.sleep(0.3)
+
+    assert ran == []
+    assert store.get("CA2")["result"]["summary"] == "live summary"
+
+
+def test_recording_runs_when_the_live_session_goes_stale(store, queue):
+    store.stale_seconds = 0.2
+    LiveCallSession("CA3")
+
+    # The session dies without finish(); its claim stops being refreshed
+    assert not queue.submit("CA3", _process_recording, "https://example.com/rec.wav")
+
+    assert _wait_for(store, "CA3", STATE_DONE)["result"]["transcript"] == "from https://example.com/rec.wav"
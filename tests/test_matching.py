@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+
+from models import ExtractedInfo
+from services.matching import (
+    _encode_digits,
+    _encode_names,
+    best_match,
+    edit_distances,
+    get_matcher,
+    hamming_similarity,
+    lookup_batch,
+    normalize_name,
+    phonetic_key,
+    rank_submissions,
+)
+
+from conftest import SAMPLE_SUBMISSIONS
+
+
+def _top(info, **kwargs):
+    return [candidate["submission"]["submission_number"] for candidate in rank_submissions(info, **kwargs)]
+
+
+def test_normalize_name_and_phonetic_key():
+    assert normalize_name("Mr.  Rohit   KUMAR 2") == "rohit kumar"
+    assert phonetic_key("kumar") == phonetic_key("coomar")
+    assert phonetic_key("sharma") == phonetic_key("sarma")
+    assert phonetic_key("nair") != phonetic_key("kumar")
+
+
+def test_edit_distances_full_and_substring():
+    chars, lengths = _encode_names(["sitting", "anita sharma", ""])
+
+    full, partial = edit_distances("kitten", chars, lengths)
+
+    assert full.tolist() == [3, 10, 6]
+    partial_sharma = edit_distances("sharma", chars, lengths)[1]
+    assert partial_sharma[1] == 0
+    assert partial[2] == 6
+
+
+def test_hamming_similarity_counts_wrong_and_missing_digits():
+    matrix, lengths = _encode_digits(["9876543210", "9876543299", "43210", ""], 10)
+
+    similarity = hamming_similarity("9876543210", matrix, lengths, max_errors=2)
+
+    assert similarity[0] == 1.0
+    assert similarity[1] == pytest.approx(0.8)
+    # Five missing digits are more errors than allowed
+    assert similarity[2] == 0.0
+    assert similarity[3] == 0.0
+
+
+def test_exact_identifier_ranks_first_and_is_accepted(submissions_csv):
+    submissions_csv()
+
+    candidates = rank_submissions(ExtractedInfo(submission_number="SUB-1003"))
+
+    assert candidates[0]["submission"]["submission_number"] == "SUB-1003"
+    assert candidates[0]["score"] == 1.0
+    assert best_match(candidates)["name"] == "Priya Nair"
+
+
+def test_misheard_fields_still_find_the_submission(submissions_csv):
+    submissions_csv()
+
+    # One wrong mobile digit, one wrong submission digit and a phonetic misspelling
+    info = ExtractedInfo(name="Anita Sarma", mobile_number="98765 43219", submission_number="SUB-1007")
+    candidates = rank_submissions(info, k=3)
+
+    assert candidates[0]["submission"]["submission_number"] == "SUB-1001"
+    assert 0.8 <= candidates[0]["score"] < 1.0
+    assert set(candidates[0]["fields"]) == {"name", "mobile_number", "submission_number"}
+    assert best_match(candidates)["submission_number"] == "SUB-1001"
+
+
+def test_ambiguous_candidates_are_not_accepted(submissions_csv):
+    rows = SAMPLE_SUBMISSIONS + [dict(SAMPLE_SUBMISSIONS[1], submission_number="SUB-1005", mobile_number="9000000005")]
+    submissions_csv(rows)
+
+    candidates = rank_submissions(ExtractedInfo(name="Rohit Kumar"))
+
+    assert _top(ExtractedInfo(name="Rohit Kumar"))[:2] == ["SUB-1002", "SUB-1005"]
+    assert candidates[0]["score"] == candidates[1]["score"]
+    assert best_match(candidates) is None
+
+
+def test_min_score_and_k_bound_the_candidates(submissions_csv):
+    submissions_csv()
+    info = ExtractedInfo(name="Sharma")
+
+    assert len(rank_submissions(info, k=1, min_score=0.0)) == 1
+    assert _top(info, k=5, min_score=0.0)[:2] == ["SUB-1001", "SUB-1004"]
+    assert rank_submissions(ExtractedInfo(name="Zzyzx Qwerty"), min_score=0.5) == []
+    assert rank_submissions(ExtractedInfo()) == []
+
+
+def test_best_match_thresholds(monkeypatch):
+    from config import reload_settings
+
+    assert best_match([]) is None
+    low = [{"submission": {"submission_number": "SUB-1"}, "score": 0.7, "fields": {}}]
+    assert best_match(low) is None
+
+    monkeypatch.setenv("SUBMISSIONS_MATCH_ACCEPT_SCORE", "0.6")
+    reload_settings()
+    assert best_match(low) == {"submission_number": "SUB-1"}
+
+
+def test_matcher_is_rebuilt_when_the_data_changes(submissions_csv):
+    submissions_csv()
+    matcher = get_matcher()
+    assert get_matcher() is matcher
+
+    submissions_csv(SAMPLE_SUBMISSIONS + [dict(SAMPLE_SUBMISSIONS[0], submission_number="SUB-2001", name="Meera Iyer")])
+
+    assert get_matcher() is not matcher
+    assert _top(ExtractedInfo(name="Meera Iyer"), k=1) == ["SUB-2001"]
+
+
+def test_lookup_batch(submissions_csv):
+    submissions_csv()
+
+    results = lookup_batch([ExtractedInfo(submission_number="SUB-1002"), ExtractedInfo(name="Nobody Known")])
+
+    assert results[0]["query"]["submission_number"] == "SUB-1002"
+    assert results[0]["match"]["name"] == "Rohit Kumar"
+    assert results[1]["match"] is None
+    assert all(len(result["candidates"]) <= 3 for result in results)
+    assert isinstance(results[0]["candidates"][0]["score"], float)
+    assert not isinstance(results[0]["candidates"][0]["score"], np.floating)
@@ -0,0 +1,44 @@
+import pytest
+
+from services.metrics import STAGE_FAILURES, start_trace, timed
+
+
+def _failures(stage):
+    return STAGE_FAILURES._values.get((stage,), 0.0)
+
+
+def test_errors_count_as_stage_failures():
+    trace = start_trace()
+
+    with pytest.raises(ValueError):
+        with timed("test_error"):
+            raise ValueError("boom")
+
+    assert _failures("test_error") == 1
+    assert trace[-1]["ok"] is False
+
+
+@pytest.mark.parametrize("exit_exc", [GeneratorExit, KeyboardInterrupt, SystemExit])
+def test_closing_or_shutdown_is_not_a_stage_failure(exit_exc):
+    stage = f"test_{exit_exc.__name__}"
+    trace = start_trace()
+
+    with pytest.raises(exit_exc):
+        with timed(stage):
+            raise exit_exc()
+
+    assert _failures(stage) == 0
+    assert trace[-1]["ok"] is True
+
+
+def test_stream_closed_early_is_not_a_stage_failure():
+    def pieces():
+        with timed("test_stream"):
+            yield "a"
+            yield "b"
+
+    stream = pieces()
+    next(stream)
+    stream.close()
+
+    assert _failures("test_stream") == 0
@@ -0,0 +1,34 @@
+import threading
+import time
+
+from models import ExtractedInfo
+from services import pipeline
+from services.gateway import GeminiGateway, attempt_timeout
+
+
+def test_timed_out_stage_is_reported_and_its_model_call_shares_the_deadline(monkeypatch):
+    gateway = GeminiGateway(max_attempts=1)
+    seen = []
+    finished = threading.Event()
+
+    def slow_extract(transcript, **kwargs):
+        def request():
+            seen.append(attempt_timeout())
+            time.sleep(0.5)
+            return ExtractedInfo()
+
+        try:
+            return gateway.call(request)
+        finally:
+            finished.set()
+
+    monkeypatch.setattr(pipeline, "extract_caller_info", slow_extract)
+    monkeypatch.setattr(pipeline, "summarize_transcript", lambda transcript, **kwargs: "summary")
+
+    result = pipeline.run_transcript_stages("hello", timeouts={"extract": 0.2})
+
+    assert result["summary"] == "summary"
+    assert result["errors"] == {"extract": "timed out"}
+    assert result["still_running"] == ["extract"]
+    assert 0 < seen[0] <= 0.2
+    assert finished.wait(2.0)
@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+
+import pytest
+
+from services import results
+from services.results import STATE_DONE, STATE_FAILED, STATE_QUEUED, STATE_RUNNING, ResultStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time() for the store's staleness and expiry checks."""
+    now = [1_000_000.0]
+    monkeypatch.setattr(results.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultStore(tmp_path / "call_results.db", ttl_seconds=3600, stale_seconds=60)
+
+
+def test_claim_once(store):
+    assert store.claim("CA1")
+    assert not store.claim("CA1")
+    assert store.get("CA1")["state"] == STATE_QUEUED
+
+
+@pytest.mark.parametrize("state", [STATE_QUEUED, STATE_RUNNING, STATE_DONE])
+def test_owned_or_finished_jobs_are_not_reclaimed(store, state):
+    store.claim("CA1")
+    store.set_state("CA1", state, result={"summary": "ok"} if state == STATE_DONE else None)
+
+    assert not store.claim("CA1")
+    assert store.get("CA1")["state"] == state
+
+
+def test_failed_job_can_be_reclaimed_and_starts_clean(store):
+    store.claim("CA1")
+    store.append_event("CA1", "stage", {"stage": "download", "state": "started"})
+    store.set_state("CA1", STATE_FAILED, error="boom")
+
+    assert store.claim("CA1")
+    record = store.get("CA1")
+    assert record["state"] == STATE_QUEUED
+    assert record["error"] is None
+    assert store.events_since("CA1") == []
+
+
+def test_stale_running_job_can_be_reclaimed(store, clock):
+    store.claim("CA1")
+    store.set_state("CA1", STATE_RUNNING)
+
+    clock[0] += 30
+    assert not store.claim("CA1")
+    clock[0] += 31
+    assert store.claim("CA1")
+
+
+def test_expired_result_can_be_reclaimed(store, clock):
+    store.claim("CA1")
+    store.set_state("CA1", STATE_DONE, result={"summary": "ok"})
+
+    clock[0] += 3601
+    assert store.get("CA1") is None
+    assert store.claim("CA1")
+
+
+def test_concurrent_workers_claim_exactly_once(tmp_path):
+    path = tmp_path / "call_results.db"
+    ResultStore(path)
+    stores = [ResultStore(path) for _ in range(8)]
+    start = threading.Barrier(len(stores))
+    outcomes = []
+
+    def claim(worker_store):
+        start.wait()
+        outcomes.append(worker_store.claim("CA1"))
+
+    threads = [threading.Thread(target=claim, args=(worker_store,)) for worker_store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(outcomes) == [False] * 7 + [True]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_child_opens_its_own_connection(store):
+    store.claim("CA1")
+    parent_conn = store._connection()
+
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            if store._connection() is not parent_conn and store.claim("CA2") and not store.claim("CA1"):
+                code = 0
+        finally:
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+
+    assert os.WEXITSTATUS(status) == 0
+    assert store._connection() is parent_conn
+    assert store.get("CA2")["state"] == STATE_QUEUED
+
+
+def test_long_running_job_is_not_reclaimed(tmp_path, monkeypatch):
+    from services import jobs
+
+    store = ResultStore(tmp_path / "call_results.db", stale_seconds=0.3)
+    monkeypatch.setattr(jobs, "JOB_HEARTBEAT_SECONDS", 0.05)
+    queue = jobs.JobQueue(workers=1, store=store)
+    release = threading.Event()
+    try:
+        assert queue.submit("CA1", lambda: release.wait(5) and {"summary": "done"})
+        deadline = time.monotonic() + 1.0
+        while time.monotonic() < deadline:
+            # Well past stale_seconds: only the heartbeat keeps the claim fresh
+            assert not store.claim("CA1")
+            time.sleep(0.05)
+        release.set()
+        assert store.wait_until_finished("CA1", 5)["state"] == STATE_DONE
+    finally:
+        release.set()
+        queue.shutdown()
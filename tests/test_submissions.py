@@ -0,0 +1,76 @@
+from models import ExtractedInfo
+from services.submissions import SubmissionIndex, find_submission, get_index
+
+from conftest import SAMPLE_SUBMISSIONS
+
+
+def test_exact_lookups_use_first_occurrence():
+    rows = SAMPLE_SUBMISSIONS + [dict(SAMPLE_SUBMISSIONS[0], name="Duplicate")]
+    index = SubmissionIndex(rows)
+
+    assert index.by_submission_number(" SUB-1001 ")["name"] == "Anita Sharma"
+    assert index.by_submission_number("SUB-9999") is None
+
+
+def test_mobile_lookup_matches_normalized_digits():
+    index = SubmissionIndex(SAMPLE_SUBMISSIONS)
+
+    assert index.by_mobile_digits("9876543210")["submission_number"] == "SUB-1001"
+    assert index.by_mobile_digits("919988776655")["submission_number"] == "SUB-1003"
+    assert index.by_mobile_digits("98765") is None
+
+
+def test_name_contains_verifies_trigram_candidates():
+    index = SubmissionIndex(SAMPLE_SUBMISSIONS)
+
+    assert index.by_name_contains("ROHIT")["submission_number"] == "SUB-1002"
+    assert index.by_name_contains("sharma")["submission_number"] == "SUB-1001"
+    # Every trigram of the query occurs in "anita sharma", but the query itself does not
+    assert index.by_name_contains("sharma anita") is None
+    assert index.by_name_contains("zzz") is None
+
+
+def test_short_name_query_scans_names():
+    index = SubmissionIndex(SAMPLE_SUBMISSIONS)
+
+    assert index.by_name_contains("ya")["submission_number"] == "SUB-1003"
+    assert index.by_name_contains("qx") is None
+
+
+def test_empty_index():
+    index = SubmissionIndex([])
+
+    assert index.is_empty()
+    assert index.by_submission_number("SUB-1001") is None
+    assert index.by_name_contains("anita") is None
+
+
+def test_get_index_reloads_when_csv_changes(submissions_csv):
+    submissions_csv()
+    first = get_index()
+    assert get_index() is first
+    assert first.by_submission_number("SUB-2001") is None
+
+    submissions_csv(SAMPLE_SUBMISSIONS + [dict(SAMPLE_SUBMISSIONS[0], submission_number="SUB-2001", name="New Row")])
+    reloaded = get_index()
+
+    assert reloaded is not first
+    assert reloaded.by_submission_number("SUB-2001")["name"] == "New Row"
+
+
+def test_get_index_without_csv_is_empty(submissions_csv):
+    assert get_index().is_empty()
+    assert find_submission(ExtractedInfo(submission_number="SUB-1001")) is None
+
+
+def test_find_submission_prefers_submission_then_mobile_then_name(submissions_csv):
+    submissions_csv()
+
+    by_number = find_submission(ExtractedInfo(submission_number="SUB-1002", mobile_number="98765 43210", name="Priya"))
+    by_mobile = find_submission(ExtractedInfo(submission_number="SUB-9999", mobile_number="98765-43210", name="Priya"))
+    by_name = find_submission(ExtractedInfo(submission_number="SUB-9999", mobile_number="9000000000", name="Priya"))
+
+    assert by_number["submission_number"] == "SUB-1002"
+    assert by_mobile["submission_number"] == "SUB-1001"
+    assert by_name["submission_number"] == "SUB-1003"
+    assert find_submission(ExtractedInfo(name="Nobody")) is None
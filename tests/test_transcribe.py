@@ -0,0 +1,107 @@
+import asyncio
+import io
+from pathlib import Path
+from types import SimpleNamespace
+
+from services import transcribe
+from services.transcribe import STITCH_MIN_OVERLAP_WORDS, stitch_transcripts
+
+
+def test_parts_without_overlap_are_joined():
+    assert stitch_transcripts(["hello there", "how can I help"]) == "hello there how can I help"
+
+
+def test_overlap_is_dropped_ignoring_case_and_punctuation():
+    parts = [
+        "My policy number is SUB-1001 and I want to",
+        "and I want to renew it. I would like it",
+        "I would like it by Friday.",
+    ]
+
+    assert stitch_transcripts(parts) == "My policy number is SUB-1001 and I want to renew it. I would like it by Friday."
+
+
+def test_overlap_may_start_a_word_into_the_next_part():
+    # The chunk boundary cut a word in half, so the next transcript starts with a fragment
+    parts = ["please call me back tomorrow at nine", "uh- me back tomorrow at nine sharp"]
+
+    assert stitch_transcripts(parts) == "please call me back tomorrow at nine sharp"
+
+
+def test_short_repeats_are_kept():
+    assert stitch_transcripts(["I said no", "no thanks"]) == "I said no no thanks"
+    repeated = " ".join(["word"] * (STITCH_MIN_OVERLAP_WORDS - 1))
+    assert stitch_transcripts([f"a {repeated}", f"{repeated} b"]) == f"a {repeated} {repeated} b"
+
+
+def test_phrase_repeated_after_the_overlap_window_is_kept():
+    parts = [
+        "so the claim is filed thank you",
+        "for the wait. I can confirm it. Let me check the notes again, thank you so much for calling today",
+    ]
+
+    assert stitch_transcripts(parts) == " ".join(parts)
+
+
+def test_repeat_later_in_the_next_part_is_not_an_overlap():
+    parts = [
+        "the adjuster will call you back",
+        "on Monday and if not the adjuster will call you back later",
+    ]
+
+    assert stitch_transcripts(parts) == " ".join(parts)
+
+
+def test_empty_parts_are_skipped():
+    assert stitch_transcripts(["", "first part", "   ", "second part"]) == "first part second part"
+    assert stitch_transcripts([]) == ""
+
+
+def test_overlap_search_is_limited_to_the_overlap_duration():
+    first = "one two three four five six seven eight nine ten eleven twelve"
+    # Four of the repeated words lie beyond half a second of speech, so nothing is dropped
+    second = "five six seven eight nine ten eleven twelve thirteen"
+
+    assert stitch_transcripts([first, second], overlap_seconds=0.5) == f"{first} {second}"
+    assert stitch_transcripts([first, second], overlap_seconds=2.0) == f"{first} thirteen"
+
+
+class _RecordingModel:
+    def __init__(self):
+        self.uploads = []
+        self.inline = []
+
+    def upload_file(self, path, mime_type):
+        self.uploads.append(Path(path).read_bytes())
+        return SimpleNamespace(name="files/1")
+
+    async def aupload_file(self, path, mime_type):
+        return self.upload_file(path, mime_type)
+
+    def delete_file(self, name):
+        pass
+
+    async def adelete_file(self, name):
+        pass
+
+    def generate_content(self, contents, config=None):
+        if getattr(contents[0], "inline_data", None) is not None:
+            self.inline.append(contents[0].inline_data.data)
+        return SimpleNamespace(text="hello")
+
+    async def agenerate_content(self, contents, config=None):
+        return self.generate_content(contents, config)
+
+
+def test_large_in_memory_upload_goes_through_the_files_api(monkeypatch):
+    gemini_model = _RecordingModel()
+    monkeypatch.setattr(transcribe, "get_gemini_model", lambda model, api_key: gemini_model)
+    monkeypatch.setattr(transcribe, "_inline_max_bytes", lambda: 1000)
+    audio = b"\x01" * 2000
+
+    assert transcribe._transcribe_gemini(io.BytesIO(audio), "model", None) == "hello"
+    assert asyncio.run(transcribe._atranscribe_gemini(io.BytesIO(audio), "model", None)) == "hello"
+    assert transcribe._transcribe_gemini(io.BytesIO(audio[:500]), "model", None) == "hello"
+
+    assert gemini_model.uploads == [audio, audio]
+    assert gemini_model.inline == [audio[:500]]